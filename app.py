@@ -1,18 +1,17 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import time
 from datetime import datetime
+import functools
 import os
-import google.generativeai as genai
-import folium
-from streamlit_folium import st_folium
-import pickle
+import tempfile
+from zipfile import BadZipFile
 from dotenv import load_dotenv
 
+# Heavy libraries (folium, pydeck, plotly, Gemini SDKs) are imported inside the
+# page branches that use them, so opening the home page does not pay for them.
+
 # Load environment variables
 load_dotenv()
 
@@ -20,21 +19,32 @@ load_dotenv()
 import sys
 sys.path.append('./birds')
 
-try:
-    from birds.helper_original import *
-    BIRDS_MODULE_AVAILABLE = True
-except ImportError:
-    BIRDS_MODULE_AVAILABLE = False
-    st.warning("Birds module not found. Using fallback visualization methods.")
-
 # Try to import your core modules if they exist
 try:
-    from core.data import load_train_metadata
-    from core.viz import bird_description, scientific_name, heatmap_folium, map_3d_deck
+    from core.data import load_train_metadata, species_index_for
+    from core.geo import bin_coordinates
+    from core.viz import SPECIES, bird_description, scientific_name, heatmap_folium, map_3d_deck, cached_deck, species_stats
+    from core.render_cache import get_render_cache
+    from core.warmup import start_background_warmup
     CORE_MODULES_AVAILABLE = True
 except ImportError:
     CORE_MODULES_AVAILABLE = False
 
+# Risk page and chatbot modules; they need nothing beyond the base requirements.
+from core.bulk import SURVEY_FILE_TYPES, score_survey_file, summarize_counts
+from core.calibration import calibrate, confidence_band
+from core.chat import refinement_available
+from core.conversation import Conversation
+from core.explain import field_contributions, format_drivers, top_drivers
+from core.forest import as_compiled, load_compiled_forest
+from core.model import predict_nest_risk_fallback, predict_proba_batch
+from core.refine import REFINE_DEADLINE_S, get_refinement_pool, wait_for_refinement
+from core.registry import current_risk_model, get_model_registry
+from core.response_cache import get_response_cache
+from core.risk_table import load_risk_table
+from core.rules import recommend
+from core.shadow import get_shadow_scorer
+
 # Configure the page
 st.set_page_config(
     page_title="🕊️ Nest Risk Predictor",
@@ -195,52 +205,46 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Pre-render species maps in the background (once per server process)
+if CORE_MODULES_AVAILABLE:
+    start_background_warmup()
+
 # Initialize session state
 if 'page' not in st.session_state:
     st.session_state.page = 'home'   # default page
-if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+if 'conversation' not in st.session_state:
+    st.session_state.conversation = Conversation()   # bounded window + rolling summary
 if 'total_messages' not in st.session_state:
     st.session_state.total_messages = 0
 
-# Load ML Model for Risk Prediction
-@st.cache_resource
-def load_risk_model():
-    """Load the trained risk prediction model"""
-    try:
-        with open('./model/risk_model.pkl', 'rb') as f:
-            model = pickle.load(f)
-        return model
-    except FileNotFoundError:
-        st.warning("⚠️ Risk model file not found. Using fallback prediction logic.")
-        return None
-    except Exception as e:
-        st.error(f"❌ Error loading model: {str(e)}")
-        return None
-
 # Load Bird Data Functions
-@st.cache_data
 def load_bird_data():
     """Load actual bird data from your dataset"""
+    if CORE_MODULES_AVAILABLE:
+        # Shared, columnar-cached frame; invalidated when the CSV changes
+        try:
+            return load_train_metadata()
+        except Exception as e:
+            st.error(f"❌ Error loading bird data: {str(e)}")
+            return pd.DataFrame()
+    return _load_bird_data_fallback()
+
+@st.cache_data
+def _load_bird_data_fallback():
+    """Load the CSV directly, or sample data, when core modules are unavailable"""
     try:
-        if CORE_MODULES_AVAILABLE:
-            # Use your actual data loading function
-            df = load_train_metadata()
+        if os.path.exists('./birds/train_metadata.csv'):
+            df = pd.read_csv('./birds/train_metadata.csv')
             return df
         else:
-            # Try to load directly from CSV
-            if os.path.exists('./birds/train_metadata.csv'):
-                df = pd.read_csv('./birds/train_metadata.csv')
-                return df
-            else:
-                st.warning("⚠️ Bird data file not found. Using sample data.")
-                # Fallback sample data
-                return pd.DataFrame({
-                    'common_name': ['American Robin', 'Blue Jay', 'Cardinal', 'Sparrow', 'Owl'] * 20,
-                    'latitude': np.random.uniform(30, 45, 100),
-                    'longitude': np.random.uniform(-120, -70, 100),
-                    'risk_level': np.random.choice(['Low', 'Medium', 'High'], 100)
-                })
+            st.warning("⚠️ Bird data file not found. Using sample data.")
+            # Fallback sample data
+            return pd.DataFrame({
+                'common_name': ['American Robin', 'Blue Jay', 'Cardinal', 'Sparrow', 'Owl'] * 20,
+                'latitude': np.random.uniform(30, 45, 100),
+                'longitude': np.random.uniform(-120, -70, 100),
+                'risk_level': np.random.choice(['Low', 'Medium', 'High'], 100)
+            })
     except Exception as e:
         st.error(f"❌ Error loading bird data: {str(e)}")
         return pd.DataFrame()
@@ -270,7 +274,7 @@ def get_bird_scientific_name(bird_name):
     """Get scientific name for a bird species"""
     try:
         if CORE_MODULES_AVAILABLE:
-            return scientific_name(bird_name)
+            return scientific_name(bird_name, load_bird_data())
         else:
             # Fallback scientific names
             scientific_names = {
@@ -295,27 +299,9 @@ def get_bird_description(bird_name):
         return "Description not available"
 
 # Gemini Client Functions
-def get_gemini_client():
-    """Initialize and return Gemini client"""
-    try:
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            st.error("⚠️ Gemini API key not found in environment variables!")
-            return None
-        genai.configure(api_key=api_key)
-        return genai.GenerativeModel('gemini-1.5-flash')
-    except Exception as e:
-        st.error(f"❌ Error initializing Gemini: {str(e)}")
-        return None
+CHATBOT_MODEL = 'gemini-1.5-flash'
 
-def generate_ai_response(prompt, chat_history):
-    """Generate response using Gemini AI"""
-    try:
-        client = get_gemini_client()
-        if not client:
-            return " Cannot connect to Gemini. Please check your API key."
-
-        system_context = """You are the AI assistant for a Bird Conservation web app used by volunteers, students, and researchers.  
+CHATBOT_SYSTEM_CONTEXT = """You are the AI assistant for a Bird Conservation web app used by volunteers, students, and researchers.  
 
 Your goals:
 - Explain bird species (common/scientific names, ID tips, behavior, habitat, migration, calls, conservation status).  
@@ -339,80 +325,59 @@ Examples:
 - "Is it okay to move a nest?" → Explain legal/ethical concerns; suggest safe alternatives like barriers or reducing disturbance.  
 """
 
-        conversation = f"{system_context}\n\nUser: {prompt}"
+def get_gemini_client():
+    """Return the Gemini client shared by every session in this server process"""
+    try:
+        from core.llm_client import get_llm_client
+        return get_llm_client()
+    except Exception as e:
+        st.error(f"❌ Error initializing Gemini: {str(e)}")
+        return None
 
-        response = client.generate_content(conversation)
+def generate_ai_response(prompt, conversation=None):
+    """Generate response using Gemini AI; repeated questions are answered from the response cache"""
+    # Earlier turns ride along within the token budget; a first question is sent bare
+    contents = conversation.prompt_with_context(prompt) if conversation is not None else prompt
+    return get_response_cache().get_or_generate(
+        contents, CHATBOT_SYSTEM_CONTEXT, CHATBOT_MODEL, lambda: _generate_ai_response(contents)
+    )
 
-        # Safe text extraction
-        if hasattr(response, "text") and response.text:
-            return response.text.strip()
-        elif hasattr(response, "candidates") and response.candidates:
-            return response.candidates[0].content.parts[0].text.strip()
-        else:
-            return "⚠️ No response received from Gemini."
+def _generate_ai_response(prompt):
+    try:
+        client = get_gemini_client()
+        if not client:
+            return " Cannot connect to Gemini. Please check your API key."
+
+        response = client.generate(CHATBOT_MODEL, prompt, CHATBOT_SYSTEM_CONTEXT)
+        return response or "⚠️ No response received from Gemini."
 
     except Exception as e:
         return f"⚠️ Error generating response: {str(e)}"
 
+def generate_ai_response_stream(prompt, conversation=None):
+    """Streaming generate_ai_response: yields text chunks as Gemini produces them"""
+    contents = conversation.prompt_with_context(prompt) if conversation is not None else prompt
+    yield from get_response_cache().get_or_stream(
+        contents, CHATBOT_SYSTEM_CONTEXT, CHATBOT_MODEL, lambda: _generate_ai_response_stream(contents)
+    )
 
-import streamlit as st
-import joblib
-import pandas as pd
+def _generate_ai_response_stream(prompt):
+    client = get_gemini_client()
+    if not client:
+        yield " Cannot connect to Gemini. Please check your API key."
+        return
 
-@st.cache_resource
-def load_risk_model():
-    return joblib.load("model/risk_model.pkl")
+    produced = False
+    try:
+        for text in client.stream(CHATBOT_MODEL, prompt, CHATBOT_SYSTEM_CONTEXT):
+            produced = True
+            yield text
+    except Exception as e:
+        yield f"\n\n⚠️ Error generating response: {str(e)}" if produced else f"⚠️ Error generating response: {str(e)}"
+        return
+    if not produced:
+        yield "⚠️ No response received from Gemini."
 
-@st.cache_data
-def load_columns():
-    return joblib.load("model/risk_model_columns.pkl")
-
-def predict_risk_from_manual(
-    model,
-    all_cols,
-    egg_count,
-    chick_count,
-    habitat,
-    nest_stage,
-    human,
-    predator,
-    noise,
-):
-    row = {
-        "egg_count": egg_count,
-        "chick_count": chick_count,
-        f"habitat_type_{habitat}": 1,
-        f"nest_stage_{nest_stage}": 1,
-        f"human_disturbance_{human}": 1,
-        f"predator_signs_{predator}": 1,
-        f"noise_level_{noise}": 1,
-    }
-    df = pd.DataFrame([row])
-    for col in all_cols:
-        if col not in df.columns:
-            df[col] = 0
-    df = df[all_cols]
-    pred = model.predict(df)[0]
-    return pred
-
-def predict_nest_risk_fallback(params):
-    risk_score = 0
-    if params['human'] in ['Moderate', 'High']:
-        risk_score += 1
-    if params['predator'] in ['Moderate', 'High']:
-        risk_score += 1
-    if params['noise'] == 'Loud':
-        risk_score += 1
-    if params['habitat'] == 'Urban':
-        risk_score += 1
-    if params['egg_count'] > 5 or params['chick_count'] > 5:
-        risk_score += 1
-    if risk_score >= 3:
-        return 'High'
-    elif risk_score >= 1:
-        return 'Medium'
-    else:
-        return 'Low'
 
 # Sidebar Navigation
 with st.sidebar:
@@ -435,6 +400,9 @@ with st.sidebar:
             st.rerun()
 
 # Main content based on selected page
+# (slot, future, deadline) of a Gemini refinement to swap in once the page is drawn
+pending_refinement = None
+
 if st.session_state.page == 'home':
     # Home Page
     st.markdown("""
@@ -520,8 +488,20 @@ if st.session_state.page == 'home':
         """, unsafe_allow_html=True)
 
 elif st.session_state.page == 'risk':
-    risk_model = load_risk_model()
-    all_cols = load_columns()
+    # One consistent model version for this run; the registry swaps in a new file for the next one.
+    try:
+        risk_artifact = current_risk_model()
+        risk_model, all_cols = risk_artifact.model, risk_artifact.columns
+    except Exception as e:
+        st.warning(f"⚠️ Risk model could not be loaded ({e}). Using fallback prediction logic.")
+        risk_artifact = risk_model = all_cols = None
+    if risk_artifact is not None:
+        try:
+            # Packed NumPy forest: same predictions without sklearn's per-call overhead.
+            risk_model = load_compiled_forest(risk_artifact)
+        except (OSError, ValueError, BadZipFile) as e:
+            # Unwritable or damaged export (an .npz is a zip), or a model that is not a forest.
+            st.warning(f"⚠️ Compiled forest unavailable ({type(e).__name__}: {e}); serving the sklearn model.")
 
     st.markdown("""
     <div class="main-header">
@@ -529,6 +509,11 @@ elif st.session_state.page == 'risk':
         <p class="main-subtitle">Predict and mitigate nesting site risks using AI</p>
     </div>
     """, unsafe_allow_html=True)
+    if risk_artifact is not None:
+        reload_error = get_model_registry().errors().get("risk")
+        st.caption(f"Risk model version `{risk_artifact.version}`")
+        if reload_error:
+            st.warning(f"⚠️ The updated model file was rejected ({reload_error}); still serving version {risk_artifact.version}.")
 
     col1, col2 = st.columns([2, 1])
     with col1:
@@ -583,33 +568,39 @@ elif st.session_state.page == 'risk':
 
             # Get both predictions
             ml_prediction_ok = True
+            ml_start = time.perf_counter()
             try:
                 with st.spinner("🤖 Analyzing with ML model..."):
-                    raw_risk = predict_risk_from_manual(
-                        model=risk_model,
-                        all_cols=all_cols,
-                        egg_count=egg_count,
-                        chick_count=chick_count,
-                        habitat=habitat,
-                        nest_stage=nest_stage,
-                        human=human,
-                        predator=predator,
-                        noise=noise
-                    )
-                # Map raw prediction to risk level
-                if isinstance(raw_risk, (int, float)):
-                    if raw_risk >= 0.7:
-                        risk_ml = 'High'
-                    elif raw_risk >= 0.4:
-                        risk_ml = 'Medium'
-                    else:
-                        risk_ml = 'Low'
-                else:
-                    risk_ml = raw_risk
+                    ml_proba = ml_table = None
+                    if risk_artifact is not None:
+                        # Precomputed, calibrated probabilities for every form combination; one array index.
+                        try:
+                            ml_table = load_risk_table(risk_artifact)
+                        except Exception as e:
+                            st.warning(f"⚠️ Precomputed risk table could not be loaded ({type(e).__name__}: {e}); scoring with the model.")
+                        if ml_table is not None:
+                            try:
+                                ml_proba = ml_table.lookup_proba(**params)
+                            except KeyError:
+                                ml_proba = None  # outside the precomputed input space
+                    if ml_proba is None:
+                        ml_proba = calibrate(
+                            predict_proba_batch(risk_model, all_cols, [params]),
+                            risk_artifact.calibration if risk_artifact is not None else None,
+                        )[0]
+                # Most probable class; its probability is the model's confidence
+                ml_classes = [str(c) for c in risk_model.classes_]
+                risk_ml = ml_classes[int(np.argmax(ml_proba))]
+                ml_confidence = float(np.max(ml_proba))
             except Exception as e:
                 st.error(f"❌ Error with ML prediction: {str(e)}")
                 ml_prediction_ok = False
 
+            # Candidate model scores the same nest in the background; nothing waits for it.
+            shadow_scorer = get_shadow_scorer()
+            if ml_prediction_ok and shadow_scorer is not None:
+                shadow_scorer.submit([params], [risk_ml], risk_artifact.version, (time.perf_counter() - ml_start) * 1000)
+
             # ALWAYS run fallback prediction
             risk_fallback = predict_nest_risk_fallback(params)
 
@@ -646,100 +637,47 @@ elif st.session_state.page == 'risk':
                 </div>
                 """, unsafe_allow_html=True)
 
+            if ml_prediction_ok:
+                band = confidence_band(ml_confidence)
+                st.markdown(f"**🎯 ML model:** {risk_ml} risk, {band.lower()} confidence ({ml_confidence:.0%})")
+                for level in ('High', 'Medium', 'Low'):
+                    if level in ml_classes:
+                        p = float(ml_proba[ml_classes.index(level)])
+                        st.progress(min(max(p, 0.0), 1.0), text=f"{level}: {p:.0%}")
+                # Per-field drivers: precomputed in the risk table, else walked from the forest.
+                driver_fields, ml_drivers = None, None
+                if ml_table is not None and ml_table.drivers is not None:
+                    driver_fields, ml_drivers = ml_table.driver_fields, ml_table.lookup_drivers(**params)
+                else:
+                    try:
+                        driver_fields, _, ml_drivers = field_contributions(as_compiled(risk_model), all_cols, [params])
+                        ml_drivers = ml_drivers[0]
+                    except ValueError:
+                        pass  # not a tree ensemble: no drivers
+                if ml_drivers is not None:
+                    drivers_text = format_drivers(top_drivers(ml_drivers[:, ml_classes.index(risk_ml)], driver_fields))
+                    if drivers_text:
+                        st.markdown(f"**🔎 Top drivers toward {risk_ml}:** {drivers_text}")
+                st.caption(f"Class probabilities from model {risk_artifact.version} ({risk_artifact.calibration_note}).")
+
 
             # ==================
-            # Risk-Level-Based Recommendations
+            # Risk-Level-Based Recommendations (rule table in core/rules.py)
             # ==================
             st.markdown("### 💡 AI Recommendations")
-            recommendations = []
-
-            # Human Disturbance
-            if human in ['Moderate', 'High']:
-                if final_risk in ['High', 'Medium']:
-                    recommendations.append("🚧 Install protective barriers or signs to reduce human disturbance.")
-                    if habitat == 'Urban':
-                        recommendations.append("🏙️ For urban nests, consider temporary fencing and community outreach to keep people away.")
-                elif final_risk == 'Low' and human in ['Moderate', 'High']:
-                    recommendations.append("👀 Observe if human activity increases; mark the nest location for future monitoring.")
-            
-            # Predator Signs
-            if predator in ['Moderate', 'High']:
-                if final_risk in ['High', 'Medium']:
-                    recommendations.append("🛡️ Deploy non-lethal predator deterrents (reflectors, motion devices, decoys) around the nest.")
-                    if egg_count > 5 or chick_count > 5:
-                        recommendations.append("🥚🐣 Large clutches—monitor closely for overcrowding and predator activity.")
-                elif final_risk == 'Low' and predator in ['Moderate', 'High']:
-                    recommendations.append("👀 Be alert for new signs of predators.")
-            
-            # Noise Level
-            if noise == 'Loud':
-                if final_risk in ['High', 'Medium']:
-                    recommendations.append("🔇 Reduce noise during critical nesting times—coordinate with local authorities if possible.")
-                elif final_risk == 'Low' and noise == 'Loud':
-                    recommendations.append("👂 Monitor noise levels; document unusual changes for research.")
-
-            # Habitat-Specific
-            if habitat == 'Urban' and final_risk in ['High', 'Medium']:
-                recommendations.append("🏙️ For urban nests, use signage and temporary barriers to protect the site.")
-            elif habitat == 'Wetland' and final_risk in ['High', 'Medium']:
-                recommendations.append("🌊 For wetland nests, monitor water levels—prepare for possible relocation if flooding is likely.")
-            elif habitat == 'Coastal' and final_risk in ['High', 'Medium']:
-                recommendations.append("🌊 For coastal nests, prepare for sudden storms—have relocation supplies on hand.")
-            elif habitat == 'Grassland' and final_risk in ['High', 'Medium']:
-                recommendations.append("🌾 For grassland nests, mark the area and minimize foot traffic.")
-            elif habitat == 'Trees' and final_risk in ['High', 'Medium']:
-                recommendations.append("🌳 For tree nests, communicate with landowners to prevent logging during nesting.")
-            
-            # Nest Stage
-            if nest_stage == 'Eggs':
-                if final_risk in ['High', 'Medium']:
-                    recommendations.append("🥚 Minimize nest visits during incubation—stress can cause abandonment.")
-                elif final_risk == 'Low' and nest_stage == 'Eggs':
-                    recommendations.append("🥚 Schedule brief, discreet checks to monitor progress.")
-            elif nest_stage == 'Chicks':
-                if final_risk in ['High', 'Medium']:
-                    recommendations.append("🐣 Limit handling and observation time to avoid stressing parents.")
-                elif final_risk == 'Low' and nest_stage == 'Chicks':
-                    recommendations.append("🐣 Enjoy observing chicks from a safe distance.")
-            elif nest_stage == 'Building':
-                if final_risk in ['High', 'Medium']:
-                    recommendations.append("🪺 Avoid interfering with nest construction; observe from a distance.")
-                elif final_risk == 'Low' and nest_stage == 'Building':
-                    recommendations.append("🪺 Observe construction—your notes may help future nests.")
-            elif nest_stage == 'Failed':
-                if final_risk in ['High', 'Medium']:
-                    recommendations.append("⚰️ Record probable causes of failure for future prevention.")
-                elif final_risk == 'Low' and nest_stage == 'Failed':
-                    recommendations.append("🪹 Document the event; valuable for research.")
-            elif nest_stage == 'Empty':
-                if final_risk in ['High', 'Medium']:
-                    recommendations.append("🕊️ Record nest location and condition—inform conservationists if needed.")
-                elif final_risk == 'Low' and nest_stage == 'Empty':
-                    recommendations.append("🕊️ Log nest details—helpful for future monitoring.")
-
-            # Risk Level Actions
-            if final_risk == 'High':
-                recommendations.append("📞 Contact local wildlife authorities for immediate assistance.")
-                if egg_count > 5 or chick_count > 5:
-                    recommendations.append("🆘 Extra vigilance: Large clutches increase the need for secure, safe monitoring.")
-            elif final_risk == 'Medium':
-                recommendations.append("📅 Schedule regular check-ins—monitor for changes in nest condition.")
-                if egg_count > 5 or chick_count > 5:
-                    recommendations.append("👁️ Watch for overloading and consider reinforcing nest support if unstable.")
-            elif final_risk == 'Low':
-                recommendations.append("✨ Continue regular monitoring and document nest progress.")
-                if egg_count > 5 or chick_count > 5:
-                    recommendations.append("🥚🐣 Large clutch noted—useful for research.")
-        
-            # Always suggest these basic monitoring practices (for all risk levels)
-            recommendations.extend([
-                "📸 Document progress with periodic photos.",
-                "📊 Log environmental changes in your monitoring database."
-            ])
-
-            # Remove duplicates and display
-            for i, rec in enumerate(sorted(set(recommendations)), 1):
-                st.markdown(f"**{i}.** {rec}")
+
+            # Already deduplicated and sorted; a Gemini refinement replaces the list if it arrives in time
+            offline_recommendations = recommend("risk_page", final_risk, **params)
+            recommendations_slot = st.empty()
+            with recommendations_slot.container():
+                for i, rec in enumerate(offline_recommendations, 1):
+                    st.markdown(f"**{i}.** {rec}")
+            if refinement_available():
+                pending_refinement = (
+                    recommendations_slot,
+                    get_refinement_pool().submit(final_risk, params, offline_recommendations),
+                    time.monotonic() + REFINE_DEADLINE_S,
+                )
     with col2:
         st.markdown("""
         <div class="feature-card">
@@ -771,6 +709,74 @@ elif st.session_state.page == 'risk':
         </div>
         """, unsafe_allow_html=True)
 
+    # ==================
+    # Bulk Survey Upload
+    # ==================
+    st.markdown("""
+    <div class="feature-card">
+        <h3>📁 Bulk Survey Assessment</h3>
+        <p style="margin-bottom: 0;">Upload a CSV or Excel survey with the columns <code>habitat</code>, <code>nest_stage</code>,
+        <code>egg_count</code>, <code>chick_count</code>, <code>human</code>, <code>predator</code> and <code>noise</code>.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    survey_file = st.file_uploader("📤 Nest survey file", type=SURVEY_FILE_TYPES, key="bulk_survey_file")
+    if survey_file is not None and st.button("🔍 Score Survey", use_container_width=True, disabled=risk_model is None):
+        risk_table = None
+        if risk_artifact is not None:
+            try:
+                risk_table = load_risk_table(risk_artifact)
+            except Exception as e:
+                st.warning(f"⚠️ Precomputed risk table could not be loaded ({type(e).__name__}: {e}); scoring every row with the model.")
+
+        shadow_scorer = get_shadow_scorer()
+        shadow = None
+        if shadow_scorer is not None:
+            shadow = functools.partial(shadow_scorer.submit, primary_version=risk_artifact.version, source="bulk")
+
+        # One export per session: the previous one is deleted before scoring again.
+        previous_path = st.session_state.pop("bulk_result_path", None)
+        if previous_path and os.path.exists(previous_path):
+            os.remove(previous_path)
+        out_path = os.path.join(tempfile.gettempdir(), f"scored_{os.getpid()}_{int(time.time() * 1000)}.csv")
+        progress = st.progress(0.0, text="Scoring survey...")
+        summary = st.empty()
+        preview = st.empty()
+        counts = None
+        completed = False
+        try:
+            for scored, fraction in score_survey_file(
+                survey_file, survey_file.name, risk_model, all_cols, out_path,
+                risk_table=risk_table, shadow=shadow, calibration=risk_artifact.calibration,
+            ):
+                counts = summarize_counts(counts, scored)
+                progress.progress(fraction, text=f"Scored {counts['rows']:,} nests...")
+                summary.markdown(
+                    f"**🔴 High:** {counts['High']:,} &nbsp; **🟡 Medium:** {counts['Medium']:,} &nbsp; "
+                    f"**🟢 Low:** {counts['Low']:,} &nbsp; **⚠️ Invalid rows:** {counts['invalid']:,}"
+                )
+                preview.dataframe(scored.head(50), use_container_width=True)
+            progress.progress(1.0, text=f"✅ Scored {counts['rows'] if counts else 0:,} nests")
+            st.session_state.bulk_result_path = out_path
+            st.session_state.bulk_result_name = f"scored_{os.path.splitext(survey_file.name)[0]}.csv"
+            completed = True
+        except ValueError as e:
+            st.error(f"❌ {e}")
+        finally:
+            # Partial output of a failed survey is never offered for download.
+            if not completed and os.path.exists(out_path):
+                os.remove(out_path)
+
+    if st.session_state.get("bulk_result_path") and os.path.exists(st.session_state.bulk_result_path):
+        with open(st.session_state.bulk_result_path, "rb") as f:
+            st.download_button(
+                "⬇️ Download Scored Survey",
+                data=f,
+                file_name=st.session_state.bulk_result_name,
+                mime="text/csv",
+                use_container_width=True,
+            )
+
 
 elif st.session_state.page == 'chatbot':
     # AI Chatbot Page
@@ -784,42 +790,19 @@ elif st.session_state.page == 'chatbot':
     # Quick action buttons at the top
     st.markdown("### 🚀 Quick Questions")
     col1, col2, col3 = st.columns(3)
+    quick_prompt = None
 
     with col1:
         if st.button("🆔 Help identify a bird species", use_container_width=True):
             quick_prompt = "I need help identifying a bird species. What information should I provide for accurate identification?"
-            st.session_state.chat_history.append({"role": "user", "content": quick_prompt})
-            st.session_state.total_messages += 1
-            
-            # Generate AI response
-            with st.spinner("🤔 Thinking..."):
-                ai_response = generate_ai_response(quick_prompt, st.session_state.chat_history)
-                st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
-            st.rerun()
 
     with col2:
         if st.button("🏠 Ask about nesting behaviors", use_container_width=True):
             quick_prompt = "Tell me about bird nesting behaviors and what factors influence nesting site selection."
-            st.session_state.chat_history.append({"role": "user", "content": quick_prompt})
-            st.session_state.total_messages += 1
-            
-            # Generate AI response
-            with st.spinner("🤔 Thinking..."):
-                ai_response = generate_ai_response(quick_prompt, st.session_state.chat_history)
-                st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
-            st.rerun()
 
     with col3:
         if st.button("🌱 Conservation best practices", use_container_width=True):
             quick_prompt = "What are the most effective bird conservation strategies and best practices for field researchers?"
-            st.session_state.chat_history.append({"role": "user", "content": quick_prompt})
-            st.session_state.total_messages += 1
-            
-            # Generate AI response
-            with st.spinner("🤔 Thinking..."):
-                ai_response = generate_ai_response(quick_prompt, st.session_state.chat_history)
-                st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
-            st.rerun()
 
     # Chat interface
     st.markdown("""
@@ -838,34 +821,51 @@ elif st.session_state.page == 'chatbot':
         </div>
         """, unsafe_allow_html=True)
 
-    # Display chat history
-    for message in st.session_state.chat_history:
+    response_stats = get_response_cache().stats()
+    st.caption(
+        f"🗂️ Answer cache: {response_stats['entries']} answers, {response_stats['hit_rate']:.0%} hits "
+        f"({response_stats['hits']} hits / {response_stats['misses']} misses), "
+        f"{response_stats['expired']} expired, {response_stats['evictions']} evictions"
+    )
+
+    # Display chat history (only the most recent messages are rendered)
+    conversation = st.session_state.conversation
+    hidden = conversation.hidden_count()
+    if hidden:
+        st.caption(f"🗂️ {hidden} earlier messages hidden; they are summarized for the assistant's context.")
+    for message in conversation.visible():
         with st.chat_message(message["role"]):
             if message["role"] == "user":
                 st.markdown(f"**You:** {message['content']}")
             else:
                 st.markdown(message['content'])
 
-    # Chat input
-    if prompt := st.chat_input("Ask about birds, conservation, habitats, or research methods..."):
-        # Add user message to history
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
-        st.session_state.total_messages += 1
-
+    # Chat input (quick questions are answered the same way, below the history)
+    if prompt := st.chat_input("Ask about birds, conservation, habitats, or research methods...") or quick_prompt:
         with st.chat_message("user"):
             st.markdown(f"**You:** {prompt}")
 
-        # Generate AI response
+        # Stream the AI response into the message as it is generated; context is built
+        # from the turns before this prompt
         with st.chat_message("assistant"):
-            with st.spinner("🤔 Thinking..."):
-                response = generate_ai_response(prompt, st.session_state.chat_history)
-                st.markdown(response)
-                
-                # Add assistant response to history
-                st.session_state.chat_history.append({"role": "assistant", "content": response})
+            response = st.write_stream(generate_ai_response_stream(prompt, conversation))
+
+        # Add both messages to history
+        conversation.append("user", prompt)
+        conversation.append("assistant", response)
+        st.session_state.total_messages += 1
 
 elif st.session_state.page == 'viz':
     # Visualization Page - INTEGRATED WITH YOUR BIRDS FOLDER
+    import folium
+    from streamlit_folium import st_folium
+    try:
+        from birds.helper_original import scientific_n
+        BIRDS_MODULE_AVAILABLE = True
+    except ImportError:
+        BIRDS_MODULE_AVAILABLE = False
+        st.warning("Birds module not found. Using fallback visualization methods.")
+
     st.markdown("""
     <div class="main-header">
         <h1 class="main-title">📊 Data Visualizations</h1>
@@ -894,79 +894,7 @@ elif st.session_state.page == 'viz':
 
         bird_species = st.selectbox(
             "🐦 Select Species",
-            [
-    "Ashy Drongo",
-    "Asian Brown Flycatcher",
-    "Asian Koel",
-    "Barn Swallow",
-    "Black Drongo",
-    "Black Kite",
-    "Black-crowned Night-Heron",
-    "Black-hooded Oriole",
-    "Black-naped Monarch",
-    "Black-winged Kite",
-    "Black-winged Stilt",
-    "Blyth's Reed Warbler",
-    "Bronzed Drongo",
-    "Brown Boobook",
-    "Brown Shrike",
-    "Cattle Egret",
-    "Common Greenshank",
-    "Common Iora",
-    "Common Kingfisher",
-    "Common Myna",
-    "Common Rosefinch",
-    "Common Sandpiper",
-    "Common Tailorbird",
-    "Coppersmith Barbet",
-    "Crested Serpent-Eagle",
-    "Eurasian Collared-Dove",
-    "Eurasian Coot",
-    "Eurasian Hoopoe",
-    "Eurasian Marsh-Harrier",
-    "Eurasian Moorhen",
-    "Garganey",
-    "Glossy Ibis",
-    "Gray Heron",
-    "Gray Wagtail",
-    "Gray-breasted Prinia",
-    "Gray-headed Canary-Flycatcher",
-    "Great Egret",
-    "Greater Coucal",
-    "Greater Racket-tailed Drongo",
-    "Green Sandpiper",
-    "Green Warbler",
-    "Greenish Warbler",
-    "House Crow",
-    "House Sparrow",
-    "Kentish Plover",
-    "Large-billed Crow",
-    "Laughing Dove",
-    "Little Egret",
-    "Little Grebe",
-    "Little Ringed Plover",
-    "Pied Kingfisher",
-    "Plain Prinia",
-    "Puff-throated Babbler",
-    "Purple Heron",
-    "Purple Sunbird",
-    "Red-rumped Swallow",
-    "Red-wattled Lapwing",
-    "Red-whiskered Bulbul",
-    "Rock Pigeon",
-    "Rose-ringed Parakeet",
-    "Rufous Treepie",
-    "Scaly-breasted Munia",
-    "Spotted Dove",
-    "Stork-billed Kingfisher",
-    "Tickell's Blue Flycatcher",
-    "Western Yellow Wagtail",
-    "Whiskered Tern",
-    "White-breasted Waterhen",
-    "White-throated Kingfisher",
-    "Wood Sandpiper",
-    "Zitting Cisticola"
-],
+            SPECIES if CORE_MODULES_AVAILABLE else available_species,
             help="Choose a bird species to analyze"
         )
 
@@ -985,6 +913,13 @@ elif st.session_state.page == 'viz':
         if date_columns:
             use_date_filter = st.checkbox("📅 Filter by Date Range")
 
+        if CORE_MODULES_AVAILABLE:
+            cache_stats = get_render_cache().stats()
+            st.caption(
+                f"🗂️ Map cache: {cache_stats['entries']} maps, {cache_stats['bytes'] / 1e6:.1f} MB, "
+                f"{cache_stats['hit_rate']:.0%} hits ({cache_stats['disk_hits']} from disk), {cache_stats['evictions']} evictions"
+            )
+
     with col1:
         if viz_type == "Species Information":
             st.markdown("""
@@ -1025,7 +960,10 @@ elif st.session_state.page == 'viz':
             if 'latitude' in df.columns and 'longitude' in df.columns:
                 # Filter data for selected species
                 if 'common_name' in df.columns:
-                    species_data = df[df['common_name'] == bird_species]
+                    if CORE_MODULES_AVAILABLE:
+                        species_data = species_index_for(df).rows(bird_species)
+                    else:
+                        species_data = df[df['common_name'] == bird_species]
                 else:
                     species_data = df
                 
@@ -1033,7 +971,7 @@ elif st.session_state.page == 'viz':
                     # Use your existing heatmap function if available
                     if CORE_MODULES_AVAILABLE:
                         try:
-                            heatmap_folium(bird_species, df, width=800)
+                            heatmap_folium(bird_species, df, width=800, show_markers=show_markers)
                         except Exception as e:
                             st.error(f"Error creating heatmap: {e}")
                             # Fallback to simple map
@@ -1048,7 +986,7 @@ elif st.session_state.page == 'viz':
                             
                             # Add heatmap
                             from folium.plugins import HeatMap
-                            heat_data = [[row['latitude'], row['longitude']] for idx, row in species_data.iterrows()]
+                            heat_data = bin_coordinates(species_data['latitude'], species_data['longitude'], zoom=6).tolist()
                             HeatMap(heat_data, radius=15, blur=10, max_zoom=1).add_to(m)
                             
                             st_folium(m, width=800, height=500)
@@ -1065,7 +1003,7 @@ elif st.session_state.page == 'viz':
                         
                         # Add heatmap
                         from folium.plugins import HeatMap
-                        heat_data = [[row['latitude'], row['longitude']] for idx, row in species_data.iterrows()]
+                        heat_data = species_data[['latitude', 'longitude']].to_numpy(dtype=float).tolist()
                         HeatMap(heat_data, radius=15, blur=10, max_zoom=1).add_to(m)
                         
                         # Add markers if requested
@@ -1093,7 +1031,10 @@ elif st.session_state.page == 'viz':
             # Check if we have geographic data
             if 'latitude' in df.columns and 'longitude' in df.columns:
                 if 'common_name' in df.columns:
-                    species_data = df[df['common_name'] == bird_species]
+                    if CORE_MODULES_AVAILABLE:
+                        species_data = species_index_for(df).rows(bird_species)
+                    else:
+                        species_data = df[df['common_name'] == bird_species]
                 else:
                     species_data = df
                 
@@ -1101,15 +1042,26 @@ elif st.session_state.page == 'viz':
                     # Use your existing 3D visualization if available
                     if CORE_MODULES_AVAILABLE:
                         try:
-                            deck = map_3d_deck(bird_species, df)
+                            deck = cached_deck(bird_species, df)
                             if deck is not None:
                                 st.pydeck_chart(deck)
                             else:
                                 st.info("Not enough coordinate data for 3D visualization")
+
+                            stats = species_stats(bird_species, df)
+                            if stats is not None:
+                                col_a, col_b, col_c = st.columns(3)
+                                with col_a:
+                                    st.metric("Observation Points", stats["count"])
+                                with col_b:
+                                    st.metric("Latitude Range", f"{stats['lat_range']:.2f}°")
+                                with col_c:
+                                    st.metric("Longitude Range", f"{stats['lon_range']:.2f}°")
                         except Exception as e:
                             st.error(f"Error creating 3D map: {e}")
                     else:
                         # Create scatter plot as fallback
+                        import plotly.express as px
                         fig = px.scatter_mapbox(
                             species_data,
                             lat="latitude",
@@ -1147,4 +1099,13 @@ st.markdown("""
     <p>🕊️ Birds Risk Predictor | Powered by Advanced Machine Learning</p>
     <p>Built for researchers, conservationists, and field volunteers worldwide</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Wait for background refinement last, so the rest of the page is already on screen
+if pending_refinement is not None:
+    recommendations_slot, refinement, deadline = pending_refinement
+    refined = wait_for_refinement(refinement, deadline)
+    if refined:
+        with recommendations_slot.container():
+            st.markdown(refined)
+            st.caption("✨ Refined by Gemini from the offline recommendations.")
@@ -0,0 +1,58 @@
+"""
+Time to first visible text for the chatbot, blocking versus streaming, against
+the offline fake Gemini clients (no API key or network needed). The response
+cache is bypassed so every call reaches the client.
+
+Run from the repository root:
+    python -m benchmarks.bench_chat_stream --first-token 0.8 --chunk-delay 0.05
+"""
+import argparse
+import time
+
+from core.chat import SYSTEM_PROMPT, _generate_reply, _generate_reply_stream
+from core.fake_llm import FakeGenaiClient, FakeGenerativeAIModule
+from core.llm_client import LLMClient, _load_types
+
+QUESTION = "How can I reduce risk for a wetland nest with disturbance?"
+
+
+def timed_blocking(call) -> tuple[float, float]:
+    start = time.perf_counter()
+    call()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+def timed_stream(pieces) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    for _ in pieces:
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--first-token", type=float, default=0.8, help="seconds before the first chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="seconds between chunks")
+    parser.add_argument("--chunk-chars", type=int, default=24)
+    args = parser.parse_args()
+
+    options = dict(first_token_delay=args.first_token, chunk_delay=args.chunk_delay, chunk_chars=args.chunk_chars)
+    genai_client = LLMClient("genai", FakeGenaiClient(**options), _load_types())
+    legacy_client = LLMClient("generativeai", FakeGenerativeAIModule(**options))
+
+    rows = [
+        ("google-genai blocking", timed_blocking(lambda: _generate_reply(genai_client, QUESTION))),
+        ("google-genai streaming", timed_stream(_generate_reply_stream(genai_client, QUESTION))),
+        ("generativeai blocking", timed_blocking(lambda: legacy_client.generate("m", QUESTION, SYSTEM_PROMPT))),
+        ("generativeai streaming", timed_stream(legacy_client.stream("m", QUESTION, SYSTEM_PROMPT))),
+    ]
+    print(f"{'path':<24} {'first text s':>12} {'complete s':>11}")
+    for name, (first, total) in rows:
+        print(f"{name:<24} {first:>12.3f} {total:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
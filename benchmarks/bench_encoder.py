@@ -0,0 +1,87 @@
+"""
+core.model.RiskEncoder against the previous per-request encoding (f-string
+column names -> dict -> one-row DataFrame -> reindex on the model columns):
+times one-row and batch encoding and measures peak bytes allocated per
+one-row encode with tracemalloc. legacy_row is also the reference for
+tests/test_encoder.py, which checks the two agree.
+
+Run from the repository root:
+    python -m benchmarks.bench_encoder
+"""
+import argparse
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import random_nest_frame
+from core.model import COLUMNS_PATH, RiskEncoder
+from core.risk_table import input_grid
+
+
+def legacy_row(all_cols, egg_count, chick_count, habitat, nest_stage, human, predator, noise) -> pd.DataFrame:
+    """The encoding predict_risk_from_manual used before RiskEncoder."""
+    row = {
+        "egg_count": egg_count,
+        "chick_count": chick_count,
+        f"habitat_type_{habitat}": 1,
+        f"nest_stage_{nest_stage}": 1,
+        f"human_disturbance_{human}": 1,
+        f"predator_signs_{predator}": 1,
+        f"noise_level_{noise}": 1,
+    }
+    df = pd.DataFrame([row])
+    for col in all_cols:
+        if col not in df.columns:
+            df[col] = 0
+    return df[all_cols]
+
+
+def per_call(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def peak_allocated(fn, calls: int = 20) -> int:
+    """Largest number of bytes held at once during a single call (tracemalloc peak over baseline)."""
+    fn()
+    tracemalloc.start()
+    worst = 0
+    for _ in range(calls):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        worst = max(worst, tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000, help="one-row encodes timed per path")
+    parser.add_argument("--rows", type=int, default=100_000, help="batch size")
+    args = parser.parse_args()
+
+    all_cols = joblib.load(COLUMNS_PATH)
+    encoder = RiskEncoder(all_cols)
+
+    nest = input_grid().sample(1, random_state=0).to_dict("records")[0]
+    legacy_s = per_call(lambda: legacy_row(all_cols, **nest), args.calls // 4)
+    encoder_s = per_call(lambda: encoder.encode_one(**nest), args.calls)
+    print(f"one-row encode: legacy {legacy_s * 1e6:,.1f} us, encoder {encoder_s * 1e6:,.2f} us "
+          f"({legacy_s / encoder_s:,.0f}x)")
+    print(f"peak bytes allocated per one-row encode: legacy {peak_allocated(lambda: legacy_row(all_cols, **nest)):,}, "
+          f"encoder {peak_allocated(lambda: encoder.encode_one(**nest)):,}")
+
+    frame = random_nest_frame(args.rows)
+    out = np.empty((args.rows, encoder.n_features), dtype=np.float32)
+    batch_s = per_call(lambda: encoder.encode_batch(frame, out=out), 5)
+    print(f"batch encode: {args.rows:,} nests in {batch_s * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Tree-path (Saabas) drivers from core.forest / core.explain: checks that bias
+plus contributions reproduces predict_proba on every risk-form combination,
+cross-checks a sample against contributions walked independently with
+sklearn's decision_path, and checks that the risk table's precomputed drivers
+match the direct computation. Then times drivers for one nest (table lookup
+vs direct) and for a survey batch. Exits non-zero on any mismatch.
+
+Run from the repository root:
+    python -m benchmarks.bench_explain
+"""
+import argparse
+import sys
+import time
+
+import joblib
+import numpy as np
+
+from benchmarks.common import random_nest_frame
+from core.explain import field_contributions
+from core.forest import CompiledForest
+from core.model import COLUMNS_PATH, MODEL_PATH, encode_risk_inputs
+from core.risk_table import input_grid, open_risk_table
+
+
+def sklearn_contributions(model, X: np.ndarray) -> np.ndarray:
+    """Saabas contributions (rows, features, classes) from each tree's decision_path."""
+    out = np.zeros((len(X), X.shape[1], len(model.classes_)))
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :] / tree.value[:, 0, :].sum(axis=1, keepdims=True)
+        paths = estimator.decision_path(X)
+        for row in range(len(X)):
+            nodes = paths.indices[paths.indptr[row]:paths.indptr[row + 1]]
+            for parent, child in zip(nodes[:-1], nodes[1:]):
+                out[row, tree.feature[parent]] += value[child] - value[parent]
+    return out / len(model.estimators_)
+
+
+def per_call(fn, min_seconds: float = 0.5) -> float:
+    """Mean seconds per call, repeating for at least min_seconds."""
+    fn()
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sample", type=int, default=300, help="nests cross-checked against decision_path")
+    parser.add_argument("--rows", type=int, default=10_000, help="survey batch size")
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_PATH)
+    all_cols = joblib.load(COLUMNS_PATH)
+    forest = CompiledForest.from_model(model)
+    grid = input_grid()
+
+    X = encode_risk_inputs(all_cols, grid).to_numpy(dtype=np.float32)
+    bias, contrib = forest.contributions(X)
+    sum_error = float(np.abs(bias + contrib.sum(axis=1) - model.predict_proba(X)).max())
+    print(f"input space: {len(X):,} rows, max |bias + contributions - predict_proba| = {sum_error:.1e}")
+
+    rows = np.random.default_rng(0).choice(len(X), size=args.sample, replace=False)
+    path_error = float(np.abs(contrib[rows] - sklearn_contributions(model, X[rows])).max())
+    print(f"decision_path cross-check: {args.sample} rows, max difference {path_error:.1e}")
+
+    table = open_risk_table()
+    names, _, fields = field_contributions(forest, all_cols, grid.iloc[rows])
+    _, found, table_drivers = table.lookup_batch(grid.iloc[rows], with_drivers=True)
+    # The table stores float32.
+    table_error = float(np.abs(table_drivers - fields).max()) if found.all() else np.inf
+    print(f"risk table drivers: {len(names)} fields, max difference {table_error:.1e}")
+
+    nest = grid.iloc[int(rows[0])].to_dict()
+    lookup_s = per_call(lambda: table.lookup_drivers(**nest))
+    direct_s = per_call(lambda: field_contributions(forest, all_cols, [nest]))
+    print(f"one nest: table lookup {lookup_s * 1e6:,.1f} us, direct {direct_s * 1000:.2f} ms")
+
+    frame = random_nest_frame(args.rows)
+    table_batch_s = per_call(lambda: table.lookup_batch(frame, with_drivers=True))
+    direct_batch_s = per_call(lambda: field_contributions(forest, all_cols, frame), min_seconds=1.0)
+    print(f"{args.rows:,} nests: table lookup {table_batch_s * 1000:.1f} ms, direct {direct_batch_s * 1000:.1f} ms")
+
+    sys.exit(1 if sum_error > 1e-9 or path_error > 1e-9 or table_error > 1e-6 else 0)
+
+
+if __name__ == "__main__":
+    main()
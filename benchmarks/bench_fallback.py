@@ -0,0 +1,39 @@
+"""
+Times predict_nest_risk_fallback_batch against a loop over the scalar
+predict_nest_risk_fallback on synthetic nests, for a DataFrame and for plain
+column arrays. Equivalence of the two is covered by tests/test_fallback.py.
+
+Run from the repository root:
+    python -m benchmarks.bench_fallback --rows 1000000
+"""
+import argparse
+import time
+
+from benchmarks.common import random_nest_frame
+from core.model import predict_nest_risk_fallback, predict_nest_risk_fallback_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    nests = random_nest_frame(args.rows)
+    records = nests.to_dict("records")
+    start = time.perf_counter()
+    [predict_nest_risk_fallback(row) for row in records]
+    scalar_s = time.perf_counter() - start
+    start = time.perf_counter()
+    predict_nest_risk_fallback_batch(nests)
+    batch_s = time.perf_counter() - start
+    columns = {field: nests[field].to_numpy() for field in nests.columns}
+    start = time.perf_counter()
+    predict_nest_risk_fallback_batch(columns)
+    columns_s = time.perf_counter() - start
+
+    print(f"{args.rows:,} nests: scalar loop {scalar_s:.2f} s, batch (DataFrame) {batch_s:.3f} s, "
+          f"batch (arrays) {columns_s:.3f} s, {scalar_s / batch_s:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Times core.forest's compiled evaluator against the sklearn forest in
+risk_model.pkl at batch sizes 1, 100 and 100k on encoded feature matrices.
+Bit-exact agreement is covered by tests/test_forest.py.
+
+Run from the repository root:
+    python -m benchmarks.bench_forest
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+
+from benchmarks.common import random_nest_frame
+from core.forest import CompiledForest
+from core.model import COLUMNS_PATH, MODEL_PATH, encode_risk_inputs
+
+
+def per_call(fn, min_seconds: float = 0.5) -> float:
+    """Mean seconds per call, repeating for at least min_seconds."""
+    fn()
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 100_000])
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_PATH)
+    all_cols = joblib.load(COLUMNS_PATH)
+    forest = CompiledForest.from_model(model)
+
+    print(f"{'rows':>8} {'sklearn ms':>12} {'compiled ms':>12} {'speed-up':>9}")
+    for size in args.sizes:
+        batch = encode_risk_inputs(all_cols, random_nest_frame(size, seed=size)).to_numpy(dtype=np.float32)
+        sk = per_call(lambda: model.predict(batch))
+        compiled = per_call(lambda: forest.predict(batch))
+        print(f"{size:>8,} {sk * 1000:>12.3f} {compiled * 1000:>12.3f} {sk / compiled:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
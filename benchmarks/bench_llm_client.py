@@ -0,0 +1,75 @@
+"""
+The shared Gemini client (core.llm_client) against the local fake Gemini server,
+through the real google-genai SDK: request coalescing, the concurrency limit,
+admission control and retries.
+
+Run from the repository root:
+    python -m benchmarks.bench_llm_client --sessions 30 --concurrency 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import llm_client
+from core.fake_llm import FakeGenaiClient, FakeGeminiServer, FakeLLM
+from core.llm_client import LLMClient, LLMOverloaded, _genai_client, _load_types
+
+QUICK_PROMPT = "Tell me about bird nesting behaviors and what factors influence nesting site selection."
+
+
+def burst(client: LLMClient, prompts: list[str], stream: bool) -> tuple[float, int, int]:
+    """Sends every prompt at once from its own thread; returns (seconds, answered, rejected)."""
+    def ask(prompt):
+        try:
+            if stream:
+                return bool("".join(client.stream("gemini-1.5-flash", prompt)))
+            return bool(client.generate("gemini-1.5-flash", prompt))
+        except LLMOverloaded:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+        results = list(pool.map(ask, prompts))
+    return time.perf_counter() - start, sum(r is True for r in results), sum(r is None for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=30, help="simultaneous chat sessions")
+    parser.add_argument("--concurrency", type=int, default=8, help="client request slots")
+    parser.add_argument("--queue", type=int, default=8, help="requests allowed to wait for a slot")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake first-token latency, seconds")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(FakeLLM(first_token_delay=args.latency, chunk_delay=0.01)).start()
+    llm_client.LLM_BASE_URL = server.base_url
+    types = _load_types()
+    sdk_client = _genai_client("offline-benchmark-key", types)
+
+    def client(**options) -> LLMClient:
+        options = dict(dict(max_concurrency=args.concurrency, max_queue=args.sessions, rate_per_min=0), **options)
+        return LLMClient("genai", sdk_client, types, **options)
+
+    print(f"{'scenario':<44} {'seconds':>8} {'answered':>9} {'rejected':>9} {'upstream':>9}")
+
+    def report(name, make_client, prompts, stream=False):
+        before = server.requests
+        seconds, answered, rejected = burst(make_client, prompts, stream)
+        print(f"{name:<44} {seconds:>8.2f} {answered:>9} {rejected:>9} {server.requests - before:>9}")
+
+    same = [QUICK_PROMPT] * args.sessions
+    distinct = [f"{QUICK_PROMPT} ({i})" for i in range(args.sessions)]
+    report("same quick prompt, no coalescing", client(coalesce=False), same)
+    report("same quick prompt, coalesced", client(), same)
+    report("same quick prompt, coalesced stream", client(), same, stream=True)
+    report("distinct prompts, unbounded queue", client(), distinct)
+    report(f"distinct prompts, queue of {args.queue}", client(max_queue=args.queue), distinct)
+
+    flaky = LLMClient("genai", FakeGenaiClient(first_token_delay=0.0, chunk_delay=0.0, fail_first=2), types, backoff_s=0.05)
+    text = flaky.generate("m", QUICK_PROMPT)
+    print(f"two connection resets: {'recovered' if text else 'failed'} after {flaky.stats()['retries']} retries")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
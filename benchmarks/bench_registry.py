@@ -0,0 +1,109 @@
+"""
+Hot reload in core.registry under load: worker threads keep scoring nests while
+the model file is replaced on disk, first by a retrained model and then by a
+truncated (half-written) file. Checks that no prediction fails, that the new
+version is served within the poll interval, and that the broken file is
+rejected while the previous version keeps serving. Also times registry.get().
+
+Run from the repository root:
+    python -m benchmarks.bench_registry --workers 4 --seconds 3
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+
+from benchmarks.common import random_nest_frame
+from core.model import COLUMNS_PATH, MODEL_PATH, encode_risk_inputs, predict_risk_batch
+from core.registry import ModelRegistry
+
+
+def replace_atomically(path: str, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0, help="scoring time per phase")
+    parser.add_argument("--poll", type=float, default=0.2, help="registry poll interval, seconds")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="registry_bench_")
+    model_path = os.path.join(workdir, "risk_model.pkl")
+    columns_path = os.path.join(workdir, "risk_model_columns.pkl")
+    shutil.copy(MODEL_PATH, model_path)
+    shutil.copy(COLUMNS_PATH, columns_path)
+
+    registry = ModelRegistry(poll_s=args.poll)
+    registry.register("risk", model_path, columns_path)
+    original = registry.get("risk")
+
+    nests = random_nest_frame(200, seed=1)
+    retrained = RandomForestClassifier(n_estimators=5, random_state=0)
+    retrained.fit(encode_risk_inputs(original.columns, nests), predict_risk_batch(original.model, original.columns, nests)[::-1])
+    retrained_path = os.path.join(workdir, "retrained.pkl")
+    joblib.dump(retrained, retrained_path)
+    with open(retrained_path, "rb") as f:
+        retrained_bytes = f.read()
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        registry.get("risk")
+    per_get = (time.perf_counter() - start) / 100_000
+    print(f"registry.get(): {per_get * 1e6:.2f} us per call")
+
+    stop = threading.Event()
+    failures, served = [], {}
+    lock = threading.Lock()
+
+    def worker():
+        while not stop.is_set():
+            loaded = registry.get("risk")
+            try:
+                predict_risk_batch(loaded.model, loaded.columns, nests)
+            except Exception as e:
+                failures.append(repr(e))
+            with lock:
+                served[loaded.version] = served.get(loaded.version, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+
+    replace_atomically(model_path, retrained_bytes)
+    swapped_at = time.perf_counter()
+    while registry.get("risk").version == original.version:
+        time.sleep(0.01)
+    swap_s = time.perf_counter() - swapped_at
+    new_version = registry.get("risk").version
+    time.sleep(args.seconds)
+
+    replace_atomically(model_path, retrained_bytes[: len(retrained_bytes) // 2])
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    error = registry.errors().get("risk")
+    print(f"swap {original.version} -> {new_version} served after {swap_s:.2f} s (poll {args.poll} s)")
+    print(f"batches scored per version: {served}")
+    print(f"half-written file: {'rejected, still serving ' + registry.get('risk').version if error else 'NOT rejected'}")
+    print(f"prediction failures: {len(failures)}")
+    shutil.rmtree(workdir, ignore_errors=True)
+    ok = not failures and error and registry.get("risk").version == new_version
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Rows/second of predict_risk_batch versus calling predict_risk_from_manual in a loop.
+
+Run from the repository root:
+    python -m benchmarks.bench_risk_batch --rows 5000
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+
+from core.model import COLUMNS_PATH, MODEL_PATH, predict_risk_batch, predict_risk_from_manual
+from benchmarks.common import random_nests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--loop-rows", type=int, default=500, help="rows scored through the single-row path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_PATH)
+    all_cols = joblib.load(COLUMNS_PATH)
+    records = random_nests(args.rows, seed=args.seed)
+    loop_records = records[: args.loop_rows]
+
+    start = time.perf_counter()
+    single = [predict_risk_from_manual(model, all_cols, **r) for r in loop_records]
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = predict_risk_batch(model, all_cols, records)
+    batch_s = time.perf_counter() - start
+
+    if not np.array_equal(np.asarray(single, dtype=object), batch[: len(single)]):
+        raise SystemExit("predict_risk_batch disagrees with predict_risk_from_manual")
+
+    loop_rate = len(loop_records) / loop_s
+    batch_rate = len(records) / batch_s
+    print(f"single-row loop : {len(loop_records):>8} rows  {loop_rate:>12,.0f} rows/s")
+    print(f"batch           : {len(records):>8} rows  {batch_rate:>12,.0f} rows/s")
+    print(f"speed-up        : {batch_rate / loop_rate:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
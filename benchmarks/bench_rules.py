@@ -0,0 +1,203 @@
+"""
+Times the compiled rule table (core.rules) against the if/elif implementations
+it replaced on a batch. The legacy implementations below are also the
+reference for tests/test_rules.py, which checks the two agree.
+
+Run from the repository root:
+    python -m benchmarks.bench_rules --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import random_nest_frame
+from core.rules import RULESETS
+
+
+def legacy_page_recommendations(final_risk, habitat, nest_stage, egg_count, chick_count, human, predator, noise):
+    """The Risk page's former inline rules, ending in sorted(set(...))."""
+    recommendations = []
+
+    # Human Disturbance
+    if human in ['Moderate', 'High']:
+        if final_risk in ['High', 'Medium']:
+            recommendations.append("🚧 Install protective barriers or signs to reduce human disturbance.")
+            if habitat == 'Urban':
+                recommendations.append("🏙️ For urban nests, consider temporary fencing and community outreach to keep people away.")
+        elif final_risk == 'Low' and human in ['Moderate', 'High']:
+            recommendations.append("👀 Observe if human activity increases; mark the nest location for future monitoring.")
+
+    # Predator Signs
+    if predator in ['Moderate', 'High']:
+        if final_risk in ['High', 'Medium']:
+            recommendations.append("🛡️ Deploy non-lethal predator deterrents (reflectors, motion devices, decoys) around the nest.")
+            if egg_count > 5 or chick_count > 5:
+                recommendations.append("🥚🐣 Large clutches—monitor closely for overcrowding and predator activity.")
+        elif final_risk == 'Low' and predator in ['Moderate', 'High']:
+            recommendations.append("👀 Be alert for new signs of predators.")
+
+    # Noise Level
+    if noise == 'Loud':
+        if final_risk in ['High', 'Medium']:
+            recommendations.append("🔇 Reduce noise during critical nesting times—coordinate with local authorities if possible.")
+        elif final_risk == 'Low' and noise == 'Loud':
+            recommendations.append("👂 Monitor noise levels; document unusual changes for research.")
+
+    # Habitat-Specific
+    if habitat == 'Urban' and final_risk in ['High', 'Medium']:
+        recommendations.append("🏙️ For urban nests, use signage and temporary barriers to protect the site.")
+    elif habitat == 'Wetland' and final_risk in ['High', 'Medium']:
+        recommendations.append("🌊 For wetland nests, monitor water levels—prepare for possible relocation if flooding is likely.")
+    elif habitat == 'Coastal' and final_risk in ['High', 'Medium']:
+        recommendations.append("🌊 For coastal nests, prepare for sudden storms—have relocation supplies on hand.")
+    elif habitat == 'Grassland' and final_risk in ['High', 'Medium']:
+        recommendations.append("🌾 For grassland nests, mark the area and minimize foot traffic.")
+    elif habitat == 'Trees' and final_risk in ['High', 'Medium']:
+        recommendations.append("🌳 For tree nests, communicate with landowners to prevent logging during nesting.")
+
+    # Nest Stage
+    if nest_stage == 'Eggs':
+        if final_risk in ['High', 'Medium']:
+            recommendations.append("🥚 Minimize nest visits during incubation—stress can cause abandonment.")
+        elif final_risk == 'Low' and nest_stage == 'Eggs':
+            recommendations.append("🥚 Schedule brief, discreet checks to monitor progress.")
+    elif nest_stage == 'Chicks':
+        if final_risk in ['High', 'Medium']:
+            recommendations.append("🐣 Limit handling and observation time to avoid stressing parents.")
+        elif final_risk == 'Low' and nest_stage == 'Chicks':
+            recommendations.append("🐣 Enjoy observing chicks from a safe distance.")
+    elif nest_stage == 'Building':
+        if final_risk in ['High', 'Medium']:
+            recommendations.append("🪺 Avoid interfering with nest construction; observe from a distance.")
+        elif final_risk == 'Low' and nest_stage == 'Building':
+            recommendations.append("🪺 Observe construction—your notes may help future nests.")
+    elif nest_stage == 'Failed':
+        if final_risk in ['High', 'Medium']:
+            recommendations.append("⚰️ Record probable causes of failure for future prevention.")
+        elif final_risk == 'Low' and nest_stage == 'Failed':
+            recommendations.append("🪹 Document the event; valuable for research.")
+    elif nest_stage == 'Empty':
+        if final_risk in ['High', 'Medium']:
+            recommendations.append("🕊️ Record nest location and condition—inform conservationists if needed.")
+        elif final_risk == 'Low' and nest_stage == 'Empty':
+            recommendations.append("🕊️ Log nest details—helpful for future monitoring.")
+
+    # Risk Level Actions
+    if final_risk == 'High':
+        recommendations.append("📞 Contact local wildlife authorities for immediate assistance.")
+        if egg_count > 5 or chick_count > 5:
+            recommendations.append("🆘 Extra vigilance: Large clutches increase the need for secure, safe monitoring.")
+    elif final_risk == 'Medium':
+        recommendations.append("📅 Schedule regular check-ins—monitor for changes in nest condition.")
+        if egg_count > 5 or chick_count > 5:
+            recommendations.append("👁️ Watch for overloading and consider reinforcing nest support if unstable.")
+    elif final_risk == 'Low':
+        recommendations.append("✨ Continue regular monitoring and document nest progress.")
+        if egg_count > 5 or chick_count > 5:
+            recommendations.append("🥚🐣 Large clutch noted—useful for research.")
+
+    # Always suggest these basic monitoring practices (for all risk levels)
+    recommendations.extend([
+        "📸 Document progress with periodic photos.",
+        "📊 Log environmental changes in your monitoring database."
+    ])
+    return sorted(set(recommendations))
+
+
+def legacy_recommend_mitigation(
+    risk_level: str,
+    habitat: str,
+    nest_stage: str,
+    egg_count: int,
+    chick_count: int,
+    human: str,
+    predator: str,
+    noise: str,
+):
+    """The former core.model.recommend_mitigation."""
+    recs = []
+
+    # Base on risk level
+    if str(risk_level).lower() in {"high", "severe", "3", "4"}:
+        recs.append("Initiate immediate protective measures and increase monitoring frequency to daily.")
+        recs.append("Flag the site to local conservation/forest officials and record GPS with photos.")
+    elif str(risk_level).lower() in {"moderate", "medium", "2"}:
+        recs.append("Schedule regular monitoring (every 2–3 days) and log any changes in activity or threats.")
+    else:
+        recs.append("Maintain weekly checks and keep disturbance minimal around the nest site.")
+
+    # Human disturbance
+    if human in {"Moderate", "High"}:
+        recs.append("Establish a 20–50 m buffer zone with temporary signage to reduce foot traffic.")
+        recs.append("Reroute nearby paths and briefly halt noisy activities until chicks fledge.")
+
+    # Predators
+    if predator in {"Moderate", "High"}:
+        recs.append("Install non-intrusive deterrents (e.g., reflective tape, visual decoys) outside the nest line-of-sight.")
+        recs.append("Remove attractants (food scraps) and secure waste to discourage predators.")
+
+    # Noise
+    if noise in {"Moderate", "Loud"}:
+        recs.append("Limit loud machinery and schedule unavoidable noise outside early morning/late evening peak activity.")
+        recs.append("If near roads, consider temporary sound barriers or speed calming measures.")
+
+    # Habitat specific
+    if habitat == "Wetland":
+        recs.append("Maintain stable water levels and avoid bank vegetation clearance during nesting.")
+    elif habitat == "Trees":
+        recs.append("Avoid pruning or tree work within a 50 m radius until the nesting period ends.")
+    elif habitat == "Grassland":
+        recs.append("Delay mowing and keep machinery at least 30 m from the nest area.")
+
+    # Stage specific
+    if nest_stage in {"Eggs", "Chicks"}:
+        recs.append("Minimize visits to <10 minutes and keep observers concealed to prevent abandonment.")
+        recs.append("Record temperature/weather changes that could impact incubation or chick thermoregulation.")
+
+    # Clutch/brood size context
+    if egg_count >= 5 or chick_count >= 3:
+        recs.append("Prioritize continuous monitoring due to higher reproductive investment at this site.")
+
+    # De-duplicate while preserving order
+    deduped = []
+    seen = set()
+    for r in recs:
+        if r not in seen:
+            deduped.append(r)
+            seen.add(r)
+
+    # Limit to a practical number for field use
+    return deduped[:8]
+
+
+LEGACY = {"risk_page": legacy_page_recommendations, "mitigation": legacy_recommend_mitigation}
+
+# Spellings recommend_mitigation has always accepted, plus one it maps to Low.
+MITIGATION_LEVELS = ["High", "Medium", "Low", "high", "severe", "3", "4", "moderate", "medium", "2", "unknown"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="batch size for the timing run")
+    parser.add_argument("--legacy-rows", type=int, default=100_000, help="rows timed with the legacy loop")
+    args = parser.parse_args()
+
+    nests = random_nest_frame(args.rows)
+    levels = np.random.default_rng(3).choice(["Low", "Medium", "High"], size=args.rows)
+    print(f"{'surface':<11} {'legacy rows/s':>14} {'compiled rows/s':>16} {'speedup':>8}")
+    for surface, legacy in LEGACY.items():
+        sample = nests.head(args.legacy_rows).to_dict("records")
+        start = time.perf_counter()
+        for level, row in zip(levels, sample):
+            " | ".join(legacy(level, **row))
+        legacy_rate = len(sample) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        RULESETS[surface].recommendations_joined(nests, levels)
+        compiled_rate = args.rows / (time.perf_counter() - start)
+        print(f"{surface:<11} {legacy_rate:>14,.0f} {compiled_rate:>16,.0f} {compiled_rate / legacy_rate:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Build + render time and HTML size of species maps: per-row iterrows markers
+versus the array-based build_species_map.
+
+Run from the repository root:
+    python -m benchmarks.bench_species_map --sizes 10 1000 100000
+"""
+import argparse
+import time
+
+import folium
+import numpy as np
+import pandas as pd
+from folium import plugins
+
+from core.data import SpeciesIndex
+from core.viz import _svg_to_dataurl, SVG_CROW, build_species_map
+
+
+def synthetic_species(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "common_name": "House Crow",
+        "primary_label": "houcro1",
+        "scientific_name": "Corvus splendens",
+        "latitude": rng.normal(20, 5, n).astype(np.float32),
+        "longitude": rng.normal(78, 5, n).astype(np.float32),
+    })
+
+
+def legacy_map(bird_data: pd.DataFrame, icon_url: str) -> folium.Map:
+    """The previous heatmap_folium body: one Marker + CustomIcon per row."""
+    m = folium.Map(location=[bird_data["latitude"].mean(), bird_data["longitude"].mean()], zoom_start=5, control_scale=True)
+    marker_cluster = plugins.MarkerCluster().add_to(m)
+    for _, row in bird_data.iterrows():
+        folium.Marker(
+            location=[row["latitude"], row["longitude"]],
+            icon=folium.CustomIcon(icon_image=icon_url, icon_size=(30, 30)) if icon_url else None,
+            popup=f"Common Name: {row['common_name']} | Species: {row['primary_label']}",
+        ).add_to(marker_cluster)
+    plugins.HeatMap(bird_data[["latitude", "longitude"]].values.tolist()).add_to(m)
+    folium.LayerControl().add_to(m)
+    return m
+
+
+def timed_render(build):
+    start = time.perf_counter()
+    html = build().get_root().render()
+    return time.perf_counter() - start, len(html.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=10000, help="skip the legacy builder above this many points")
+    args = parser.parse_args()
+
+    icon_url = _svg_to_dataurl(SVG_CROW)
+    print(f"{'points':>8}  {'legacy s':>9}  {'legacy MB':>9}  {'array s':>8}  {'array MB':>8}")
+    for n in args.sizes:
+        df = synthetic_species(n)
+        rec = SpeciesIndex(df).get("House Crow")
+        if n <= args.legacy_max:
+            legacy_s, legacy_b = timed_render(lambda: legacy_map(df, icon_url))
+            legacy = f"{legacy_s:>9.3f}  {legacy_b / 1e6:>9.2f}"
+        else:
+            legacy = f"{'skipped':>9}  {'':>9}"
+        new_s, new_b = timed_render(lambda: build_species_map(rec, icon_url=icon_url))
+        print(f"{n:>8}  {legacy}  {new_s:>8.3f}  {new_b / 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Shared helpers for the benchmark scripts."""
+import numpy as np
+import pandas as pd
+
+from core.model import RISK_FIELD_VALUES, RISK_INPUT_FIELDS
+
+
+def random_nest_columns(n: int, seed: int = 0) -> dict:
+    """n synthetic risk-form inputs as one array per field, drawn uniformly from the form options."""
+    rng = np.random.default_rng(seed)
+    return {
+        field: np.asarray(RISK_FIELD_VALUES[field], dtype=object)[rng.integers(0, len(RISK_FIELD_VALUES[field]), n)]
+        for field in RISK_INPUT_FIELDS
+    }
+
+
+def random_nests(n: int, seed: int = 0) -> list[dict]:
+    """Returns n synthetic risk-form records drawn uniformly from the form options."""
+    columns = random_nest_columns(n, seed)
+    return [{field: columns[field][i] for field in RISK_INPUT_FIELDS} for i in range(n)]
+
+
+def random_nest_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    """random_nests as a DataFrame, built column-wise (fast for millions of rows)."""
+    frame = pd.DataFrame(random_nest_columns(n, seed))
+    for field in ("egg_count", "chick_count"):
+        frame[field] = frame[field].astype(np.int64)
+    return frame
@@ -0,0 +1,115 @@
+"""
+Startup-time report for the Streamlit app, built from `python -X importtime`.
+
+Imports app.py (which renders the home page in bare mode) in a fresh
+interpreter, then prints the slowest top-level imports and which heavy
+libraries were loaded. Exits non-zero when a budget or the heavy-module
+check fails, so it can gate CI:
+
+    python -m benchmarks.import_time --budget-ms 2500 --json import_time.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Libraries only specific pages need; none should load for the home page.
+HEAVY_MODULES = [
+    "folium",
+    "pydeck",
+    "plotly",
+    "streamlit_folium",
+    "google.generativeai",
+    "google.genai",
+    "sklearn",
+]
+
+# Imports made internally by these packages are outside the app's control.
+THIRD_PARTY_OWNERS = {"streamlit"}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_importtime(module: str) -> list[tuple[int, int, int, str]]:
+    """Returns (self_us, cumulative_us, depth, name) rows for one cold import."""
+    env = dict(os.environ, WARMUP_ON_STARTUP="0")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cum_us), depth, name.strip()))
+    return rows
+
+
+def top_level_owners(rows) -> list[tuple[str, str]]:
+    """
+    Pairs each imported module with the depth-1 import that pulled it in.
+    importtime prints children before their parent, so walk the rows backwards.
+    """
+    owners = []
+    stack = []
+    for _, _, depth, name in reversed(rows):
+        del stack[depth:]
+        stack.append(name)
+        owners.append((name, stack[1] if len(stack) > 1 else name))
+    return owners
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--repeat", type=int, default=3, help="report the fastest of N cold runs")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--allow-heavy", action="store_true", help="do not fail when heavy modules load")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    runs = [run_importtime(args.module) for _ in range(args.repeat)]
+    total = lambda rows: next(cum for _, cum, depth, name in rows if depth == 0 and name == args.module)
+    rows = min(runs, key=total)
+    total_ms = total(rows) / 1000
+
+    children = sorted((r for r in rows if r[2] == 1), key=lambda r: -r[1])[: args.top]
+    loaded = sorted({
+        heavy for name, root in top_level_owners(rows) for heavy in HEAVY_MODULES
+        if (name == heavy or name.startswith(heavy + ".")) and root not in THIRD_PARTY_OWNERS
+    })
+
+    print(f"import {args.module}: {total_ms:,.0f} ms (best of {args.repeat})")
+    print(f"{'cumulative ms':>14}  module")
+    for _, cum, _, name in children:
+        print(f"{cum / 1000:>14,.1f}  {name}")
+    print(f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "module": args.module,
+                "total_ms": total_ms,
+                "top_imports": [{"module": name, "cumulative_ms": cum / 1000} for _, cum, _, name in children],
+                "heavy_modules_loaded": loaded,
+            }, f, indent=2)
+
+    failed = False
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:,.0f} ms exceeds budget of {args.budget_ms:,.0f} ms")
+        failed = True
+    if loaded and not args.allow_heavy:
+        print("FAIL: heavy modules imported at startup")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
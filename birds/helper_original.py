@@ -1,10 +1,9 @@
 import streamlit as st
-import folium
-from folium import plugins
-from streamlit_folium import  folium_static
 import pandas as pd
 import base64
-import pydeck as pdk
+import functools
+from core.data import species_index_for
+from core.viz import build_species_map
 
 
 
@@ -18,14 +17,13 @@ def get_image(name):
             return  path
 
 def scientific_n(name,df):
-    d= df[df['common_name']==name]
-    d.reset_index(drop=True,inplace=True)
-    v= d.scientific_name[0]
-    return v
+    rec = species_index_for(df).get(name)
+    return rec.scientific_name if rec is not None else "Unknown"
 
 # Scatterplot Layer
 def map_3d(name , df):
-    data = df[df['common_name'] == name]
+    import pydeck as pdk
+    data = species_index_for(df).rows(name)
     scatterplot_layer = pdk.Layer(
         'ScatterplotLayer',
         data,
@@ -143,40 +141,20 @@ def svg_to_dataurl(path_to_svg):
         svg = f.read()
     return "data:image/svg+xml;base64," + base64.b64encode(svg.encode('utf-8')).decode('utf-8')
 
-url=svg_to_dataurl('birds/crow-solid.svg')
+# Read and encoded on first use instead of at import time
+@functools.lru_cache(maxsize=1)
+def crow_icon_url():
+    return svg_to_dataurl('birds/crow-solid.svg')
 
 # Load data
 #df = pd.read_csv
 
 def heatmap_bird(name ,df ):
-    bird_data = df[df['common_name']==name]
-
-    # Load data
-    #df = pd.read_csv('path_to_your_file.csv')
-    bird_icon_url=url
-    # Create a map
-    map = folium.Map(location=[  bird_data ['latitude'].mean(),   bird_data['longitude'].mean()], zoom_start=5)
-
-
-    # Create marker cluster
-    marker_cluster = plugins.MarkerCluster().add_to(map)
-    for index, row in bird_data.iterrows():
-        icon = folium.CustomIcon(
-            icon_image=bird_icon_url,
-            icon_size=(30, 30)  # Size of the icon in pixels
-        )
-        folium.Marker(
-            location=[row['latitude'], row['longitude']],icon=icon,
-            popup=f"Common Name: {row['common_name']}<br>Species: {row['primary_label']}"
-        ).add_to(marker_cluster)
-
-    # Create heatmap
-    data =   bird_data[['latitude', 'longitude']].values.tolist()
-    heatmap = plugins.HeatMap(data)
-    map.add_child(heatmap)
-
-    # Add layer control
-    folium.LayerControl().add_to(map)
+    from streamlit_folium import folium_static
+    rec = species_index_for(df).get(name)
+
+    # Clustered markers share one icon; coordinates are passed as arrays
+    map = build_species_map(rec, icon_url=crow_icon_url())
 
     # Save or display the map
    # map.save(f'cluster_and_heatmap{name}.html')
@@ -0,0 +1,247 @@
+import os
+import time
+from typing import Iterator, Optional
+from zipfile import BadZipFile
+
+import numpy as np
+import pandas as pd
+
+from core.calibration import calibrate
+from core.explain import field_contributions, field_groups, format_drivers_batch
+from core.forest import as_compiled
+from core.model import (
+    ONE_HOT_PREFIXES,
+    RISK_FIELD_VALUES,
+    RISK_INPUT_FIELDS,
+    predict_nest_risk_fallback_batch,
+    predict_proba_batch,
+)
+from core.rules import RULESETS
+
+# Rows scored per step; bounds memory regardless of upload size.
+SURVEY_CHUNK_ROWS = 5000
+
+SURVEY_FILE_TYPES = ["csv", "xlsx"]
+
+RISK_ORDER = ["Low", "Medium", "High"]
+
+# Largest egg or chick count accepted from a survey; anything above is a data-entry error.
+SURVEY_MAX_COUNT = 100
+
+# Accept the model's one-hot prefixes as header names too (e.g. "habitat_type").
+_HEADER_ALIASES = {prefix: field for field, prefix in ONE_HOT_PREFIXES.items()}
+
+
+def _normalize_headers(columns) -> dict:
+    rename = {}
+    for col in columns:
+        key = str(col).strip().lower().replace(" ", "_")
+        key = _HEADER_ALIASES.get(key, key)
+        if key in RISK_INPUT_FIELDS:
+            rename[col] = key
+    return rename
+
+
+def _check_headers(columns):
+    found = set(_normalize_headers(columns).values())
+    missing = [f for f in RISK_INPUT_FIELDS if f not in found]
+    if missing:
+        raise ValueError(f"Survey file is missing columns: {', '.join(missing)}")
+
+
+def _iter_csv(file, chunk_rows: int) -> Iterator[tuple[pd.DataFrame, float]]:
+    size = getattr(file, "size", None)
+    if size is None:
+        start = file.tell()
+        size = file.seek(0, os.SEEK_END)
+        file.seek(start)
+    # "None" is a valid disturbance level, so only empty cells count as missing.
+    reader = pd.read_csv(
+        file, chunksize=chunk_rows, dtype=str, skipinitialspace=True,
+        keep_default_na=False, na_values=[""],
+    )
+    for i, chunk in enumerate(reader):
+        if i == 0:
+            _check_headers(chunk.columns)
+        yield chunk, min(file.tell() / size, 1.0) if size else 1.0
+
+
+def _iter_excel(file, chunk_rows: int) -> Iterator[tuple[pd.DataFrame, float]]:
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    # Corrupt or renamed files fail inside openpyxl; report them like any other bad upload.
+    try:
+        wb = load_workbook(file, read_only=True, data_only=True)
+    except (BadZipFile, InvalidFileException, KeyError) as e:
+        raise ValueError(f"Survey file is not a readable .xlsx workbook ({e}).") from None
+    try:
+        ws = wb.active
+        total = max((ws.max_row or 1) - 1, 1)
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError("Survey file is empty.")
+        header = [str(h) if h is not None else f"column_{i}" for i, h in enumerate(header)]
+        _check_headers(header)
+
+        done = 0
+        buf = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) == chunk_rows:
+                done += len(buf)
+                yield pd.DataFrame(buf, columns=header, dtype=object), min(done / total, 1.0)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=header, dtype=object), 1.0
+    except (BadZipFile, SyntaxError) as e:
+        # A damaged sheet inside a valid archive (SyntaxError covers XML parse errors).
+        raise ValueError(f"Survey file is not a readable .xlsx workbook ({e}).") from None
+    finally:
+        wb.close()
+
+
+def iter_survey_chunks(file, filename: str, chunk_rows: int = SURVEY_CHUNK_ROWS) -> Iterator[tuple[pd.DataFrame, float]]:
+    """
+    Streams a CSV or Excel survey as DataFrames of at most chunk_rows rows.
+    Yields (chunk, fraction_of_file_read); the whole file is never materialized.
+    Unreadable files raise ValueError.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == ".csv":
+        return _iter_csv(file, chunk_rows)
+    if ext == ".xlsx":
+        return _iter_excel(file, chunk_rows)
+    raise ValueError(f"Unsupported survey file type: {ext or filename}")
+
+
+def _clean_inputs(chunk: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """Returns the seven typed input columns and a per-row error message ('' when valid)."""
+    raw = chunk.rename(columns=_normalize_headers(chunk.columns))
+    inputs = pd.DataFrame(index=chunk.index)
+    errors = pd.Series("", index=chunk.index, dtype=object)
+
+    for field in RISK_INPUT_FIELDS:
+        col = raw[field]
+        if field in ("egg_count", "chick_count"):
+            values = pd.to_numeric(col, errors="coerce").astype(np.float64)
+            bad = ~np.isfinite(values) | (values < 0) | (values > SURVEY_MAX_COUNT) | (values != values.round())
+            inputs[field] = values.where(~bad, 0).astype(int)
+        else:
+            values = col.astype("string").str.strip()
+            bad = ~values.isin(RISK_FIELD_VALUES[field]).fillna(False).astype(bool)
+            inputs[field] = values.fillna("").astype(object)
+        errors[bad.to_numpy()] += f"invalid {field}; "
+    return inputs, errors.str.rstrip("; ")
+
+
+def score_survey_chunk(chunk: pd.DataFrame, model, all_cols, risk_table=None, shadow=None, calibration=None) -> pd.DataFrame:
+    """
+    Adds ML risk with its class probabilities (p_<class>, calibrated when calibration
+    is given) and top drivers, rule-based and combined risk plus mitigation steps to one chunk.
+    shadow, if given, is called as shadow(inputs, ml_labels, primary_ms=...) with the valid rows.
+    """
+    inputs, errors = _clean_inputs(chunk)
+    valid = (errors == "").to_numpy()
+    n = len(chunk)
+
+    start = time.perf_counter()
+    classes = np.asarray(model.classes_, dtype=object)
+    risk_ml = np.full(n, None, dtype=object)
+    proba = np.full((n, len(classes)), np.nan)
+    driver_fields = field_groups(all_cols)[0]
+    drivers = np.full((n, len(driver_fields), len(classes)), np.nan)
+    if valid.any():
+        todo = valid.copy()
+        explain = valid.copy()
+        if risk_table is not None:
+            labels, found, table_proba, table_drivers = risk_table.lookup_batch(
+                inputs[valid], with_proba=True, with_drivers=True
+            )
+            rows = np.flatnonzero(valid)[found]
+            risk_ml[rows] = labels[found]
+            proba[rows] = table_proba[found]
+            todo[rows] = False
+            if risk_table.drivers is not None:
+                drivers[rows] = table_drivers[found]
+                explain[rows] = False
+        if todo.any():
+            proba[todo] = calibrate(predict_proba_batch(model, all_cols, inputs[todo]), calibration)
+            risk_ml[todo] = classes[np.argmax(proba[todo], axis=1)]
+        if explain.any():
+            try:
+                drivers[explain] = field_contributions(as_compiled(model), all_cols, inputs[explain])[2]
+            except ValueError:
+                pass  # not a tree ensemble: no drivers
+        if shadow is not None:
+            shadow(inputs[valid], risk_ml[valid], primary_ms=(time.perf_counter() - start) * 1000)
+
+    risk_rule = np.full(n, None, dtype=object)
+    risk_final = np.full(n, None, dtype=object)
+    if valid.any():
+        risk_rule[valid] = predict_nest_risk_fallback_batch(inputs[valid])
+        # Final risk is the higher of the two, as on the Risk page.
+        level = {name: i for i, name in enumerate(RISK_ORDER)}
+        ml_idx = pd.Series(risk_ml[valid]).map(level).to_numpy(dtype=np.intp)
+        rule_idx = pd.Series(risk_rule[valid]).map(level).to_numpy(dtype=np.intp)
+        risk_final[valid] = np.asarray(RISK_ORDER, dtype=object)[np.maximum(ml_idx, rule_idx)]
+
+    # Same rules as the Risk page, evaluated for the whole chunk at once.
+    recs = np.full(n, "", dtype=object)
+    if valid.any():
+        recs[valid] = RULESETS["risk_page"].recommendations_joined(inputs[valid], risk_final[valid])
+
+    # Fields pushing hardest toward the ML class of each row.
+    top_drivers = np.full(n, "", dtype=object)
+    if valid.any():
+        rows = np.flatnonzero(valid)
+        class_index = pd.Series(risk_ml[rows]).map({c: i for i, c in enumerate(classes)}).to_numpy(dtype=np.intp)
+        toward = drivers[rows, :, class_index]
+        known = ~np.isnan(toward).any(axis=1)
+        top_drivers[rows[known]] = format_drivers_batch(toward[known], driver_fields)
+
+    out = chunk.copy()
+    out["risk_ml"] = risk_ml
+    for i, cls in enumerate(classes):
+        out[f"p_{str(cls).lower()}"] = proba[:, i].round(4)
+    out["top_drivers"] = top_drivers
+    out["risk_rule"] = risk_rule
+    out["risk_final"] = risk_final
+    out["recommendations"] = recs
+    out["error"] = errors.to_numpy()
+    return out
+
+
+def score_survey_file(
+    file,
+    filename: str,
+    model,
+    all_cols,
+    out_path: str,
+    risk_table=None,
+    chunk_rows: int = SURVEY_CHUNK_ROWS,
+    shadow=None,
+    calibration=None,
+) -> Iterator[tuple[pd.DataFrame, float]]:
+    """
+    Scores a survey chunk by chunk, appending each scored chunk to out_path as CSV.
+    Yields (scored_chunk, fraction_done) so callers can render progress.
+    """
+    with open(out_path, "w", newline="", encoding="utf-8") as out:
+        header = True
+        for chunk, fraction in iter_survey_chunks(file, filename, chunk_rows):
+            scored = score_survey_chunk(chunk, model, all_cols, risk_table, shadow, calibration)
+            scored.to_csv(out, header=header, index=False)
+            header = False
+            yield scored, fraction
+
+
+def summarize_counts(counts: Optional[dict], scored: pd.DataFrame) -> dict:
+    """Accumulates per-level totals across chunks."""
+    counts = dict(counts or {"rows": 0, "invalid": 0, **{level: 0 for level in RISK_ORDER}})
+    counts["rows"] += len(scored)
+    counts["invalid"] += int((scored["error"] != "").sum())
+    for level, n in scored["risk_final"].value_counts().items():
+        counts[level] = counts.get(level, 0) + int(n)
+    return counts
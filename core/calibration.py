@@ -0,0 +1,146 @@
+"""
+Probability calibration for the risk model, fitted offline on labelled nests
+and stored next to the model as JSON (model/risk_model_calibration.json). Each
+class gets a one-vs-rest map from raw forest probability to calibrated
+probability, isotonic (piecewise-linear knots) or Platt (sigmoid); the
+calibrated vector is renormalized to sum to one. Applying it needs only NumPy.
+
+The file records the SHA-256 of the model and columns it was fitted for and is
+ignored for any other model version.
+
+Fit from a CSV or Excel survey with the seven risk-form columns plus a label:
+    python -m core.calibration --data labelled.csv --label-column risk --method isotonic
+"""
+import argparse
+import hashlib
+import json
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from core.model import CALIBRATION_PATH, COLUMNS_PATH, MODEL_PATH, predict_proba_batch
+
+CALIBRATION_METHODS = ("isotonic", "sigmoid")
+
+# Confidence bands shown for the predicted class's calibrated probability, highest first.
+CONFIDENCE_BANDS = ((0.8, "High"), (0.6, "Moderate"), (0.0, "Low"))
+
+def confidence_band(probability: float) -> str:
+    for floor, band in CONFIDENCE_BANDS:
+        if probability >= floor:
+            return band
+    return CONFIDENCE_BANDS[-1][1]
+
+class Calibration:
+    """Per-class calibration maps for one model version."""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.method = spec["method"]
+        self.classes = list(spec["classes"])
+        self.model_sha256 = spec["model_sha256"]
+        self.sha256 = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+        if self.method not in CALIBRATION_METHODS:
+            raise ValueError(f"Unknown calibration method {self.method!r}")
+        maps = spec["maps"]
+        if self.method == "isotonic":
+            self._knots = [(np.asarray(maps[c]["x"], dtype=np.float64), np.asarray(maps[c]["y"], dtype=np.float64)) for c in self.classes]
+        else:
+            self._platt = np.array([[maps[c]["a"], maps[c]["b"]] for c in self.classes], dtype=np.float64)
+
+    @classmethod
+    def from_json(cls, text) -> "Calibration":
+        return cls(json.loads(text))
+
+    def apply(self, proba: np.ndarray) -> np.ndarray:
+        """Calibrated (n, classes) probabilities from raw ones, columns in the model's class order."""
+        proba = np.asarray(proba, dtype=np.float64)
+        if self.method == "isotonic":
+            out = np.column_stack([np.interp(proba[:, i], x, y) for i, (x, y) in enumerate(self._knots)])
+        else:
+            out = 1.0 / (1.0 + np.exp(self._platt[:, 0] * proba + self._platt[:, 1]))
+        total = out.sum(axis=1, keepdims=True)
+        # A row every map sends to zero keeps its raw probabilities.
+        return np.where(total > 0, out / np.where(total > 0, total, 1.0), proba)
+
+def calibrate(proba: np.ndarray, calibration: Optional[Calibration]) -> np.ndarray:
+    return proba if calibration is None else calibration.apply(proba)
+
+def fit_calibration(model, all_cols, records, labels, model_sha256: str, method: str = "isotonic") -> dict:
+    """Fits one-vs-rest maps on labelled nests; returns the JSON-ready spec."""
+    from sklearn.isotonic import IsotonicRegression
+    from sklearn.linear_model import LogisticRegression
+
+    if method not in CALIBRATION_METHODS:
+        raise ValueError(f"method must be one of {', '.join(CALIBRATION_METHODS)}")
+    proba = predict_proba_batch(model, all_cols, records)
+    labels = np.asarray(labels, dtype=object)
+    classes = [str(c) for c in model.classes_]
+    unknown = sorted(set(map(str, labels)) - set(classes))
+    if unknown:
+        raise ValueError(f"Labels outside the model classes: {', '.join(unknown)}")
+    maps = {}
+    for i, cls in enumerate(classes):
+        target = (labels.astype(str) == cls).astype(np.float64)
+        if method == "isotonic":
+            iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(proba[:, i], target)
+            maps[cls] = {"x": iso.X_thresholds_.tolist(), "y": iso.y_thresholds_.tolist()}
+        else:
+            if target.min() == target.max():
+                raise ValueError(f"Platt scaling needs both positive and negative examples of {cls}")
+            lr = LogisticRegression(C=1e6).fit(proba[:, [i]], target)
+            # sklearn's sigmoid calibration form: 1 / (1 + exp(a * p + b)).
+            maps[cls] = {"a": float(-lr.coef_[0, 0]), "b": float(-lr.intercept_[0])}
+    return {
+        "method": method,
+        "classes": classes,
+        "model_sha256": model_sha256,
+        "samples": int(len(labels)),
+        "maps": maps,
+    }
+
+def write_calibration(spec: dict, path: str = CALIBRATION_PATH) -> str:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(spec, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+def _log_loss(proba: np.ndarray, labels, classes) -> float:
+    index = {c: i for i, c in enumerate(classes)}
+    picked = proba[np.arange(len(proba)), [index[str(label)] for label in labels]]
+    return float(-np.mean(np.log(np.clip(picked, 1e-12, 1.0))))
+
+def main():
+    from core.bulk import _clean_inputs, iter_survey_chunks
+    from core.registry import load_artifact
+
+    parser = argparse.ArgumentParser(description="Fit probability calibration for the risk model.")
+    parser.add_argument("--data", required=True, help="CSV/XLSX survey with the risk-form columns and a label column")
+    parser.add_argument("--label-column", default="risk")
+    parser.add_argument("--method", choices=CALIBRATION_METHODS, default="isotonic")
+    parser.add_argument("--out", default=CALIBRATION_PATH)
+    args = parser.parse_args()
+
+    loaded = load_artifact("risk", MODEL_PATH, COLUMNS_PATH)
+    with open(args.data, "rb") as f:
+        chunks = [chunk for chunk, _ in iter_survey_chunks(f, args.data)]
+    survey = pd.concat(chunks, ignore_index=True)
+    if args.label_column not in survey.columns:
+        raise SystemExit(f"{args.data} has no {args.label_column!r} column")
+    inputs, errors = _clean_inputs(survey)
+    keep = (errors == "").to_numpy() & survey[args.label_column].notna().to_numpy()
+    records, labels = inputs[keep], survey.loc[keep, args.label_column].astype(str).str.strip().to_numpy()
+
+    spec = fit_calibration(loaded.model, loaded.columns, records, labels, loaded.sha256, args.method)
+    raw = predict_proba_batch(loaded.model, loaded.columns, records)
+    calibrated = Calibration(spec).apply(raw)
+    path = write_calibration(spec, args.out)
+    print(f"{args.method} calibration on {len(labels):,} nests ({int((~keep).sum()):,} rows skipped) -> {path}")
+    print(f"log loss: raw {_log_loss(raw, labels, spec['classes']):.4f}, "
+          f"calibrated {_log_loss(calibrated, labels, spec['classes']):.4f} (in-sample)")
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,12 @@
 # core/chat.py
 
 import os
-import streamlit as st
-
-# Prefer new google-genai SDK (matches your gemini_app.py imports)
-try:
-    from google import genai
-    from google.genai import types
-    SDK = "genai"
-except Exception:
-    genai = None
-    types = None
-    SDK = None
+from typing import Iterator
+
+from core.llm_client import api_key, get_llm_client
+from core.response_cache import get_response_cache
+
+CHAT_MODEL = "gemini-1.5-flash"
 
 SYSTEM_PROMPT = (
     '''You are an expert assistant for a Bird Conservation web app used by field volunteers, students, and researchers. Your goals are:
@@ -58,14 +53,9 @@ If asked “Is it okay to move a nest?” → Explain legal and ethical concerns
 
 )
 
-@st.cache_resource
 def get_gemini_client():
-    api_key = st.secrets.get("GOOGLE_API_KEY", os.getenv("GOOGLE_API_KEY", ""))
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY not found in secrets or environment.")
-    if SDK == "genai":
-        return genai.Client(api_key=api_key)
-    raise RuntimeError("Gemini SDK not available. Install `google-genai`.")
+    """The process-wide Gemini client shared with app.py (see core.llm_client)."""
+    return get_llm_client()
 
 def _last_user_message(history: list[dict]) -> str:
     # history is a list of {"role": "user"/"assistant", "content": "..."}
@@ -79,23 +69,82 @@ def generate_reply(client, history: list[dict]) -> str:
     user_text = _last_user_message(history)
     if not user_text:
         return "Please ask a question to begin."
+    return get_response_cache().get_or_generate(
+        user_text, SYSTEM_PROMPT, CHAT_MODEL, lambda: _generate_reply(client, user_text)
+    )
+
+def _generate_reply(client, user_text: str) -> str:
     try:
-        resp = client.models.generate_content(
-            model="gemini-1.5-flash",
-            config=types.GenerateContentConfig(system_instruction=SYSTEM_PROMPT),
-            contents=user_text,
-        )
-        return (getattr(resp, "text", "") or "").strip() or "No response."
+        return client.generate(CHAT_MODEL, user_text, SYSTEM_PROMPT) or "⚠️ No response."
     except Exception as e:
         return f"⚠️ Error: {e}"
 
+def generate_reply_stream(client, history: list[dict]) -> Iterator[str]:
+    """Streaming generate_reply: yields partial text; errors are yielded as a final chunk."""
+    user_text = _last_user_message(history)
+    if not user_text:
+        yield "Please ask a question to begin."
+        return
+    yield from get_response_cache().get_or_stream(
+        user_text, SYSTEM_PROMPT, CHAT_MODEL, lambda: _generate_reply_stream(client, user_text)
+    )
+
+def _generate_reply_stream(client, user_text: str) -> Iterator[str]:
+    produced = False
+    try:
+        for text in client.stream(CHAT_MODEL, user_text, SYSTEM_PROMPT):
+            produced = True
+            yield text
+    except Exception as e:
+        yield f"\n\n⚠️ Error: {e}" if produced else f"⚠️ Error: {e}"
+        return
+    if not produced:
+        yield "⚠️ No response."
+
 # Optional: recommendation refinement hook used on the Risk page.
+RECS_MODEL = "gemini-2.5-flash"
+
 SYSTEM_PROMPT_RECS = (
     "You are an expert field biologist and conservation planner. "
     "Rewrite the provided nest-site mitigation steps into 3–6 concise, actionable items with brief rationale. "
     "Be specific, humane, and legally compliant. Do not invent risks."
 )
 
+def refine_recommendations(
+    risk_level: str,
+    habitat: str,
+    nest_stage: str,
+    egg_count: int,
+    chick_count: int,
+    human: str,
+    predator: str,
+    noise: str,
+    base_recommendations: list[str],
+) -> str:
+    """Gemini rewrite of the offline steps, cached per input; raises when the call fails."""
+    context = (
+        f"Risk level: {risk_level}\n"
+        f"Habitat: {habitat}\n"
+        f"Nest stage: {nest_stage}\n"
+        f"Eggs: {egg_count}\n"
+        f"Chicks: {chick_count}\n"
+        f"Human disturbance: {human}\n"
+        f"Predator signs: {predator}\n"
+        f"Noise: {noise}\n"
+        f"Base steps:\n- " + "\n- ".join(base_recommendations)
+    )
+
+    def generate() -> str:
+        text = get_gemini_client().generate(RECS_MODEL, context, SYSTEM_PROMPT_RECS)
+        if not text:
+            raise RuntimeError("Empty refinement.")
+        return text
+
+    return get_response_cache().get_or_generate(context, SYSTEM_PROMPT_RECS, RECS_MODEL, generate)
+
+def refinement_available() -> bool:
+    return bool(api_key()) or os.getenv("FAKE_LLM") == "1"
+
 def try_refine_recommendations(
     risk_level: str,
     habitat: str,
@@ -108,29 +157,12 @@ def try_refine_recommendations(
     base_recommendations: list[str],
 ) -> str:
     # Fallback to base if SDK or key is missing
-    api_key = st.secrets.get("GOOGLE_API_KEY", os.getenv("GOOGLE_API_KEY", ""))
-    if not api_key or SDK != "genai":
-        return "\n".join(f"- {r}" for r in base_recommendations) or "No recommendations available."
-
+    fallback = "\n".join(f"- {r}" for r in base_recommendations)
+    if not refinement_available():
+        return fallback or "No recommendations available."
     try:
-        client = get_gemini_client()
-        context = (
-            f"Risk level: {risk_level}\n"
-            f"Habitat: {habitat}\n"
-            f"Nest stage: {nest_stage}\n"
-            f"Eggs: {egg_count}\n"
-            f"Chicks: {chick_count}\n"
-            f"Human disturbance: {human}\n"
-            f"Predator signs: {predator}\n"
-            f"Noise: {noise}\n"
-            f"Base steps:\n- " + "\n- ".join(base_recommendations)
-        )
-        resp = client.models.generate_content(
-            model="gemini-2.5-flash",
-            config=types.GenerateContentConfig(system_instruction=SYSTEM_PROMPT_RECS),
-            contents=context,
+        return refine_recommendations(
+            risk_level, habitat, nest_stage, egg_count, chick_count, human, predator, noise, base_recommendations
         )
-        text = (getattr(resp, "text", "") or "").strip()
-        return text or "\n".join(f"- {r}" for r in base_recommendations)
     except Exception:
-        return "\n".join(f"- {r}" for r in base_recommendations)
+        return fallback
@@ -0,0 +1,104 @@
+"""
+Bounded chatbot history. The newest messages are kept verbatim; older ones are
+folded into a rolling extractive summary, and the context sent with each prompt
+is assembled newest-first under a token budget.
+"""
+import os
+import re
+from typing import Optional
+
+# Limits; override with env vars.
+CHAT_WINDOW_MESSAGES = int(os.getenv("CHAT_WINDOW_MESSAGES", "40"))
+CHAT_VISIBLE_MESSAGES = int(os.getenv("CHAT_VISIBLE_MESSAGES", "20"))
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1500"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "300"))
+
+# Characters kept from each message when it is folded into the summary.
+SUMMARY_LINE_CHARS = 160
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count (~4 characters per token); no tokenizer download needed."""
+    return max(1, (len(text) + 3) // 4)
+
+def _gist(content: str) -> str:
+    """First sentence of a message, whitespace-collapsed and clipped."""
+    text = " ".join(content.split())
+    text = _SENTENCE_END.split(text, maxsplit=1)[0]
+    return text if len(text) <= SUMMARY_LINE_CHARS else text[: SUMMARY_LINE_CHARS - 1] + "…"
+
+class Conversation:
+    """Chat messages for one session: a bounded verbatim window plus a rolling summary."""
+
+    def __init__(
+        self,
+        window: int = CHAT_WINDOW_MESSAGES,
+        summary_tokens: int = CHAT_SUMMARY_TOKENS,
+    ):
+        self.window = max(2, int(window))
+        self.summary_tokens = int(summary_tokens)
+        self.messages: list[dict] = []
+        self.summary_lines: list[str] = []
+        self.archived = 0
+
+    def __len__(self) -> int:
+        return self.archived + len(self.messages)
+
+    def append(self, role: str, content: str):
+        self.messages.append({"role": role, "content": content})
+        while len(self.messages) > self.window:
+            self._archive(self.messages.pop(0))
+
+    def _archive(self, message: dict):
+        speaker = "User asked" if message["role"] == "user" else "Assistant answered"
+        self.summary_lines.append(f"- {speaker}: {_gist(message['content'])}")
+        self.archived += 1
+        # Rolling: the oldest summary lines go first once over budget.
+        while len(self.summary_lines) > 1 and estimate_tokens(self.summary) > self.summary_tokens:
+            self.summary_lines.pop(0)
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    def visible(self, limit: int = CHAT_VISIBLE_MESSAGES) -> list[dict]:
+        return self.messages[-limit:] if limit > 0 else []
+
+    def hidden_count(self, limit: int = CHAT_VISIBLE_MESSAGES) -> int:
+        return len(self) - len(self.visible(limit))
+
+    def prompt_with_context(self, prompt: str, budget_tokens: int = CHAT_CONTEXT_TOKENS) -> str:
+        """
+        The prompt preceded by as much recent history as fits in budget_tokens, newest
+        first, with the summary of older turns ahead of it when there is room.
+        Returns the bare prompt for a new conversation.
+        """
+        if not self.messages and not self.summary_lines:
+            return prompt
+        budget = budget_tokens - estimate_tokens(prompt)
+        recent = []
+        for message in reversed(self.messages):
+            speaker = "User" if message["role"] == "user" else "Assistant"
+            line = f"{speaker}: {message['content']}"
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            recent.append(line)
+            budget -= cost
+        summary: Optional[str] = self.summary if self.summary_lines else None
+        if summary and estimate_tokens(summary) > budget:
+            summary = None
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation:\n{summary}")
+        if recent:
+            parts.append("Recent conversation:\n" + "\n".join(reversed(recent)))
+        parts.append(f"User: {prompt}")
+        return "\n\n".join(parts)
+
+    def clear(self):
+        self.messages.clear()
+        self.summary_lines.clear()
+        self.archived = 0
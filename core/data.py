@@ -1,14 +1,197 @@
+import itertools
 import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 
 BIRDS_DIR = "birds"
 TRAIN_CSV = os.path.join(BIRDS_DIR, "train_metadata.csv")
+CACHE_DIR = os.path.join(BIRDS_DIR, ".cache")
 
-@st.cache_data
-def load_train_metadata():
-    df = pd.read_csv(TRAIN_CSV)
+# Only these columns are used by the app; the rest of the CSV is never parsed.
+METADATA_COLUMNS = ["common_name", "primary_label", "scientific_name", "latitude", "longitude", "rating"]
+CATEGORY_COLUMNS = ["common_name", "primary_label", "scientific_name"]
+COORD_COLUMNS = ["latitude", "longitude"]
+
+def csv_signature(path: str = TRAIN_CSV) -> tuple:
+    """(mtime_ns, size) of the CSV; any change invalidates the columnar cache."""
+    st_ = os.stat(path)
+    return (st_.st_mtime_ns, st_.st_size)
+
+def _parquet_path(signature: tuple) -> str:
+    mtime_ns, size = signature
+    return os.path.join(CACHE_DIR, f"train_metadata_{mtime_ns}_{size}.parquet")
+
+def _read_csv(path: str) -> pd.DataFrame:
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in METADATA_COLUMNS if c in header]
+    dtype = {c: "category" for c in CATEGORY_COLUMNS if c in usecols}
+    dtype.update({c: "float32" for c in COORD_COLUMNS + ["rating"] if c in usecols})
+    df = pd.read_csv(path, usecols=usecols, dtype=dtype)
     df = df.dropna(subset=["latitude", "longitude", "common_name", "primary_label"])
+    # Grouped by species so SpeciesIndex can use the rows without re-sorting.
+    df = df.sort_values("common_name", kind="stable")
     # Optional: Add audio file paths if you need them later
     # BASE_PATH should be adjusted if you actually have audio locally
+    return df.reset_index(drop=True)
+
+def build_metadata_cache(path: str = TRAIN_CSV) -> str:
+    """Converts the CSV to Parquet once; stale conversions are removed."""
+    target = _parquet_path(csv_signature(path))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    df = _read_csv(path)
+    tmp = target + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith("train_metadata_") and os.path.join(CACHE_DIR, name) != target:
+            os.remove(os.path.join(CACHE_DIR, name))
+    return target
+
+def read_train_metadata(path: str = TRAIN_CSV) -> pd.DataFrame:
+    """Reads from the Parquet cache, (re)building it when the CSV changed."""
+    signature = csv_signature(path)
+    try:
+        import pyarrow  # noqa: F401  (Parquet engine, in requirements.txt; without it every read parses the CSV)
+    except ImportError:
+        df = _read_csv(path)
+    else:
+        target = _parquet_path(signature)
+        if not os.path.exists(target):
+            build_metadata_cache(path)
+        df = pd.read_parquet(target)
+    # Identifies this data version to downstream caches (see SpeciesIndex.version).
+    df.attrs["signature"] = signature
     return df
+
+@st.cache_resource(max_entries=1)
+def _load_train_metadata(signature: tuple) -> pd.DataFrame:
+    return read_train_metadata()
+
+def load_train_metadata():
+    # Shared across sessions (no per-call copy); re-read when the CSV's mtime/size change.
+    return _load_train_metadata(csv_signature())
+
+@dataclass(frozen=True)
+class SpeciesRecord:
+    """Precomputed per-species view; latitude/longitude are slices of the shared arrays."""
+    common_name: str
+    scientific_name: str
+    primary_label: str
+    start: int
+    stop: int
+    latitude: np.ndarray
+    longitude: np.ndarray
+    centroid: tuple
+    bbox: tuple  # (min_lat, min_lon, max_lat, max_lon)
+
+    @property
+    def count(self) -> int:
+        return self.stop - self.start
+
+_INDEX_VERSIONS = itertools.count(1)
+
+class SpeciesIndex:
+    """
+    Maps each common name to a contiguous row range of a species-sorted frame,
+    so per-species lookups cost a dict access instead of a full-table mask.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        # Stable for frames loaded from the CSV, unique per index otherwise.
+        signature = df.attrs.get("signature")
+        self.version = f"csv-{signature[0]}-{signature[1]}" if signature else f"frame-{next(_INDEX_VERSIONS)}"
+        names = df["common_name"]
+        codes = names.cat.codes if isinstance(names.dtype, pd.CategoricalDtype) else pd.Series(pd.factorize(names, sort=True)[0])
+        if not codes.is_monotonic_increasing:
+            df = df.sort_values("common_name", kind="stable")
+        if not df.index.equals(pd.RangeIndex(len(df))):
+            df = df.reset_index(drop=True)
+        self.frame = df
+        self.records = {}
+        if self.frame.empty:
+            return
+
+        lat = self.frame["latitude"].to_numpy()
+        lon = self.frame["longitude"].to_numpy()
+        name_arr = self.frame["common_name"].to_numpy()
+        starts = np.concatenate([[0], np.flatnonzero(name_arr[1:] != name_arr[:-1]) + 1])
+        stops = np.append(starts[1:], len(name_arr))
+
+        lat64, lon64 = lat.astype(np.float64), lon.astype(np.float64)
+        sizes = stops - starts
+        lat_mean = np.add.reduceat(lat64, starts) / sizes
+        lon_mean = np.add.reduceat(lon64, starts) / sizes
+        lat_min, lat_max = np.minimum.reduceat(lat64, starts), np.maximum.reduceat(lat64, starts)
+        lon_min, lon_max = np.minimum.reduceat(lon64, starts), np.maximum.reduceat(lon64, starts)
+
+        sci = self.frame["scientific_name"].to_numpy() if "scientific_name" in self.frame.columns else None
+        label = self.frame["primary_label"].to_numpy() if "primary_label" in self.frame.columns else None
+        for i, (a, b) in enumerate(zip(starts.tolist(), stops.tolist())):
+            name = str(name_arr[a])
+            self.records[name] = SpeciesRecord(
+                common_name=name,
+                scientific_name=str(sci[a]) if sci is not None else "Unknown",
+                primary_label=str(label[a]) if label is not None else "",
+                start=a,
+                stop=b,
+                latitude=lat[a:b],
+                longitude=lon[a:b],
+                centroid=(float(lat_mean[i]), float(lon_mean[i])),
+                bbox=(float(lat_min[i]), float(lon_min[i]), float(lat_max[i]), float(lon_max[i])),
+            )
+
+    def __contains__(self, common_name: str) -> bool:
+        return common_name in self.records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def names(self) -> list:
+        return sorted(self.records)
+
+    def get(self, common_name: str) -> Optional[SpeciesRecord]:
+        return self.records.get(common_name)
+
+    def rows(self, common_name: str) -> pd.DataFrame:
+        """Rows of one species as a slice of the shared frame (empty if unknown)."""
+        rec = self.records.get(common_name)
+        if rec is None:
+            return self.frame.iloc[0:0]
+        return self.frame.iloc[rec.start:rec.stop]
+
+_INDEX_MEMO: "OrderedDict[int, tuple]" = OrderedDict()
+_INDEX_LOCK = threading.Lock()
+_INDEX_MEMO_SIZE = 4
+
+def species_index_for(data) -> SpeciesIndex:
+    """
+    Returns the SpeciesIndex for a frame, building it once per frame object.
+    Accepts an existing SpeciesIndex unchanged.
+    """
+    if isinstance(data, SpeciesIndex):
+        return data
+    key = id(data)
+    with _INDEX_LOCK:
+        entry = _INDEX_MEMO.get(key)
+        # The memo holds the frame itself, so its id cannot be reused while cached.
+        if entry is not None and entry[0] is data:
+            _INDEX_MEMO.move_to_end(key)
+            return entry[1]
+        index = SpeciesIndex(data)
+        _INDEX_MEMO[key] = (data, index)
+        while len(_INDEX_MEMO) > _INDEX_MEMO_SIZE:
+            _INDEX_MEMO.popitem(last=False)
+        return index
+
+def load_species_index() -> SpeciesIndex:
+    return species_index_for(load_train_metadata())
+
+if __name__ == "__main__":
+    print(f"Wrote {build_metadata_cache()}")
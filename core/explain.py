@@ -0,0 +1,74 @@
+"""
+Per-prediction drivers for the risk model: tree-path (Saabas) contributions
+from core.forest, summed from one-hot columns back to the seven risk-form
+fields. For the finite form input space they are precomputed into the risk
+table, so the Risk page and bulk export read them with an array index.
+
+Contributions explain the raw forest probabilities; calibration (when
+present) is a monotone per-class remap on top and does not change which
+fields push a prediction up or down.
+"""
+import numpy as np
+
+from core.model import ONE_HOT_PREFIXES, RISK_INPUT_FIELDS, risk_encoder
+
+# Display names of the fields, as on the risk form.
+FIELD_LABELS = {
+    "habitat": "habitat",
+    "nest_stage": "nest stage",
+    "egg_count": "egg count",
+    "chick_count": "chick count",
+    "human": "human disturbance",
+    "predator": "predator signs",
+    "noise": "noise level",
+}
+
+# Drivers shown per prediction.
+EXPLAIN_TOP = 3
+
+def field_groups(all_cols) -> tuple[list[str], np.ndarray]:
+    """
+    (field names, (columns, fields) 0/1 matrix). Form fields come first in
+    RISK_INPUT_FIELDS order; model columns outside the form get a field of their own.
+    """
+    names = list(RISK_INPUT_FIELDS)
+    owner = []
+    for col in all_cols:
+        field = col if col in RISK_INPUT_FIELDS else next(
+            (f for f, prefix in ONE_HOT_PREFIXES.items() if col.startswith(prefix + "_")), None
+        )
+        if field is None:
+            field = col
+            names.append(col)
+        owner.append(names.index(field))
+    groups = np.zeros((len(all_cols), len(names)))
+    groups[np.arange(len(all_cols)), owner] = 1.0
+    return names, groups
+
+def field_contributions(forest, all_cols, records) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """(field names, bias (classes,), contributions (rows, fields, classes)) for a CompiledForest."""
+    names, groups = field_groups(all_cols)
+    bias, contrib = forest.contributions(risk_encoder(all_cols).encode_batch(records))
+    return names, bias, np.einsum("nfc,fg->ngc", contrib, groups)
+
+def top_drivers(contrib: np.ndarray, names: list[str], k: int = EXPLAIN_TOP) -> list[tuple[str, float]]:
+    """Fields pushing hardest toward the class, from one row's (fields,) contributions to it."""
+    order = np.argsort(-contrib, kind="stable")[:k]
+    return [(names[i], float(contrib[i])) for i in order if contrib[i] > 0]
+
+def field_label(name: str) -> str:
+    return FIELD_LABELS.get(name, name.replace("_", " "))
+
+def format_drivers(drivers: list[tuple[str, float]]) -> str:
+    """'predator signs +21 pts; noise level +8 pts' (percentage points of class probability)."""
+    return "; ".join(f"{field_label(name)} +{value * 100:.0f} pts" for name, value in drivers)
+
+def format_drivers_batch(contrib: np.ndarray, names: list[str], k: int = EXPLAIN_TOP) -> np.ndarray:
+    """format_drivers for every row of an (n, fields) contribution matrix."""
+    order = np.argsort(-contrib, axis=1, kind="stable")[:, :k]
+    top = np.take_along_axis(contrib, order, axis=1)
+    labels = [field_label(name) for name in names]
+    return np.array([
+        "; ".join(f"{labels[i]} +{v * 100:.0f} pts" for i, v in zip(idx, vals) if v > 0)
+        for idx, vals in zip(order, top)
+    ], dtype=object)
@@ -0,0 +1,194 @@
+"""
+Offline stand-ins for the two Gemini SDK client shapes the app uses, so the
+chatbot can be exercised and timed without an API key or network:
+
+    FakeGenerativeModel  ->  google.generativeai GenerativeModel.generate_content(..., stream=)
+    FakeGenaiClient      ->  google.genai Client.models.generate_content[_stream](...)
+
+Both emit a canned reply in chunks, after a configurable first-token delay and
+per-chunk delay, and can fail their first calls to exercise retries. Set
+FAKE_LLM=1 to make the app use them.
+
+FakeGeminiServer speaks the Gemini REST API (generateContent and SSE
+streamGenerateContent) on localhost, so the real google-genai SDK and
+core.llm_client can be exercised end to end and upstream calls counted:
+
+    python -m core.fake_llm --port 8765 --first-token 0.5
+    LLM_BASE_URL=http://127.0.0.1:8765 GEMINI_API_KEY=fake streamlit run app.py
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+DEFAULT_REPLY = (
+    "Keep a buffer of at least 20 metres around the nest and reroute foot traffic away from it. "
+    "Put up a simple sign explaining why the area is closed, and schedule checks for quiet hours "
+    "so the adults are not flushed. Remove food waste nearby, since it draws crows and rats. "
+    "If the nest is still disturbed, contact your local wildlife authority rather than moving it."
+)
+
+@dataclass
+class FakeChunk:
+    text: str
+
+class FakeLLM:
+    """Canned reply split into chunk_chars pieces, with latency that mimics a hosted model."""
+
+    def __init__(
+        self,
+        reply: str = DEFAULT_REPLY,
+        chunk_chars: int = 24,
+        first_token_delay: float = 0.8,
+        chunk_delay: float = 0.05,
+        fail_first: int = 0,
+    ):
+        self.reply = reply
+        self.chunk_chars = max(1, int(chunk_chars))
+        self.first_token_delay = float(first_token_delay)
+        self.chunk_delay = float(chunk_delay)
+        self.fail_first = int(fail_first)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _start_call(self):
+        with self._lock:
+            self.calls += 1
+            failing = self.calls <= self.fail_first
+        if failing:
+            raise ConnectionError(f"fake connection reset (call {self.calls})")
+
+    def pieces(self) -> list[str]:
+        n = self.chunk_chars
+        return [self.reply[i:i + n] for i in range(0, len(self.reply), n)]
+
+    def stream(self) -> Iterator[FakeChunk]:
+        self._start_call()
+        time.sleep(self.first_token_delay)
+        for i, piece in enumerate(self.pieces()):
+            if i:
+                time.sleep(self.chunk_delay)
+            yield FakeChunk(piece)
+
+    def complete(self) -> FakeChunk:
+        """Blocking call: waits as long as the whole stream would, then returns everything."""
+        self._start_call()
+        time.sleep(self.first_token_delay + self.chunk_delay * (len(self.pieces()) - 1))
+        return FakeChunk(self.reply)
+
+class FakeGenerativeModel(FakeLLM):
+    """google.generativeai GenerativeModel shape."""
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        return self.stream() if stream else self.complete()
+
+class FakeGenerativeAIModule:
+    """google.generativeai module shape: GenerativeModel(model, system_instruction=...)."""
+
+    def __init__(self, **options):
+        self.options = options
+
+    def GenerativeModel(self, model, system_instruction=None, **kwargs):
+        return FakeGenerativeModel(**self.options)
+
+class _FakeModels:
+    def __init__(self, llm: FakeLLM):
+        self._llm = llm
+
+    def generate_content(self, model=None, contents=None, config=None, **kwargs):
+        return self._llm.complete()
+
+    def generate_content_stream(self, model=None, contents=None, config=None, **kwargs):
+        return self._llm.stream()
+
+class FakeGenaiClient(FakeLLM):
+    """google.genai Client shape."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.models = _FakeModels(self)
+
+def fake_from_env(sdk: str = "genai"):
+    """Fake client configured by FAKE_LLM_FIRST_TOKEN_S / FAKE_LLM_CHUNK_S / FAKE_LLM_CHUNK_CHARS."""
+    options = dict(
+        first_token_delay=float(os.getenv("FAKE_LLM_FIRST_TOKEN_S", "0.8")),
+        chunk_delay=float(os.getenv("FAKE_LLM_CHUNK_S", "0.05")),
+        chunk_chars=int(os.getenv("FAKE_LLM_CHUNK_CHARS", "24")),
+    )
+    return FakeGenaiClient(**options) if sdk == "genai" else FakeGenerativeAIModule(**options)
+
+def _rest_response(text: str) -> bytes:
+    return json.dumps({
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+    }).encode("utf-8")
+
+class _GeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeGeminiServer"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        llm = self.server.llm
+        with self.server.lock:
+            self.server.requests += 1
+        if ":streamGenerateContent" in self.path:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in llm.stream():
+                event = b"data: " + _rest_response(chunk.text) + b"\r\n\r\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        elif ":generateContent" in self.path:
+            body = _rest_response(llm.complete().text)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    """Local Gemini REST endpoint backed by a FakeLLM; `requests` counts upstream calls."""
+
+    daemon_threads = True
+
+    def __init__(self, llm: "FakeLLM | None" = None, port: int = 0):
+        super().__init__(("127.0.0.1", port), _GeminiHandler)
+        self.llm = llm or FakeLLM()
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "FakeGeminiServer":
+        threading.Thread(target=self.serve_forever, name="fake-gemini", daemon=True).start()
+        return self
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Gemini REST API on localhost.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token", type=float, default=0.8)
+    parser.add_argument("--chunk-delay", type=float, default=0.05)
+    args = parser.parse_args()
+    server = FakeGeminiServer(FakeLLM(first_token_delay=args.first_token, chunk_delay=args.chunk_delay), args.port)
+    print(f"Fake Gemini API on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
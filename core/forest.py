@@ -0,0 +1,233 @@
+"""
+The risk model's random forest flattened into packed NumPy node arrays and
+evaluated without sklearn. All trees share one node table; leaves point to
+themselves with an infinite threshold, so every row walks exactly max_depth
+steps and a batch descends all trees at once with array indexing.
+
+Results match RandomForestClassifier.predict_proba bit for bit: features are
+compared as float32 against float64 thresholds as in sklearn's tree code, leaf
+values are read the way the installed sklearn reads them, and tree probabilities are summed in
+estimator order before dividing by the number of trees.
+
+The export is cached next to the risk table in model/cache, keyed by the
+model hash:
+    python -m core.forest
+"""
+import json
+import os
+import re
+
+import numpy as np
+import streamlit as st
+
+CACHE_DIR = os.path.join("model", "cache")
+
+# Rows descended at once; bounds the (rows x trees) index arrays and keeps them in cache.
+FOREST_BATCH_ROWS = 1024
+
+# Bump when pack_forest's output changes, so exports written by older code are not reused.
+PACK_FORMAT = 2
+
+def _sklearn_version() -> tuple[int, int]:
+    import sklearn
+
+    return tuple(int(part) for part in re.match(r"(\d+)\.(\d+)", sklearn.__version__).groups())
+
+def forest_path(model_hash: str) -> str:
+    """Export path for model_hash; packed leaf values depend on the pack format and the sklearn release."""
+    major, minor = _sklearn_version()
+    return os.path.join(CACHE_DIR, f"forest_{model_hash[:16]}_p{PACK_FORMAT}_sk{major}.{minor}.npz")
+
+def _tree_values_are_fractions() -> bool:
+    """
+    sklearn >= 1.4 stores class fractions in tree_.value and predict_proba returns
+    them as is; older versions store weighted counts and normalize on predict.
+    """
+    return _sklearn_version() >= (1, 4)
+
+def pack_forest(model) -> dict:
+    """Node arrays for a fitted single-output forest classifier (uses only its public tree_ attributes)."""
+    if not hasattr(model, "estimators_"):
+        raise ValueError(f"{type(model).__name__} is not a tree ensemble")
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("only single-output forests can be compiled")
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    n_classes = len(model.classes_)
+    normalize = not _tree_values_are_fractions()
+    sizes = np.array([tree.node_count for tree in trees])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    feature, threshold, children, leaf_proba = [], [], [], []
+    for tree, offset in zip(trees, offsets):
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left == -1
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(np.where(leaf, np.inf, tree.threshold))
+        # (left, right) per node, so child = children[2 * node + (not go_left)].
+        children.append(np.stack([
+            np.where(leaf, nodes, tree.children_left),
+            np.where(leaf, nodes, tree.children_right),
+        ], axis=1) + offset)
+        proba = tree.value[:, 0, :n_classes].astype(np.float64)
+        if normalize:
+            # Same normalization as DecisionTreeClassifier.predict_proba before 1.4.
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+        leaf_proba.append(proba)
+    return {
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "children": np.concatenate(children).astype(np.int32),
+        "leaf_proba": np.concatenate(leaf_proba),
+        "roots": offsets.astype(np.int32),
+        "depth": np.array(max(tree.max_depth for tree in trees), dtype=np.int32),
+        "n_features": np.array(model.n_features_in_, dtype=np.int32),
+        "classes": np.asarray([str(c) for c in model.classes_]),
+    }
+
+def export_forest(model, path: str) -> str:
+    """Writes the packed forest to path (.npz) atomically."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Per-process temp name: concurrent exports of the same model never share a file.
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, **pack_forest(model))
+    os.replace(tmp, path)
+    return path
+
+class CompiledForest:
+    """Drop-in for the forest's predict/predict_proba on encoded feature matrices."""
+
+    def __init__(self, arrays):
+        # Stored compactly as int32; indexed as intp to avoid a cast on every gather.
+        self.feature = arrays["feature"].astype(np.intp)
+        self.threshold = arrays["threshold"]
+        self.children = arrays["children"].astype(np.intp).ravel()
+        # Normalized class probabilities of every node; predict reads the leaves, explanations the whole path.
+        self.leaf_proba = arrays["leaf_proba"]
+        self.roots = arrays["roots"].astype(np.intp)
+        self.depth = int(arrays["depth"])
+        self.n_features_in_ = int(arrays["n_features"])
+        self.classes_ = np.asarray(arrays["classes"], dtype=object)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledForest":
+        with np.load(path) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    @classmethod
+    def from_model(cls, model) -> "CompiledForest":
+        return cls(pack_forest(model))
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node reached in every tree, shape (rows, trees)."""
+        n, n_features = X.shape
+        flat = X.ravel()
+        row_base = (np.arange(n, dtype=np.intp) * n_features)[:, np.newaxis]
+        node = np.tile(self.roots, (n, 1))
+        for _ in range(self.depth):
+            go_left = np.take(flat, np.take(self.feature, node) + row_base) <= np.take(self.threshold, node)
+            node = np.take(self.children, 2 * node + 1 - go_left)
+        return node
+
+    def _check(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"expected {self.n_features_in_} features, got {X.shape[1]}")
+        return X
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = self._check(X)
+        out = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(X), FOREST_BATCH_ROWS):
+            part = X[start:start + FOREST_BATCH_ROWS]
+            # cumsum adds trees strictly in order, like sklearn's per-estimator accumulation.
+            out[start:start + len(part)] = np.cumsum(np.take(self.leaf_proba, self._leaves(part), axis=0), axis=1)[:, -1]
+        out /= len(self.roots)
+        return out
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def contributions(self, X) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Tree-path (Saabas) explanation: (bias, contributions) with bias of shape
+        (classes,) and contributions of shape (rows, features, classes). Each split
+        on the path credits its feature with the change in node probability; bias
+        plus the contributions summed over features equals predict_proba.
+        """
+        X = self._check(X)
+        n_classes = len(self.classes_)
+        n_trees = len(self.roots)
+        bias = self.leaf_proba[self.roots].sum(axis=0) / n_trees
+        out = np.zeros((len(X), self.n_features_in_, n_classes))
+        for start in range(0, len(X), FOREST_BATCH_ROWS):
+            part = X[start:start + FOREST_BATCH_ROWS]
+            n = len(part)
+            flat = part.ravel()
+            row_base = (np.arange(n, dtype=np.intp) * self.n_features_in_)[:, np.newaxis]
+            slot = np.broadcast_to(row_base, (n, n_trees)).ravel()
+            node = np.tile(self.roots, (n, 1))
+            credit = np.zeros((n * self.n_features_in_, n_classes))
+            for _ in range(self.depth):
+                feature = np.take(self.feature, node)
+                go_left = np.take(flat, feature + row_base) <= np.take(self.threshold, node)
+                child = np.take(self.children, 2 * node + 1 - go_left)
+                # Leaves loop to themselves, so finished paths add nothing.
+                delta = (np.take(self.leaf_proba, child, axis=0) - np.take(self.leaf_proba, node, axis=0)).reshape(-1, n_classes)
+                index = slot + feature.ravel()
+                for c in range(n_classes):
+                    credit[:, c] += np.bincount(index, weights=delta[:, c], minlength=len(credit))
+                node = child
+            out[start:start + n] = credit.reshape(n, self.n_features_in_, n_classes) / n_trees
+        return bias, out
+
+def as_compiled(model) -> CompiledForest:
+    """model itself if already compiled, else its packed form (raises ValueError if it is not a forest)."""
+    if isinstance(model, CompiledForest):
+        return model
+    return CompiledForest.from_model(model)
+
+def open_compiled_forest(model, model_hash: str) -> CompiledForest:
+    """Loads the cached export for model_hash, exporting model first if there is none."""
+    path = forest_path(model_hash)
+    if not os.path.exists(path):
+        export_forest(model, path)
+        # Exports for older model versions or formats are never read again; other
+        # processes' unfinished exports (.tmp) are left alone.
+        for name in os.listdir(CACHE_DIR):
+            other = os.path.join(CACHE_DIR, name)
+            if name.startswith("forest_") and ".tmp" not in name and other != path:
+                try:
+                    os.remove(other)
+                except FileNotFoundError:
+                    pass  # pruned by another process
+    return CompiledForest.load(path)
+
+@st.cache_resource(max_entries=2)
+def _load_compiled_forest(model_hash: str, _loaded) -> CompiledForest:
+    return open_compiled_forest(_loaded.model, model_hash)
+
+def load_compiled_forest(loaded=None) -> CompiledForest:
+    """Process-wide compiled forest for a core.registry LoadedModel (default: the current risk model)."""
+    from core.registry import current_risk_model
+
+    loaded = loaded or current_risk_model()
+    return _load_compiled_forest(loaded.sha256, loaded)
+
+if __name__ == "__main__":
+    from core.registry import current_risk_model, get_model_registry
+
+    loaded = current_risk_model(get_model_registry())
+    forest = open_compiled_forest(loaded.model, loaded.sha256)
+    path = forest_path(loaded.sha256)
+    print(json.dumps({
+        "model_version": loaded.version,
+        "path": path,
+        "bytes": os.path.getsize(path),
+        "trees": len(forest.roots),
+        "nodes": len(forest.feature),
+        "depth": forest.depth,
+        "classes": list(forest.classes_),
+    }, indent=2))
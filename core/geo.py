@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+
+# Upper bound on points sent to the browser per layer; override with env vars.
+HEATMAP_MAX_POINTS = int(os.getenv("HEATMAP_MAX_POINTS", "2000"))
+MARKER_MAX_POINTS = int(os.getenv("MARKER_MAX_POINTS", "5000"))
+
+# Side of a heatmap cell in screen pixels at the rendered zoom level.
+CELL_PIXELS = 8
+TILE_PIXELS = 256
+
+def cell_degrees(zoom: int, cell_pixels: int = CELL_PIXELS) -> float:
+    """Degrees covered by cell_pixels at a Web Mercator zoom level."""
+    return 360.0 / (TILE_PIXELS * 2 ** zoom) * cell_pixels
+
+def _finite(latitude, longitude) -> tuple[np.ndarray, np.ndarray]:
+    lat = np.asarray(latitude, dtype=np.float64)
+    lon = np.asarray(longitude, dtype=np.float64)
+    keep = np.isfinite(lat) & np.isfinite(lon)
+    return lat[keep], lon[keep]
+
+def bin_coordinates(
+    latitude,
+    longitude,
+    zoom: int = 5,
+    max_points: int = HEATMAP_MAX_POINTS,
+    cell_pixels: int = CELL_PIXELS,
+) -> np.ndarray:
+    """
+    Aggregates sightings into a square grid sized to the zoom level and returns
+    an (n, 3) array of [cell centroid lat, cell centroid lon, count].
+    The cell size doubles until at most max_points cells are occupied.
+    """
+    lat, lon = _finite(latitude, longitude)
+    if lat.size == 0:
+        return np.empty((0, 3))
+
+    cell = cell_degrees(zoom, cell_pixels)
+    while True:
+        ix = np.floor(lat / cell).astype(np.int64)
+        iy = np.floor(lon / cell).astype(np.int64)
+        ix -= ix.min()
+        iy -= iy.min()
+        keys = ix * (int(iy.max()) + 1) + iy
+        uniq, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        if uniq.size <= max(max_points, 1):
+            break
+        cell *= 2
+
+    # Weighted centroids keep hotspots where the sightings are, not on grid corners.
+    out = np.empty((uniq.size, 3))
+    out[:, 0] = np.bincount(inverse, weights=lat) / counts
+    out[:, 1] = np.bincount(inverse, weights=lon) / counts
+    out[:, 2] = counts
+    return out
+
+def downsample(latitude, longitude, max_points: int = MARKER_MAX_POINTS, seed: int = 0) -> np.ndarray:
+    """(n, 2) coordinates, reduced to a reproducible uniform sample of max_points."""
+    lat, lon = _finite(latitude, longitude)
+    coords = np.column_stack([lat, lon])
+    if len(coords) <= max_points:
+        return coords
+    keep = np.sort(np.random.default_rng(seed).choice(len(coords), size=max_points, replace=False))
+    return coords[keep]
@@ -0,0 +1,406 @@
+"""
+One Gemini client per server process, shared by the chatbot and the Risk page.
+
+The google-genai SDK is preferred (a single httpx pool keeps connections alive
+across sessions); google-generativeai is the fallback. Every call goes through a
+concurrency limit, a bounded queue with a rate cap, a per-request timeout and
+retries with jittered backoff; identical in-flight requests share one call.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Hashable, Iterator, Optional
+
+import streamlit as st
+
+# Tunables; override with env vars.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_S = float(os.getenv("LLM_BACKOFF_S", "0.5"))
+LLM_BACKOFF_MAX_S = 8.0
+# Admission control: requests allowed to wait for a slot, and the upstream rate cap (0 = off).
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_RATE_PER_MIN = float(os.getenv("LLM_RATE_PER_MIN", "60"))
+# Point google-genai at another endpoint, e.g. the local fake server in core.fake_llm.
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
+
+# HTTP statuses worth retrying: timeouts, rate limits and server-side failures.
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+def _secret(name: str) -> str:
+    try:
+        value = st.secrets.get(name)
+    except Exception:
+        value = None
+    return value or os.getenv(name, "")
+
+def api_key() -> str:
+    """GEMINI_API_KEY (used by app.py) or GOOGLE_API_KEY (used by core.chat), from secrets or env."""
+    return _secret("GEMINI_API_KEY") or _secret("GOOGLE_API_KEY")
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # google.genai APIError and google.api_core exceptions both carry the HTTP status as .code
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in RETRYABLE_STATUS:
+        return True
+    name = type(error).__name__
+    return any(word in name for word in ("Timeout", "Connect", "Unavailable", "Exhausted", "Deadline"))
+
+def response_text(response) -> str:
+    """Text of a response or streamed chunk from either SDK; empty for safety/metadata-only chunks."""
+    try:
+        return response.text or ""
+    except (AttributeError, ValueError):
+        pass
+    try:
+        return "".join(getattr(p, "text", "") or "" for p in response.candidates[0].content.parts)
+    except (AttributeError, IndexError, TypeError):
+        return ""
+
+class LLMOverloaded(RuntimeError):
+    """Raised instead of queueing when the request queue is full or the rate limit cannot be met in time."""
+
+class RateLimiter:
+    """
+    Requests-per-minute limit (GCRA): calls are spaced 60/per_minute apart, with
+    up to `burst` back-to-back. per_minute <= 0 disables it.
+    """
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.burst = max(1, int(burst))
+        self._tat = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Seconds to wait before sending, or None (nothing reserved) if that exceeds max_wait."""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            wait = max(0.0, tat - now - (self.burst - 1) * self.interval)
+            if wait > max_wait:
+                return None
+            self._tat = tat + self.interval
+            return wait
+
+class SingleFlight:
+    """Concurrent calls with the same key run fn once; every caller gets its result or exception."""
+
+    def __init__(self):
+        self._calls: "dict[Hashable, Future]" = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], object]):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+class _Broadcast:
+    """
+    One upstream stream replayed to any number of readers. A daemon thread pumps
+    it, so a reader that stops early does not stall the others.
+    """
+
+    def __init__(self, source: Iterator, on_done: Callable[[], None]):
+        self._chunks = []
+        self._done = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._on_done = on_done
+        threading.Thread(target=self._pump, args=(source,), name="llm-stream", daemon=True).start()
+
+    def _pump(self, source: Iterator):
+        try:
+            for chunk in source:
+                with self._cond:
+                    self._chunks.append(chunk)
+                    self._cond.notify_all()
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._on_done()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def __iter__(self) -> Iterator[str]:
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self._chunks) and not self._done:
+                    self._cond.wait()
+                if i < len(self._chunks):
+                    chunk = self._chunks[i]
+                    i += 1
+                elif self._error is not None:
+                    raise self._error
+                else:
+                    return
+            yield chunk
+
+class LLMClient:
+    """
+    Thread-safe wrapper around one SDK client. backend is "genai" (google-genai
+    Client) or "generativeai" (configured google.generativeai module).
+
+    Identical concurrent requests share one upstream call. At most max_concurrency
+    run at once and at most max_queue wait for a slot; beyond that, and when the
+    rate limit cannot be met within the timeout, calls fail fast with LLMOverloaded.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        sdk_client,
+        types=None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout_s: float = LLM_TIMEOUT_S,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_s: float = LLM_BACKOFF_S,
+        max_queue: int = LLM_MAX_QUEUE,
+        rate_per_min: float = LLM_RATE_PER_MIN,
+        coalesce: bool = True,
+    ):
+        self.backend = backend
+        self.sdk_client = sdk_client
+        self.types = types
+        self.max_concurrency = int(max_concurrency)
+        self.timeout_s = float(timeout_s)
+        self.max_retries = int(max_retries)
+        self.backoff_s = float(backoff_s)
+        self.max_queue = int(max_queue)
+        self.coalesce = coalesce
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._rate = RateLimiter(rate_per_min, burst=self.max_concurrency)
+        self._flight = SingleFlight()
+        self._streams: "dict[Hashable, _Broadcast]" = {}
+        self._models = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.shared_streams = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting = 0
+
+    def _model(self, model: str, system_instruction: Optional[str]):
+        """google.generativeai needs one GenerativeModel per (model, system prompt); build each once."""
+        key = (model, system_instruction)
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = self.sdk_client.GenerativeModel(model, system_instruction=system_instruction)
+            return self._models[key]
+
+    def _call(self, model: str, contents: str, system_instruction: Optional[str], stream: bool):
+        if self.backend == "genai":
+            config = None
+            if system_instruction and self.types is not None:
+                config = self.types.GenerateContentConfig(system_instruction=system_instruction)
+            models = self.sdk_client.models
+            call = models.generate_content_stream if stream else models.generate_content
+            return call(model=model, contents=contents, config=config)
+        return self._model(model, system_instruction).generate_content(
+            contents, stream=stream, request_options={"timeout": self.timeout_s}
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying sessions from hitting the API in lockstep.
+        return random.uniform(0, min(LLM_BACKOFF_MAX_S, self.backoff_s * 2 ** attempt))
+
+    def _reject(self, message: str):
+        with self._lock:
+            self.rejected += 1
+        raise LLMOverloaded(message)
+
+    def _acquire(self):
+        """Admission control: bounded wait for a slot, then for the rate limit."""
+        with self._lock:
+            admitted = self.waiting < self.max_queue
+            if admitted:
+                self.waiting += 1
+        if not admitted:
+            self._reject(f"Gemini is busy ({self.max_queue} requests queued); please try again shortly.")
+        start = time.monotonic()
+        try:
+            acquired = self._slots.acquire(timeout=self.timeout_s)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            self._reject(f"All {self.max_concurrency} Gemini request slots busy for {self.timeout_s:.0f} s.")
+        delay = self._rate.reserve(max_wait=self.timeout_s - (time.monotonic() - start))
+        if delay is None:
+            self._slots.release()
+            self._reject("Gemini request rate limit reached; please try again shortly.")
+        time.sleep(delay)
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.requests += 1
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _with_retries(self, attempt_call: Callable[[int], object]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return attempt_call(attempt)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self._backoff(attempt))
+
+    def generate(self, model: str, contents: str, system_instruction: Optional[str] = None) -> str:
+        """Full reply text; raises after max_retries transient failures."""
+        def attempt(_):
+            self._acquire()
+            try:
+                return response_text(self._call(model, contents, system_instruction, stream=False)).strip()
+            finally:
+                self._release()
+
+        def call():
+            return self._with_retries(attempt)
+
+        if not self.coalesce:
+            return call()
+        return self._flight.do(("generate", model, system_instruction, contents), call)
+
+    def stream(self, model: str, contents: str, system_instruction: Optional[str] = None) -> Iterator[str]:
+        """
+        Yields reply text as it arrives. Failures before the first chunk are retried;
+        once text has been shown, errors propagate to the caller. Readers that join
+        while an identical stream is running get it from the start.
+        """
+        if not self.coalesce:
+            yield from self._stream(model, contents, system_instruction)
+            return
+        key = ("stream", model, system_instruction, contents)
+        with self._lock:
+            shared = self._streams.get(key)
+            if shared is None:
+                shared = self._streams[key] = _Broadcast(
+                    self._stream(model, contents, system_instruction),
+                    on_done=lambda: self._end_stream(key),
+                )
+            else:
+                self.shared_streams += 1
+        yield from shared
+
+    def _end_stream(self, key: Hashable):
+        with self._lock:
+            self._streams.pop(key, None)
+
+    def _stream(self, model: str, contents: str, system_instruction: Optional[str]) -> Iterator[str]:
+        self._acquire()
+        try:
+            chunks = iter(self._with_retries(lambda _: self._first_chunk(model, contents, system_instruction)))
+            for chunk in chunks:
+                text = response_text(chunk)
+                if text:
+                    yield text
+        finally:
+            self._release()
+
+    def _first_chunk(self, model: str, contents: str, system_instruction: Optional[str]):
+        """Starts a stream and waits for its first chunk, so connection errors surface here."""
+        chunks = iter(self._call(model, contents, system_instruction, stream=True))
+        try:
+            first = next(chunks)
+        except StopIteration:
+            return []
+        return _prepend(first, chunks)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "waiting": self.waiting,
+                "requests": self.requests,
+                "coalesced": self._flight.shared + self.shared_streams,
+                "rejected": self.rejected,
+                "retries": self.retries,
+                "failures": self.failures,
+            }
+
+def _prepend(first, rest: Iterator) -> Iterator:
+    yield first
+    yield from rest
+
+def _genai_client(key: str, types):
+    from google import genai
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONCURRENCY,
+        max_keepalive_connections=LLM_MAX_CONCURRENCY,
+        keepalive_expiry=60,
+    )
+    http_options = types.HttpOptions(timeout=int(LLM_TIMEOUT_S * 1000), client_args={"limits": limits})
+    if LLM_BASE_URL:
+        http_options.base_url = LLM_BASE_URL
+    return genai.Client(api_key=key, http_options=http_options)
+
+def _load_types():
+    try:
+        from google.genai import types
+        return types
+    except Exception:
+        return None
+
+@st.cache_resource
+def get_llm_client() -> LLMClient:
+    """The process-wide client; raises RuntimeError when no key or SDK is available."""
+    if os.getenv("FAKE_LLM") == "1":
+        from core.fake_llm import fake_from_env
+        return LLMClient("genai", fake_from_env("genai"), _load_types())
+
+    key = api_key()
+    if not key:
+        raise RuntimeError("GEMINI_API_KEY / GOOGLE_API_KEY not found in secrets or environment.")
+    types = _load_types()
+    if types is not None:
+        return LLMClient("genai", _genai_client(key, types), types)
+    try:
+        import google.generativeai as generativeai
+    except Exception:
+        raise RuntimeError("Gemini SDK not available. Install `google-genai`.") from None
+    generativeai.configure(api_key=key)
+    return LLMClient("generativeai", generativeai)
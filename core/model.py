@@ -1,14 +1,47 @@
-import streamlit as st
-import joblib
+import functools
+import threading
+
+import numpy as np
 import pandas as pd
 
-@st.cache_resource
+MODEL_PATH = "model/risk_model.pkl"
+COLUMNS_PATH = "model/risk_model_columns.pkl"
+CALIBRATION_PATH = "model/risk_model_calibration.json"
+
+# Input fields of the risk form, in the order used for records and batches.
+RISK_INPUT_FIELDS = ("habitat", "nest_stage", "egg_count", "chick_count", "human", "predator", "noise")
+
+# Every value the risk form can submit for each field.
+RISK_FIELD_VALUES = {
+    "habitat": ["Trees", "Wetland", "Grassland", "Urban", "Coastal"],
+    "nest_stage": ["Eggs", "Chicks", "Building", "Failed", "Empty"],
+    "egg_count": list(range(0, 13)),
+    "chick_count": list(range(0, 11)),
+    "human": ["None", "Low", "Moderate", "High"],
+    "predator": ["None", "Low", "Moderate", "High"],
+    "noise": ["Quiet", "Moderate", "Loud"],
+}
+
+# Categorical form fields and the one-hot column prefix each one expands to.
+ONE_HOT_PREFIXES = {
+    "habitat": "habitat_type",
+    "nest_stage": "nest_stage",
+    "human": "human_disturbance",
+    "predator": "predator_signs",
+    "noise": "noise_level",
+}
+
 def load_risk_model():
-    return joblib.load("model/risk_model.pkl")
+    """Current risk model from core.registry (loaded once, reloaded when the file changes)."""
+    from core.registry import current_risk_model
+
+    return current_risk_model().model
 
-@st.cache_data
 def load_columns():
-    return joblib.load("model/risk_model_columns.pkl")
+    """Columns of the current risk model; prefer current_risk_model() to get both as one version."""
+    from core.registry import current_risk_model
+
+    return current_risk_model().columns
 
 def predict_risk_from_manual(
     model,
@@ -21,22 +54,177 @@ def predict_risk_from_manual(
     predator,
     noise,
 ):
-    row = {
-        "egg_count": egg_count,
-        "chick_count": chick_count,
-        f"habitat_type_{habitat}": 1,
-        f"nest_stage_{nest_stage}": 1,
-        f"human_disturbance_{human}": 1,
-        f"predator_signs_{predator}": 1,
-        f"noise_level_{noise}": 1,
-    }
-    df = pd.DataFrame([row])
-    for col in all_cols:
-        if col not in df.columns:
-            df[col] = 0
-    df = df[all_cols]
-    pred = model.predict(df)[0]
-    return pred
+    encoder = risk_encoder(all_cols)
+    row = encoder.encode_one(habitat, nest_stage, egg_count, chick_count, human, predator, noise)
+    return model.predict(encoder.model_input(model, row))[0]
+
+def predict_nest_risk_fallback(params):
+    risk_score = 0
+    if params['human'] in ['Moderate', 'High']:
+        risk_score += 1
+    if params['predator'] in ['Moderate', 'High']:
+        risk_score += 1
+    if params['noise'] == 'Loud':
+        risk_score += 1
+    if params['habitat'] == 'Urban':
+        risk_score += 1
+    if params['egg_count'] > 5 or params['chick_count'] > 5:
+        risk_score += 1
+    if risk_score >= 3:
+        return 'High'
+    elif risk_score >= 1:
+        return 'Medium'
+    else:
+        return 'Low'
+
+# Labels indexed by min(rule score, 3); same thresholds as predict_nest_risk_fallback.
+_FALLBACK_LABELS = np.array(['Low', 'Medium', 'Medium', 'High'], dtype=object)
+
+def predict_nest_risk_fallback_batch(records) -> np.ndarray:
+    """
+    Vectorized predict_nest_risk_fallback: takes a DataFrame or a dict of equal-length
+    columns (habitat, egg_count, chick_count, human, predator, noise) and returns an
+    object array of 'Low' / 'Medium' / 'High', identical to the scalar rules row by row.
+    """
+    def column(name):
+        values = records[name]
+        if isinstance(values, pd.Series):
+            return values.reset_index(drop=True)
+        values = np.asarray(values).ravel()
+        # Explicit object dtype skips pandas' per-element type inference on labels.
+        return pd.Series(values, dtype=object if values.dtype.kind in 'OUS' else None, copy=False)
+
+    def count(name):
+        return pd.to_numeric(column(name), errors='coerce').to_numpy(dtype=np.float64)
+
+    score = (
+        column('human').isin(['Moderate', 'High']).to_numpy(dtype=np.int8)
+        + column('predator').isin(['Moderate', 'High']).to_numpy(dtype=np.int8)
+        + (column('noise') == 'Loud').to_numpy(dtype=np.int8)
+        + (column('habitat') == 'Urban').to_numpy(dtype=np.int8)
+    )
+    score += (count('egg_count') > 5) | (count('chick_count') > 5)
+    return _FALLBACK_LABELS[np.minimum(score, 3)]
+
+def _records_frame(records) -> pd.DataFrame:
+    if isinstance(records, pd.DataFrame):
+        frame = records
+    else:
+        frame = pd.DataFrame.from_records(list(records), columns=list(RISK_INPUT_FIELDS))
+    missing = [f for f in RISK_INPUT_FIELDS if f not in frame.columns]
+    if missing:
+        raise ValueError(f"Nest records are missing fields: {', '.join(missing)}")
+    return frame
+
+class RiskEncoder:
+    """
+    Risk-form inputs to model feature rows. Every form value is resolved to its
+    column offset once, from the model columns; encoding then only writes ones
+    into a zeroed float32 buffer. Values without a column (the reference
+    categories dropped by one-hot encoding, e.g. Urban, Coastal, None) leave
+    their group all-zero; values outside RISK_FIELD_VALUES raise ValueError.
+    """
+
+    def __init__(self, all_cols, vocabulary: dict = RISK_FIELD_VALUES):
+        self.columns = list(all_cols)
+        self.n_features = len(self.columns)
+        col_index = {col: i for i, col in enumerate(self.columns)}
+        self._numeric = [(field, col_index[field]) for field in ("egg_count", "chick_count") if field in col_index]
+        self._categories = {field: list(vocabulary[field]) for field in ONE_HOT_PREFIXES}
+        self._offsets = {
+            field: {value: col_index.get(f"{prefix}_{value}", -1) for value in vocabulary[field]}
+            for field, prefix in ONE_HOT_PREFIXES.items()
+        }
+        self._offset_arrays = {
+            field: np.array([offsets[value] for value in self._categories[field]], dtype=np.intp)
+            for field, offsets in self._offsets.items()
+        }
+        self._local = threading.local()
+
+    def _unknown(self, field: str, values) -> ValueError:
+        shown = ", ".join(repr(v) for v in list(values)[:5])
+        return ValueError(f"Unknown {field} value(s) {shown}; expected one of {', '.join(self._categories[field])}")
+
+    def encode_one(self, habitat, nest_stage, egg_count, chick_count, human, predator, noise) -> np.ndarray:
+        """
+        One nest as a (1, n_features) row. The buffer is reused per thread, so use
+        the result before encoding the next nest on the same thread.
+        """
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = self._local.row = np.zeros((1, self.n_features), dtype=np.float32)
+        else:
+            row.fill(0.0)
+        counts = {"egg_count": egg_count, "chick_count": chick_count}
+        for field, col in self._numeric:
+            row[0, col] = counts[field]
+        for field, value in (("habitat", habitat), ("nest_stage", nest_stage), ("human", human), ("predator", predator), ("noise", noise)):
+            col = self._offsets[field].get(value)
+            if col is None:
+                raise self._unknown(field, [value])
+            if col >= 0:
+                row[0, col] = 1.0
+        return row
+
+    def encode_batch(self, records, out: "np.ndarray | None" = None) -> np.ndarray:
+        """Many nests (DataFrame or list of dicts) as an (n, n_features) float32 matrix, written into out if given."""
+        frame = _records_frame(records)
+        n = len(frame)
+        if out is None:
+            X = np.zeros((n, self.n_features), dtype=np.float32)
+        else:
+            X = out[:n]
+            X.fill(0.0)
+        for field, col in self._numeric:
+            X[:, col] = frame[field].to_numpy(dtype=np.float32)
+        rows = np.arange(n)
+        for field, offsets in self._offset_arrays.items():
+            values = frame[field].astype(str)
+            codes = pd.Categorical(values, categories=self._categories[field]).codes
+            if (codes < 0).any():
+                raise self._unknown(field, values[codes < 0].unique())
+            pos = offsets[codes]
+            hit = pos >= 0
+            X[rows[hit], pos[hit]] = 1.0
+        return X
+
+    def model_input(self, model, X: np.ndarray):
+        """X as the model expects it: a named frame for estimators fitted on one (sklearn checks names), else the array."""
+        if getattr(model, "feature_names_in_", None) is not None:
+            return pd.DataFrame(X, columns=self.columns, copy=False)
+        return X
+
+@functools.lru_cache(maxsize=8)
+def _risk_encoder(columns: tuple) -> RiskEncoder:
+    return RiskEncoder(columns)
+
+def risk_encoder(all_cols) -> RiskEncoder:
+    """Shared encoder for a column list, built on first use."""
+    return _risk_encoder(tuple(all_cols))
+
+def encode_risk_inputs(all_cols, records) -> pd.DataFrame:
+    """One-hot encodes many nests against the model columns in one pass (see RiskEncoder)."""
+    return pd.DataFrame(risk_encoder(all_cols).encode_batch(records), columns=list(all_cols), copy=False)
+
+def predict_risk_batch(model, all_cols, records) -> np.ndarray:
+    """
+    Scores a list of nest dicts (or a DataFrame) with a single model.predict call.
+    Records use the same keys as the risk form: habitat, nest_stage, egg_count,
+    chick_count, human, predator, noise.
+    """
+    encoder = risk_encoder(all_cols)
+    X = encoder.encode_batch(records)
+    if not len(X):
+        return np.empty(0, dtype=object)
+    return model.predict(encoder.model_input(model, X))
+
+def predict_proba_batch(model, all_cols, records) -> np.ndarray:
+    """Raw class probabilities, shape (n, len(model.classes_)); see core.calibration to calibrate them."""
+    encoder = risk_encoder(all_cols)
+    X = encoder.encode_batch(records)
+    if not len(X):
+        return np.empty((0, len(model.classes_)), dtype=np.float64)
+    return model.predict_proba(encoder.model_input(model, X))
 
 def recommend_mitigation(
     risk_level: str,
@@ -51,57 +239,18 @@ def recommend_mitigation(
     """
     Returns a prioritized list of concise, practical actions based on inputs.
     Works fully offline; designed to be optionally refined by LLMs.
+    The rules live in core.rules (surface "mitigation"), capped at 8 items.
     """
-    recs = []
-
-    # Base on risk level
-    if str(risk_level).lower() in {"high", "severe", "3", "4"}:
-        recs.append("Initiate immediate protective measures and increase monitoring frequency to daily.")
-        recs.append("Flag the site to local conservation/forest officials and record GPS with photos.")
-    elif str(risk_level).lower() in {"moderate", "2"}:
-        recs.append("Schedule regular monitoring (every 2–3 days) and log any changes in activity or threats.")
-    else:
-        recs.append("Maintain weekly checks and keep disturbance minimal around the nest site.")
-
-    # Human disturbance
-    if human in {"Moderate", "High"}:
-        recs.append("Establish a 20–50 m buffer zone with temporary signage to reduce foot traffic.")
-        recs.append("Reroute nearby paths and briefly halt noisy activities until chicks fledge.")
-
-    # Predators
-    if predator in {"Moderate", "High"}:
-        recs.append("Install non-intrusive deterrents (e.g., reflective tape, visual decoys) outside the nest line-of-sight.")
-        recs.append("Remove attractants (food scraps) and secure waste to discourage predators.")
-
-    # Noise
-    if noise in {"Moderate", "Loud"}:
-        recs.append("Limit loud machinery and schedule unavoidable noise outside early morning/late evening peak activity.")
-        recs.append("If near roads, consider temporary sound barriers or speed calming measures.")
-
-    # Habitat specific
-    if habitat == "Wetland":
-        recs.append("Maintain stable water levels and avoid bank vegetation clearance during nesting.")
-    elif habitat == "Trees":
-        recs.append("Avoid pruning or tree work within a 50 m radius until the nesting period ends.")
-    elif habitat == "Grassland":
-        recs.append("Delay mowing and keep machinery at least 30 m from the nest area.")
-
-    # Stage specific
-    if nest_stage in {"Eggs", "Chicks"}:
-        recs.append("Minimize visits to <10 minutes and keep observers concealed to prevent abandonment.")
-        recs.append("Record temperature/weather changes that could impact incubation or chick thermoregulation.")
-
-    # Clutch/brood size context
-    if egg_count >= 5 or chick_count >= 3:
-        recs.append("Prioritize continuous monitoring due to higher reproductive investment at this site.")
-
-    # De-duplicate while preserving order
-    deduped = []
-    seen = set()
-    for r in recs:
-        if r not in seen:
-            deduped.append(r)
-            seen.add(r)
-
-    # Limit to a practical number for field use
-    return deduped[:8]
+    from core.rules import recommend  # core.rules builds on this module's constants
+
+    return recommend(
+        "mitigation",
+        risk_level,
+        habitat=habitat,
+        nest_stage=nest_stage,
+        egg_count=egg_count,
+        chick_count=chick_count,
+        human=human,
+        predator=predator,
+        noise=noise,
+    )
@@ -0,0 +1,62 @@
+"""
+Background Gemini refinement of the Risk page recommendations. The offline list
+is rendered straight away; the refined text replaces it only if it arrives
+before the deadline. Results are cached per input tuple by core.chat.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import streamlit as st
+
+from core.chat import refine_recommendations
+from core.model import RISK_INPUT_FIELDS
+
+REFINE_DEADLINE_S = float(os.getenv("REFINE_DEADLINE_S", "8"))
+REFINE_WORKERS = int(os.getenv("REFINE_WORKERS", "4"))
+
+def refine_key(risk_level: str, params: dict) -> tuple:
+    return (risk_level,) + tuple(params[f] for f in RISK_INPUT_FIELDS)
+
+class RefinementPool:
+    """Thread pool for refinement calls; identical inputs in flight share one future."""
+
+    def __init__(self, workers: int = REFINE_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="refine")
+        self._pending: "dict[tuple, Future]" = {}
+        self._lock = threading.Lock()
+
+    def submit(self, risk_level: str, params: dict, base_recommendations: list[str]) -> Future:
+        key = refine_key(risk_level, params)
+        with self._lock:
+            future = self._pending.get(key)
+            fresh = future is None
+            if fresh:
+                future = self._executor.submit(
+                    refine_recommendations,
+                    risk_level,
+                    *(params[f] for f in RISK_INPUT_FIELDS),
+                    base_recommendations=list(base_recommendations),
+                )
+                self._pending[key] = future
+        # Outside the lock: a future that is already done runs the callback right here.
+        if fresh:
+            future.add_done_callback(lambda _, key=key: self._forget(key))
+        return future
+
+    def _forget(self, key: tuple):
+        with self._lock:
+            self._pending.pop(key, None)
+
+def wait_for_refinement(future: Future, deadline: float) -> Optional[str]:
+    """Refined text, or None if it failed or did not finish by the time.monotonic() deadline."""
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except Exception:
+        return None
+
+@st.cache_resource
+def get_refinement_pool() -> RefinementPool:
+    return RefinementPool()
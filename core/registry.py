@@ -0,0 +1,201 @@
+"""
+Process-wide model registry. Each artifact is read once, validated against its
+column list and identified by the SHA-256 of its files. When a file changes on
+disk the new version is loaded and validated off to the side, then swapped in
+with a single reference assignment: predictions already holding the old
+LoadedModel finish on it, the next request gets the new one, and a broken or
+half-written file leaves the current version serving.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+from typing import Optional
+
+import joblib
+import streamlit as st
+
+from core.calibration import Calibration
+from core.model import CALIBRATION_PATH, COLUMNS_PATH, MODEL_PATH
+
+# Seconds between checks of the artifact files; override with an env var.
+REGISTRY_POLL_S = float(os.getenv("REGISTRY_POLL_S", "2"))
+
+def _signature(model_path: str, columns_path: str, calibration_path: Optional[str] = None) -> tuple:
+    """
+    (mtime_ns, size) of each file; changes whenever a file is rewritten or replaced.
+    The optional calibration file counts as (0, 0) while absent.
+    """
+    stats = [os.stat(model_path), os.stat(columns_path)]
+    signature = tuple((s.st_mtime_ns, s.st_size) for s in stats)
+    if calibration_path and os.path.exists(calibration_path):
+        s = os.stat(calibration_path)
+        return signature + ((s.st_mtime_ns, s.st_size),)
+    return signature + ((0, 0),)
+
+def _reload_trigger(signature: tuple) -> tuple:
+    """
+    The parts of a signature that start a reload: the model and calibration files.
+    A new columns file alone is read with the next model, so replacing the columns
+    first and the model second (core.train.promote) never exposes a mismatched pair.
+    """
+    return signature[:1] + signature[2:]
+
+def validate_model(model, columns) -> None:
+    """Raises ValueError if model cannot score frames laid out as columns."""
+    columns = list(columns)
+    if not hasattr(model, "predict") or not hasattr(model, "classes_"):
+        raise ValueError(f"{type(model).__name__} is not a fitted classifier")
+    n_features = getattr(model, "n_features_in_", len(columns))
+    if n_features != len(columns):
+        raise ValueError(f"model expects {n_features} features, columns file lists {len(columns)}")
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None and list(names) != columns:
+        raise ValueError("model feature names do not match the columns file")
+
+class LoadedModel:
+    """One version of a model and its columns; never mutated once serving except for its file signature."""
+
+    def __init__(
+        self,
+        name: str,
+        model,
+        columns: list,
+        sha256: str,
+        signature: tuple,
+        calibration: Optional[Calibration] = None,
+        calibration_note: str = "",
+    ):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.sha256 = sha256
+        self.signature = signature
+        self.calibration = calibration
+        self.calibration_note = calibration_note
+        self.loaded_at = time.time()
+
+    @property
+    def version(self) -> str:
+        return self.sha256[:12]
+
+    @property
+    def cache_key(self) -> str:
+        """Model hash, extended by the calibration hash when one applies; keys the precomputed tables."""
+        if self.calibration is None:
+            return self.sha256
+        return hashlib.sha256((self.sha256 + self.calibration.sha256).encode("ascii")).hexdigest()
+
+def _read_calibration(path: Optional[str], model, model_sha256: str) -> tuple[Optional[Calibration], str]:
+    """(calibration, note); a missing, stale or mismatched file serves raw probabilities."""
+    if not path or not os.path.exists(path):
+        return None, "uncalibrated"
+    try:
+        with open(path, encoding="utf-8") as f:
+            calibration = Calibration.from_json(f.read())
+    except (OSError, ValueError, KeyError) as e:
+        return None, f"calibration file unreadable ({e})"
+    if calibration.model_sha256 != model_sha256:
+        return None, "calibration was fitted for another model version"
+    if calibration.classes != [str(c) for c in model.classes_]:
+        return None, "calibration classes do not match the model"
+    return calibration, f"{calibration.method} calibration"
+
+def load_artifact(name: str, model_path: str, columns_path: str, calibration_path: Optional[str] = None) -> LoadedModel:
+    """
+    Reads both files once, hashes exactly the bytes that are unpickled (same digest
+    as core.risk_table.artifacts_sha256) and validates the pair. A calibration file
+    fitted for this digest is attached if present.
+    """
+    signature = _signature(model_path, columns_path, calibration_path)
+    digest = hashlib.sha256()
+    blobs = []
+    for path in (model_path, columns_path):
+        with open(path, "rb") as f:
+            blob = f.read()
+        digest.update(blob)
+        blobs.append(blob)
+    if _signature(model_path, columns_path, calibration_path) != signature:
+        raise ValueError(f"{name} artifacts changed while being read")
+    model = joblib.load(io.BytesIO(blobs[0]))
+    columns = list(joblib.load(io.BytesIO(blobs[1])))
+    validate_model(model, columns)
+    sha256 = digest.hexdigest()
+    calibration, note = _read_calibration(calibration_path, model, sha256)
+    return LoadedModel(name, model, columns, sha256, signature, calibration, note)
+
+class ModelRegistry:
+    """Named model artifacts, each loaded once and hot-swapped when its files change."""
+
+    def __init__(self, poll_s: float = REGISTRY_POLL_S):
+        self.poll_s = poll_s
+        self._paths: dict[str, tuple[str, str, Optional[str]]] = {}
+        self._current: dict[str, LoadedModel] = {}
+        self._checked: dict[str, float] = {}
+        self._errors: dict[str, str] = {}
+        self._failures: dict[str, Exception] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, model_path: str, columns_path: str, calibration_path: Optional[str] = None):
+        self._paths[name] = (model_path, columns_path, calibration_path)
+
+    def get(self, name: str = "risk") -> LoadedModel:
+        """
+        Current version of name. Raises the load error if no version has ever loaded;
+        after that, a failed reload keeps the previous version (see errors()).
+        """
+        current = self._current.get(name)
+        now = time.monotonic()
+        if current is not None and now - self._checked.get(name, 0.0) < self.poll_s:
+            return current
+        with self._lock:
+            current = self._current.get(name)
+            if now - self._checked.get(name, 0.0) < self.poll_s:
+                if current is not None:
+                    return current
+                # Never loaded: repeat the last failure until the next check.
+                raise self._failures[name]
+            paths = self._paths[name]
+            self._checked[name] = now
+            try:
+                if current is not None and _reload_trigger(_signature(*paths)) == _reload_trigger(current.signature):
+                    return current
+                loaded = load_artifact(name, *paths)
+            except Exception as e:
+                self._errors[name] = f"{type(e).__name__}: {e}"
+                self._failures[name] = e
+                if current is None:
+                    raise
+                return current
+            self._errors.pop(name, None)
+            self._failures.pop(name, None)
+            if current is None or loaded.cache_key != current.cache_key:
+                self._current[name] = loaded
+            else:
+                current.signature = loaded.signature
+            return self._current[name]
+
+    def errors(self) -> dict[str, str]:
+        """Last reload error per model name, for models still serving an older version."""
+        return dict(self._errors)
+
+    def versions(self) -> dict[str, str]:
+        return {name: loaded.version for name, loaded in self._current.items()}
+
+@st.cache_resource
+def get_model_registry() -> ModelRegistry:
+    registry = ModelRegistry()
+    registry.register("risk", MODEL_PATH, COLUMNS_PATH, CALIBRATION_PATH)
+    return registry
+
+def current_risk_model(registry: Optional[ModelRegistry] = None) -> LoadedModel:
+    """The risk model and its columns as one consistent version."""
+    return (registry or get_model_registry()).get("risk")
+
+if __name__ == "__main__":
+    registry = ModelRegistry()
+    registry.register("risk", MODEL_PATH, COLUMNS_PATH, CALIBRATION_PATH)
+    loaded = current_risk_model(registry)
+    print(f"{loaded.name}: version {loaded.version}, {type(loaded.model).__name__}, "
+          f"{len(loaded.columns)} columns, classes {list(loaded.model.classes_)}, {loaded.calibration_note}")
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+import streamlit as st
+
+# Memory budget for rendered map HTML / deck JSON, per process.
+RENDER_CACHE_MB = float(os.getenv("RENDER_CACHE_MB", "64"))
+
+# Shared on-disk tier, filled by core.warmup and by any process that renders.
+RENDER_CACHE_DIR = os.path.join("birds", ".cache", "render")
+
+class DiskRenderStore:
+    """
+    Rendered strings under root/<version>/<key hash>. Only versions that are stable
+    across processes (derived from the CSV signature) should be persisted.
+    """
+
+    def __init__(self, root: str = RENDER_CACHE_DIR):
+        self.root = root
+
+    def _path(self, version: str, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, str(version), digest + ".txt")
+
+    def get(self, version, key: Hashable):
+        try:
+            with open(self._path(version, key), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def has(self, version, key: Hashable) -> bool:
+        return os.path.exists(self._path(version, key))
+
+    def put(self, version, key: Hashable, value: str):
+        path = self._path(version, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(value)
+        os.replace(tmp, path)
+
+    def prune(self, keep_version):
+        """Removes renders of every other data version."""
+        if not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            if name != str(keep_version):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+def is_persistent_version(version) -> bool:
+    return str(version).startswith("csv-")
+
+class RenderCache:
+    """
+    Thread-safe LRU of rendered strings bounded by total UTF-8 size.
+    Entries belong to one data version; storing a newer version drops the rest.
+    """
+
+    def __init__(self, max_bytes: int, disk: "DiskRenderStore | None" = None):
+        self.max_bytes = int(max_bytes)
+        self.disk = disk
+        self._entries: "OrderedDict[Hashable, tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._version = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, version, key: Hashable):
+        with self._lock:
+            if version != self._version:
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, version, key: Hashable, value: str):
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._check_version(version)
+            if size > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def get_or_render(self, version, key: Hashable, render: Callable[[], str]) -> str:
+        value = self.get(version, key)
+        if value is not None:
+            return value
+        persistent = self.disk is not None and is_persistent_version(version)
+        if persistent:
+            value = self.disk.get(version, key)
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+        if value is None:
+            value = render()
+            if persistent:
+                self.disk.put(version, key, value)
+        self.put(version, key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+@st.cache_resource
+def get_render_cache() -> RenderCache:
+    return RenderCache(max_bytes=RENDER_CACHE_MB * 1024 * 1024, disk=DiskRenderStore())
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+import streamlit as st
+
+# Chatbot answers persisted across restarts; override with env vars.
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join("model", "cache", "chat_responses.sqlite3"))
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", str(7 * 24 * 3600)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+
+# Replies carrying this marker are connection/API errors and are never cached.
+ERROR_MARKER = "⚠️"
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a question, without trailing punctuation."""
+    return " ".join(str(prompt).lower().split()).rstrip(" ?!.")
+
+def model_key(model: str) -> str:
+    """Keeps answers from the offline fake client (FAKE_LLM=1) apart from real ones."""
+    return f"fake:{model}" if os.getenv("FAKE_LLM") == "1" else model
+
+def response_key(prompt: str, system_prompt: str, model: str) -> str:
+    system_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    payload = json.dumps([model_key(model), system_hash, normalize_prompt(prompt)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def is_cacheable(response: str) -> bool:
+    return bool(response and response.strip()) and ERROR_MARKER not in response and not response.startswith(" Cannot connect")
+
+class ResponseCache:
+    """
+    SQLite-backed prompt -> answer cache shared by every session and process.
+    Entries expire after ttl_s; beyond max_entries the least recently used go first.
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        ttl_s: float = RESPONSE_CACHE_TTL_S,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_s = float(ttl_s)
+        self.max_entries = int(max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, prompt TEXT, response TEXT,"
+            " created REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+
+    def get(self, prompt: str, system_prompt: str, model: str) -> Optional[str]:
+        key = response_key(prompt, system_prompt, model)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_s:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, prompt: str, system_prompt: str, model: str, response: str):
+        if not is_cacheable(response):
+            return
+        key = response_key(prompt, system_prompt, model)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_key(model), normalize_prompt(prompt), response, now, now),
+            )
+            over = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if over > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (over,),
+                )
+                self.evictions += over
+
+    def get_or_generate(self, prompt: str, system_prompt: str, model: str, generate: Callable[[], str]) -> str:
+        response = self.get(prompt, system_prompt, model)
+        if response is None:
+            response = generate()
+            self.put(prompt, system_prompt, model, response)
+        return response
+
+    def get_or_stream(
+        self, prompt: str, system_prompt: str, model: str, stream: Callable[[], Iterator[str]]
+    ) -> Iterator[str]:
+        """Yields a cached answer in one piece, or streams a fresh one and stores it once complete."""
+        response = self.get(prompt, system_prompt, model)
+        if response is not None:
+            yield response
+            return
+        pieces = []
+        for piece in stream():
+            pieces.append(piece)
+            yield piece
+        self.put(prompt, system_prompt, model, "".join(pieces))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    return ResponseCache()
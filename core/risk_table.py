@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from core.calibration import calibrate
+from core.explain import field_contributions
+from core.forest import as_compiled
+from core.model import (
+    COLUMNS_PATH,
+    MODEL_PATH,
+    RISK_FIELD_VALUES,
+    RISK_INPUT_FIELDS,
+    predict_proba_batch,
+)
+
+CACHE_DIR = os.path.join("model", "cache")
+
+# Axis order of the table; one axis per risk-form field.
+TABLE_SHAPE = tuple(len(RISK_FIELD_VALUES[f]) for f in RISK_INPUT_FIELDS)
+
+
+def artifacts_sha256(*paths: str) -> str:
+    """Combined SHA-256 of the given files, in order."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _table_paths(model_hash: str) -> tuple[str, str, str, str]:
+    stem = os.path.join(CACHE_DIR, f"risk_table_{model_hash[:16]}")
+    return stem + ".npy", stem + ".json", stem + "_proba.npy", stem + "_drivers.npy"
+
+
+def input_grid() -> pd.DataFrame:
+    """Every risk-form combination, in C order over TABLE_SHAPE."""
+    codes = np.indices(TABLE_SHAPE).reshape(len(TABLE_SHAPE), -1)
+    return pd.DataFrame({
+        field: np.asarray(RISK_FIELD_VALUES[field], dtype=object)[codes[i]]
+        for i, field in enumerate(RISK_INPUT_FIELDS)
+    })
+
+
+class RiskTable:
+    """
+    Class index, (calibrated) class probabilities and per-field drivers (see
+    core.explain) for every risk-form input, addressed by integer field codes.
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        classes: list,
+        model_hash: str,
+        proba: np.ndarray = None,
+        drivers: np.ndarray = None,
+        driver_fields: list = (),
+    ):
+        self.codes = codes
+        self.proba = proba
+        self.drivers = drivers
+        self.driver_fields = list(driver_fields)
+        self.classes = np.asarray(classes, dtype=object)
+        self.model_hash = model_hash
+        self._value_codes = [
+            {value: i for i, value in enumerate(RISK_FIELD_VALUES[f])} for f in RISK_INPUT_FIELDS
+        ]
+
+    def index_of(self, habitat, nest_stage, egg_count, chick_count, human, predator, noise) -> tuple:
+        values = (habitat, nest_stage, egg_count, chick_count, human, predator, noise)
+        try:
+            return tuple(m[v] for m, v in zip(self._value_codes, values))
+        except KeyError as e:
+            raise KeyError(f"Value outside the precomputed input space: {e.args[0]!r}") from None
+
+    def lookup(self, habitat, nest_stage, egg_count, chick_count, human, predator, noise):
+        """Predicted risk label for one nest; raises KeyError for inputs outside the form options."""
+        idx = self.index_of(habitat, nest_stage, egg_count, chick_count, human, predator, noise)
+        return self.classes[self.codes[idx]]
+
+    def lookup_proba(self, habitat, nest_stage, egg_count, chick_count, human, predator, noise) -> np.ndarray:
+        """Class probabilities for one nest, in the order of self.classes."""
+        idx = self.index_of(habitat, nest_stage, egg_count, chick_count, human, predator, noise)
+        return np.asarray(self.proba[idx], dtype=np.float64)
+
+    def lookup_drivers(self, habitat, nest_stage, egg_count, chick_count, human, predator, noise) -> np.ndarray:
+        """Per-field contributions for one nest, shape (len(driver_fields), classes)."""
+        if self.drivers is None:
+            raise KeyError("This table has no precomputed drivers")
+        idx = self.index_of(habitat, nest_stage, egg_count, chick_count, human, predator, noise)
+        return np.asarray(self.drivers[idx], dtype=np.float64)
+
+    def lookup_batch(self, records: pd.DataFrame, with_proba: bool = False, with_drivers: bool = False) -> tuple:
+        """
+        Vectorized lookup for a DataFrame of nests.
+        Returns (labels, found), followed by an (n, classes) probability array if
+        with_proba and an (n, fields, classes) driver array if with_drivers; rows
+        with found == False hold None (NaN arrays) and need the model.
+        """
+        n = len(records)
+        found = np.ones(n, dtype=bool)
+        axes = []
+        for field, mapping in zip(RISK_INPUT_FIELDS, self._value_codes):
+            codes = records[field].map(mapping)
+            found &= codes.notna().to_numpy()
+            axes.append(codes.fillna(0).to_numpy(dtype=np.intp))
+        labels = np.full(n, None, dtype=object)
+        proba = np.full((n, len(self.classes)), np.nan) if with_proba else None
+        drivers = np.full((n, len(self.driver_fields), len(self.classes)), np.nan) if with_drivers else None
+        if found.any():
+            flat = np.ravel_multi_index([a[found] for a in axes], TABLE_SHAPE)
+            labels[found] = self.classes[self.codes.reshape(-1)[flat]]
+            if with_proba:
+                proba[found] = self.proba.reshape(-1, len(self.classes))[flat]
+            if with_drivers and self.drivers is not None:
+                drivers[found] = self.drivers.reshape(-1, len(self.driver_fields), len(self.classes))[flat]
+        extras = ([proba] if with_proba else []) + ([drivers] if with_drivers else [])
+        return (labels, found, *extras)
+
+
+def build_risk_table(model, all_cols, model_hash: str, calibration=None) -> str:
+    """
+    Scores the whole input space once and writes the table for model_hash. The label
+    is the most probable class after calibration (model.predict when there is none).
+    """
+    npy_path, meta_path, proba_path, drivers_path = _table_paths(model_hash)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    grid = input_grid()
+    proba = calibrate(predict_proba_batch(model, all_cols, grid), calibration)
+    classes = list(model.classes_)
+    codes = np.argmax(proba, axis=1).astype(np.uint8).reshape(TABLE_SHAPE)
+
+    # Drivers only for tree ensembles; other models get an empty array.
+    try:
+        driver_fields, _, drivers = field_contributions(as_compiled(model), all_cols, grid)
+        drivers = drivers.astype(np.float32).reshape(TABLE_SHAPE + drivers.shape[1:])
+    except ValueError:
+        driver_fields, drivers = [], np.empty(0, dtype=np.float32)
+
+    arrays = (
+        (npy_path, codes),
+        (proba_path, proba.astype(np.float32).reshape(TABLE_SHAPE + (len(classes),))),
+        (drivers_path, drivers),
+    )
+    # Per-process temp names: several server processes may build the same table at once.
+    for path, array in arrays:
+        tmp = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp, array)
+        os.replace(tmp, path)
+    meta = {
+        "model_sha256": model_hash,
+        "artifacts_sha256": calibration.model_sha256 if calibration is not None else model_hash,
+        "calibration": calibration.method if calibration is not None else None,
+        "classes": [str(c) for c in classes],
+        "driver_fields": driver_fields,
+        "fields": list(RISK_INPUT_FIELDS),
+        "shape": list(TABLE_SHAPE),
+    }
+    tmp = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, meta_path)
+
+    _prune_stale_tables(keep=model_hash)
+    return npy_path
+
+
+def _prune_stale_tables(keep: str) -> None:
+    """
+    Removes tables built for model files that are no longer served. Tables for the
+    served files survive whether calibrated or not, so the CLI (uncalibrated) and
+    the app (calibrated) never delete each other's table.
+    """
+    try:
+        served = artifacts_sha256(MODEL_PATH, COLUMNS_PATH)
+    except OSError:
+        return
+    for name in os.listdir(CACHE_DIR):
+        if not (name.startswith("risk_table_") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(CACHE_DIR, name), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        table_hash = meta.get("model_sha256", "")
+        # Tables written before artifacts_sha256 was recorded are left alone.
+        if meta.get("artifacts_sha256", served) == served or table_hash == keep:
+            continue
+        for path in _table_paths(table_hash):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _open_table(model_hash: str, load_artifacts) -> RiskTable:
+    """load_artifacts() -> (model, all_cols, calibration), called only if the table must be built."""
+    paths = _table_paths(model_hash)
+    npy_path, meta_path, proba_path, drivers_path = paths
+    if not all(os.path.exists(p) for p in paths):
+        model, all_cols, calibration = load_artifacts()
+        build_risk_table(model, all_cols, model_hash, calibration)
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    codes = np.load(npy_path, mmap_mode="r")
+    proba = np.load(proba_path, mmap_mode="r")
+    drivers = np.load(drivers_path, mmap_mode="r") if meta.get("driver_fields") else None
+    return RiskTable(codes, meta["classes"], model_hash, proba, drivers, meta.get("driver_fields", []))
+
+
+def open_risk_table(model_path: str = MODEL_PATH, columns_path: str = COLUMNS_PATH) -> RiskTable:
+    """Memory-maps the uncalibrated table for the model files, building it first if the hash changed."""
+    return _open_table(
+        artifacts_sha256(model_path, columns_path),
+        lambda: (joblib.load(model_path), joblib.load(columns_path), None),
+    )
+
+
+@st.cache_resource(max_entries=2)
+def _load_risk_table(model_hash: str, _loaded) -> RiskTable:
+    return _open_table(model_hash, lambda: (_loaded.model, _loaded.columns, _loaded.calibration))
+
+
+def load_risk_table(loaded=None) -> RiskTable:
+    """
+    Process-wide table for a core.registry LoadedModel, by default the current risk
+    model; a new table is opened (and built if needed) when the registry swaps versions.
+    """
+    from core.registry import current_risk_model
+
+    loaded = loaded or current_risk_model()
+    return _load_risk_table(loaded.cache_key, loaded)
+
+
+if __name__ == "__main__":
+    table = open_risk_table()
+    print(f"Risk table for model {table.model_hash[:16]}: shape {table.codes.shape}, "
+          f"{table.codes.nbytes:,} bytes, classes {list(table.classes)}")
@@ -0,0 +1,231 @@
+"""
+Declarative recommendation rules for the Risk page and recommend_mitigation.
+
+Every rule is a row of RULE_TABLE: the surface it belongs to, its text, and the
+values each input must take for it to fire. Rules are compiled per surface into
+one uint64 bitmask table per input field (bit r set = rule r accepts that value),
+so a whole batch is evaluated as len(fields) gathers and ANDs:
+
+    mask[row] = AND over fields of field_bits[field][code[row, field]]
+"""
+import functools
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from core.model import RISK_FIELD_VALUES
+
+RISK_LEVELS = ["Low", "Medium", "High"]
+
+# Accepted spellings of risk levels; anything else counts as Low (as in recommend_mitigation).
+_RISK_ALIASES = {"high": 2, "severe": 2, "3": 2, "4": 2, "moderate": 1, "medium": 1, "2": 1}
+
+HIGH_OR_MEDIUM = {"High", "Medium"}
+MODERATE_OR_HIGH = {"Moderate", "High"}
+
+def _large_clutch(egg_count: np.ndarray, chick_count: np.ndarray) -> np.ndarray:
+    return (egg_count > 5) | (chick_count > 5)
+
+def _busy_nest(egg_count: np.ndarray, chick_count: np.ndarray) -> np.ndarray:
+    return (egg_count >= 5) | (chick_count >= 3)
+
+# Boolean inputs derived from the egg/chick counts; rules test them with {True}.
+DERIVED_FLAGS = {"large_clutch": _large_clutch, "busy_nest": _busy_nest}
+
+# Categorical inputs a rule can test, with their value vocabulary. Values outside
+# it get one extra "other" code that only unconstrained fields accept.
+RULE_FIELDS = {
+    "risk": RISK_LEVELS,
+    "habitat": RISK_FIELD_VALUES["habitat"],
+    "nest_stage": RISK_FIELD_VALUES["nest_stage"],
+    "human": RISK_FIELD_VALUES["human"],
+    "predator": RISK_FIELD_VALUES["predator"],
+    "noise": RISK_FIELD_VALUES["noise"],
+    "large_clutch": [False, True],
+    "busy_nest": [False, True],
+}
+
+@dataclass(frozen=True)
+class Rule:
+    surface: str
+    text: str
+    when: dict = field(default_factory=dict)
+
+def _page(text, **when):
+    return Rule("risk_page", text, when)
+
+def _mitigation(text, **when):
+    return Rule("mitigation", text, when)
+
+RULE_TABLE = [
+    # Risk page: human disturbance
+    _page("🚧 Install protective barriers or signs to reduce human disturbance.", human=MODERATE_OR_HIGH, risk=HIGH_OR_MEDIUM),
+    _page("🏙️ For urban nests, consider temporary fencing and community outreach to keep people away.", human=MODERATE_OR_HIGH, risk=HIGH_OR_MEDIUM, habitat={"Urban"}),
+    _page("👀 Observe if human activity increases; mark the nest location for future monitoring.", human=MODERATE_OR_HIGH, risk={"Low"}),
+    # Risk page: predator signs
+    _page("🛡️ Deploy non-lethal predator deterrents (reflectors, motion devices, decoys) around the nest.", predator=MODERATE_OR_HIGH, risk=HIGH_OR_MEDIUM),
+    _page("🥚🐣 Large clutches—monitor closely for overcrowding and predator activity.", predator=MODERATE_OR_HIGH, risk=HIGH_OR_MEDIUM, large_clutch={True}),
+    _page("👀 Be alert for new signs of predators.", predator=MODERATE_OR_HIGH, risk={"Low"}),
+    # Risk page: noise
+    _page("🔇 Reduce noise during critical nesting times—coordinate with local authorities if possible.", noise={"Loud"}, risk=HIGH_OR_MEDIUM),
+    _page("👂 Monitor noise levels; document unusual changes for research.", noise={"Loud"}, risk={"Low"}),
+    # Risk page: habitat
+    _page("🏙️ For urban nests, use signage and temporary barriers to protect the site.", habitat={"Urban"}, risk=HIGH_OR_MEDIUM),
+    _page("🌊 For wetland nests, monitor water levels—prepare for possible relocation if flooding is likely.", habitat={"Wetland"}, risk=HIGH_OR_MEDIUM),
+    _page("🌊 For coastal nests, prepare for sudden storms—have relocation supplies on hand.", habitat={"Coastal"}, risk=HIGH_OR_MEDIUM),
+    _page("🌾 For grassland nests, mark the area and minimize foot traffic.", habitat={"Grassland"}, risk=HIGH_OR_MEDIUM),
+    _page("🌳 For tree nests, communicate with landowners to prevent logging during nesting.", habitat={"Trees"}, risk=HIGH_OR_MEDIUM),
+    # Risk page: nest stage
+    _page("🥚 Minimize nest visits during incubation—stress can cause abandonment.", nest_stage={"Eggs"}, risk=HIGH_OR_MEDIUM),
+    _page("🥚 Schedule brief, discreet checks to monitor progress.", nest_stage={"Eggs"}, risk={"Low"}),
+    _page("🐣 Limit handling and observation time to avoid stressing parents.", nest_stage={"Chicks"}, risk=HIGH_OR_MEDIUM),
+    _page("🐣 Enjoy observing chicks from a safe distance.", nest_stage={"Chicks"}, risk={"Low"}),
+    _page("🪺 Avoid interfering with nest construction; observe from a distance.", nest_stage={"Building"}, risk=HIGH_OR_MEDIUM),
+    _page("🪺 Observe construction—your notes may help future nests.", nest_stage={"Building"}, risk={"Low"}),
+    _page("⚰️ Record probable causes of failure for future prevention.", nest_stage={"Failed"}, risk=HIGH_OR_MEDIUM),
+    _page("🪹 Document the event; valuable for research.", nest_stage={"Failed"}, risk={"Low"}),
+    _page("🕊️ Record nest location and condition—inform conservationists if needed.", nest_stage={"Empty"}, risk=HIGH_OR_MEDIUM),
+    _page("🕊️ Log nest details—helpful for future monitoring.", nest_stage={"Empty"}, risk={"Low"}),
+    # Risk page: risk level
+    _page("📞 Contact local wildlife authorities for immediate assistance.", risk={"High"}),
+    _page("🆘 Extra vigilance: Large clutches increase the need for secure, safe monitoring.", risk={"High"}, large_clutch={True}),
+    _page("📅 Schedule regular check-ins—monitor for changes in nest condition.", risk={"Medium"}),
+    _page("👁️ Watch for overloading and consider reinforcing nest support if unstable.", risk={"Medium"}, large_clutch={True}),
+    _page("✨ Continue regular monitoring and document nest progress.", risk={"Low"}),
+    _page("🥚🐣 Large clutch noted—useful for research.", risk={"Low"}, large_clutch={True}),
+    # Risk page: always
+    _page("📸 Document progress with periodic photos."),
+    _page("📊 Log environmental changes in your monitoring database."),
+
+    # recommend_mitigation: risk level
+    _mitigation("Initiate immediate protective measures and increase monitoring frequency to daily.", risk={"High"}),
+    _mitigation("Flag the site to local conservation/forest officials and record GPS with photos.", risk={"High"}),
+    _mitigation("Schedule regular monitoring (every 2–3 days) and log any changes in activity or threats.", risk={"Medium"}),
+    _mitigation("Maintain weekly checks and keep disturbance minimal around the nest site.", risk={"Low"}),
+    # recommend_mitigation: disturbance, predators, noise
+    _mitigation("Establish a 20–50 m buffer zone with temporary signage to reduce foot traffic.", human=MODERATE_OR_HIGH),
+    _mitigation("Reroute nearby paths and briefly halt noisy activities until chicks fledge.", human=MODERATE_OR_HIGH),
+    _mitigation("Install non-intrusive deterrents (e.g., reflective tape, visual decoys) outside the nest line-of-sight.", predator=MODERATE_OR_HIGH),
+    _mitigation("Remove attractants (food scraps) and secure waste to discourage predators.", predator=MODERATE_OR_HIGH),
+    _mitigation("Limit loud machinery and schedule unavoidable noise outside early morning/late evening peak activity.", noise={"Moderate", "Loud"}),
+    _mitigation("If near roads, consider temporary sound barriers or speed calming measures.", noise={"Moderate", "Loud"}),
+    # recommend_mitigation: habitat and stage
+    _mitigation("Maintain stable water levels and avoid bank vegetation clearance during nesting.", habitat={"Wetland"}),
+    _mitigation("Avoid pruning or tree work within a 50 m radius until the nesting period ends.", habitat={"Trees"}),
+    _mitigation("Delay mowing and keep machinery at least 30 m from the nest area.", habitat={"Grassland"}),
+    _mitigation("Minimize visits to <10 minutes and keep observers concealed to prevent abandonment.", nest_stage={"Eggs", "Chicks"}),
+    _mitigation("Record temperature/weather changes that could impact incubation or chick thermoregulation.", nest_stage={"Eggs", "Chicks"}),
+    _mitigation("Prioritize continuous monitoring due to higher reproductive investment at this site.", busy_nest={True}),
+]
+
+# How each surface orders its deduplicated output, and how many items it keeps.
+# "sorted": by text (the Risk page's sorted(set(...))); "declared": first firing rule first.
+SURFACES = {
+    "risk_page": ("sorted", None),
+    "mitigation": ("declared", 8),
+}
+
+def _codes(values, resolve) -> np.ndarray:
+    """Integer codes for an array of labels, calling resolve() once per distinct label."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object).ravel(), use_na_sentinel=True)
+    # Missing values (code -1) pick the last entry.
+    lookup = np.array([resolve(u) for u in uniques] + [resolve(None)], dtype=np.intp)
+    return lookup[codes]
+
+def _risk_code(level) -> int:
+    return _RISK_ALIASES.get(str(level).lower(), 0)
+
+def risk_codes(levels) -> np.ndarray:
+    """0/1/2 (Low/Medium/High) for risk labels in any accepted spelling."""
+    return _codes(levels, _risk_code)
+
+def _value_codes(values, vocabulary: list) -> np.ndarray:
+    lookup = {v: i for i, v in enumerate(vocabulary)}
+    return _codes(values, lambda v: lookup.get(v, len(vocabulary)))
+
+class RuleSet:
+    """The compiled rules of one surface."""
+
+    def __init__(self, surface: str, rules: list[Rule]):
+        if len(rules) > 64:
+            raise ValueError(f"Surface {surface!r} has {len(rules)} rules; one uint64 mask holds at most 64.")
+        unknown = {f for r in rules for f in r.when} - set(RULE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown rule fields: {', '.join(sorted(unknown))}")
+        self.surface = surface
+        self.rules = rules
+        self.order, self.limit = SURFACES[surface]
+
+        # Recommendation IDs: one per distinct text. In "sorted" surfaces they follow
+        # text order, so ascending IDs are the display order.
+        texts = list(dict.fromkeys(r.text for r in rules))
+        if self.order == "sorted":
+            texts.sort()
+        self.texts = texts
+        text_id = {t: i for i, t in enumerate(texts)}
+        self._rule_text = np.array([text_id[r.text] for r in rules], dtype=np.intp)
+
+        # field_bits[f][code] has bit r set when rule r accepts that value of f.
+        self.field_bits = {}
+        for name, vocabulary in RULE_FIELDS.items():
+            bits = np.zeros(len(vocabulary) + 1, dtype=np.uint64)
+            for r, rule in enumerate(rules):
+                allowed = rule.when.get(name)
+                for code, value in enumerate(vocabulary + [None]):
+                    if allowed is None or (value is not None and value in allowed):
+                        bits[code] |= np.uint64(1 << r)
+            self.field_bits[name] = bits
+
+    def masks(self, records, risk_levels) -> np.ndarray:
+        """Fired-rule bitmask per nest. records: DataFrame (or dict of columns) of risk-form fields."""
+        codes = {
+            "risk": risk_codes(risk_levels),
+            **{name: _value_codes(records[name], RULE_FIELDS[name]) for name in ("habitat", "nest_stage", "human", "predator", "noise")},
+        }
+        eggs = pd.to_numeric(pd.Series(np.asarray(records["egg_count"])), errors="coerce").to_numpy(dtype=np.float64)
+        chicks = pd.to_numeric(pd.Series(np.asarray(records["chick_count"])), errors="coerce").to_numpy(dtype=np.float64)
+        for name, flag in DERIVED_FLAGS.items():
+            codes[name] = flag(eggs, chicks).astype(np.intp)
+
+        mask = np.full(len(codes["risk"]), np.uint64(2 ** 64 - 1), dtype=np.uint64)
+        for name, bits in self.field_bits.items():
+            mask &= bits[codes[name]]
+        return mask
+
+    @functools.lru_cache(maxsize=4096)
+    def ids(self, mask: int) -> tuple[int, ...]:
+        """Ordered, deduplicated recommendation IDs for one fired-rule mask."""
+        fired = [r for r in range(len(self.rules)) if mask >> r & 1]
+        ids = list(dict.fromkeys(int(self._rule_text[r]) for r in fired))
+        if self.order == "sorted":
+            ids.sort()
+        return tuple(ids[: self.limit] if self.limit else ids)
+
+    def recommendation_ids(self, records, risk_levels) -> list[tuple[int, ...]]:
+        masks = self.masks(records, risk_levels)
+        uniq, inverse = np.unique(masks, return_inverse=True)
+        decoded = [self.ids(int(m)) for m in uniq]
+        return [decoded[i] for i in inverse.ravel()]
+
+    def recommendations_joined(self, records, risk_levels, sep: str = " | ") -> np.ndarray:
+        """One sep-joined string per nest, decoded once per distinct rule mask."""
+        masks = self.masks(records, risk_levels)
+        uniq, inverse = np.unique(masks, return_inverse=True)
+        joined = np.array([sep.join(self.texts[i] for i in self.ids(int(m))) for m in uniq] + [""], dtype=object)
+        return joined[inverse.ravel()] if len(masks) else joined[:0]
+
+    def recommend(self, risk_level: str, **params) -> list[str]:
+        """Recommendations for one nest (habitat, nest_stage, egg_count, chick_count, human, predator, noise)."""
+        records = {name: [value] for name, value in params.items()}
+        return [self.texts[i] for i in self.ids(int(self.masks(records, [risk_level])[0]))]
+
+def compile_rules(table: Optional[list[Rule]] = None) -> dict[str, RuleSet]:
+    table = RULE_TABLE if table is None else table
+    return {surface: RuleSet(surface, [r for r in table if r.surface == surface]) for surface in SURFACES}
+
+RULESETS = compile_rules()
+
+def recommend(surface: str, risk_level: str, **params) -> list[str]:
+    return RULESETS[surface].recommend(risk_level, **params)
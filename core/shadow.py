@@ -0,0 +1,251 @@
+"""
+Shadow scoring of a candidate model next to the served risk model. Every risk
+prediction (Risk page and bulk surveys) is handed to a background thread that
+scores the same nests with the shadow model from core.registry and logs
+agreement, the confusion between the two and both latencies to a local SQLite
+store. The request thread only enqueues; when the queue is full the batch is
+dropped and counted. The store keeps the latest SHADOW_MAX_EVENTS batches
+with their label pairs, so agreement and confusion cover the same batches.
+
+Shadow scoring is opt-in (SHADOW_ENABLED=1) and stays off while there is no
+columns file for the candidate: model/Armaan_nest_model.pkl expects 117
+unnamed features and cannot score the risk form until a matching columns file
+is supplied via SHADOW_COLUMNS_PATH. A candidate that fails validation against
+its columns, or fails to score a batch, is logged as skipped with the reason.
+
+Report:
+    python -m core.shadow report
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from core.model import predict_risk_batch
+from core.registry import ModelRegistry, get_model_registry
+
+# Shadow candidate and log; override with env vars. SHADOW_ENABLED=1 turns it on.
+SHADOW_ENABLED = os.getenv("SHADOW_ENABLED", "0") == "1"
+SHADOW_MODEL_PATH = os.getenv("SHADOW_MODEL_PATH", os.path.join("model", "Armaan_nest_model.pkl"))
+SHADOW_COLUMNS_PATH = os.getenv("SHADOW_COLUMNS_PATH", os.path.join("model", "Armaan_nest_model_columns.pkl"))
+SHADOW_STORE_PATH = os.getenv("SHADOW_STORE_PATH", os.path.join("model", "cache", "shadow.sqlite3"))
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "64"))
+# Newest batches kept in the events table; older rows are pruned on insert.
+SHADOW_MAX_EVENTS = int(os.getenv("SHADOW_MAX_EVENTS", "100000"))
+
+class ShadowStore:
+    """Shadow results: one row per batch plus its (primary, shadow) label counts, pruned together."""
+
+    def __init__(self, path: str = SHADOW_STORE_PATH, max_events: int = SHADOW_MAX_EVENTS):
+        self.path = path
+        self.max_events = int(max_events)
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " ts REAL, source TEXT, n INTEGER, agree INTEGER,"
+            " primary_version TEXT, shadow_version TEXT,"
+            " primary_ms REAL, shadow_ms REAL, skip_reason TEXT)"
+        )
+        # Keyed by the events rowid; replaces the never-pruned per-version-pair confusion table.
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS event_labels ("
+            " event INTEGER, primary_label TEXT, shadow_label TEXT, count INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS event_labels_event ON event_labels (event)")
+
+    def record(
+        self,
+        source: str,
+        primary_version: str,
+        primary_labels: np.ndarray,
+        primary_ms: Optional[float],
+        shadow_version: Optional[str] = None,
+        shadow_labels: Optional[np.ndarray] = None,
+        shadow_ms: Optional[float] = None,
+        skip_reason: Optional[str] = None,
+    ):
+        n = len(primary_labels)
+        pairs = None
+        agree = None
+        if shadow_labels is not None:
+            pairs = pd.DataFrame({"p": primary_labels, "s": shadow_labels}).astype(str).value_counts()
+            agree = int(sum(count for (p, s), count in pairs.items() if p == s))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            event = self._conn.execute(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), source, n, agree, primary_version, shadow_version, primary_ms, shadow_ms, skip_reason),
+            ).lastrowid
+            if pairs is not None:
+                self._conn.executemany(
+                    "INSERT INTO event_labels VALUES (?, ?, ?, ?)",
+                    [(event, p, s, int(count)) for (p, s), count in pairs.items()],
+                )
+            # rowids only grow, so everything below the newest max_events rows is old.
+            oldest_kept = event - self.max_events
+            self._conn.execute("DELETE FROM events WHERE rowid <= ?", (oldest_kept,))
+            self._conn.execute("DELETE FROM event_labels WHERE event <= ?", (oldest_kept,))
+            self._conn.execute("COMMIT")
+
+    def events(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query("SELECT * FROM events", self._conn)
+
+    def confusion(self) -> pd.DataFrame:
+        """Label pair counts per version pair, over the batches still in events."""
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT e.primary_version, e.shadow_version, l.primary_label, l.shadow_label, SUM(l.count) AS count"
+                " FROM event_labels l JOIN events e ON e.rowid = l.event"
+                " GROUP BY e.primary_version, e.shadow_version, l.primary_label, l.shadow_label",
+                self._conn,
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM events")
+            self._conn.execute("DELETE FROM event_labels")
+
+class ShadowScorer:
+    """Scores served predictions again with the shadow model, off the request thread."""
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        store: ShadowStore,
+        name: str = "shadow",
+        columns_path: str = SHADOW_COLUMNS_PATH,
+        max_pending: int = SHADOW_MAX_PENDING,
+    ):
+        self.registry = registry
+        self.store = store
+        self.name = name
+        self.columns_path = columns_path
+        self.max_pending = int(max_pending)
+        # One worker: shadow batches never compete with each other for the GIL.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.dropped = 0
+
+    def submit(
+        self,
+        records,
+        primary_labels,
+        primary_version: str,
+        primary_ms: Optional[float] = None,
+        source: str = "risk_page",
+    ) -> bool:
+        """
+        Queues records (risk-form fields) and the served labels for shadow scoring.
+        Returns False if the queue was full and the batch was dropped.
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.pending += 1
+        frame = pd.DataFrame(records).reset_index(drop=True)
+        labels = np.asarray(primary_labels, dtype=object)
+        future = self._executor.submit(self._score, frame, labels, primary_version, primary_ms, source)
+        future.add_done_callback(self._done)
+        return True
+
+    def _done(self, _):
+        with self._lock:
+            self.pending -= 1
+
+    def _score(self, frame: pd.DataFrame, primary_labels: np.ndarray, primary_version: str, primary_ms, source: str):
+        try:
+            if not os.path.exists(self.columns_path):
+                raise FileNotFoundError(f"no columns file at {self.columns_path}; set SHADOW_COLUMNS_PATH")
+            loaded = self.registry.get(self.name)
+            start = time.perf_counter()
+            # Encoder rejections and class mismatches are recorded like load failures.
+            shadow_labels = predict_risk_batch(loaded.model, loaded.columns, frame)
+            shadow_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            reason = str(e) if isinstance(e, FileNotFoundError) else f"{type(e).__name__}: {e}"
+            self.store.record(source, primary_version, primary_labels, primary_ms, skip_reason=reason)
+            return
+        self.store.record(source, primary_version, primary_labels, primary_ms, loaded.version, shadow_labels, shadow_ms)
+
+    def flush(self, timeout: float = 30.0):
+        """Waits until every queued batch has been scored (for scripts and reports)."""
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+@st.cache_resource
+def get_shadow_scorer() -> Optional[ShadowScorer]:
+    """Process-wide scorer, or None when shadow scoring is off or the candidate has no columns file."""
+    if not SHADOW_ENABLED or not os.path.exists(SHADOW_COLUMNS_PATH):
+        return None
+    registry = get_model_registry()
+    registry.register("shadow", SHADOW_MODEL_PATH, SHADOW_COLUMNS_PATH)
+    return ShadowScorer(registry, ShadowStore())
+
+def _percentiles(values: pd.Series) -> str:
+    values = values.dropna()
+    if values.empty:
+        return "-"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50:.2f} / p95 {p95:.2f} / p99 {p99:.2f}"
+
+def report(store: ShadowStore) -> str:
+    """Agreement, latency percentiles (ms per nest) and confusion, per version pair and source."""
+    events = store.events()
+    if events.empty:
+        return "No shadow results recorded yet."
+    lines = []
+    skipped = events[events["skip_reason"].notna()]
+    if not skipped.empty:
+        lines.append("Skipped (shadow model not scored):")
+        for reason, group in skipped.groupby("skip_reason"):
+            lines.append(f"  {int(group['n'].sum()):,} nests in {len(group):,} batches: {reason}")
+        lines.append("")
+
+    scored = events[events["skip_reason"].isna()].copy()
+    scored["primary_ms_per_nest"] = scored["primary_ms"] / scored["n"]
+    scored["shadow_ms_per_nest"] = scored["shadow_ms"] / scored["n"]
+    confusion = store.confusion()
+    for (primary, shadow), pair in scored.groupby(["primary_version", "shadow_version"]):
+        total = int(pair["n"].sum())
+        lines.append(f"primary {primary} vs shadow {shadow}: {total:,} nests, "
+                     f"agreement {pair['agree'].sum() / total:.1%}")
+        for source, group in pair.groupby("source"):
+            lines.append(f"  {source} ({len(group):,} batches) ms per nest")
+            lines.append(f"    primary {_percentiles(group['primary_ms_per_nest'])}")
+            lines.append(f"    shadow  {_percentiles(group['shadow_ms_per_nest'])}")
+        table = confusion[(confusion["primary_version"] == primary) & (confusion["shadow_version"] == shadow)]
+        matrix = table.pivot_table(index="primary_label", columns="shadow_label", values="count", aggfunc="sum", fill_value=0)
+        lines.append("  confusion (rows: primary, columns: shadow)")
+        lines.extend("    " + line for line in matrix.to_string().splitlines())
+        lines.append("")
+    return "\n".join(lines).rstrip()
+
+def main():
+    parser = argparse.ArgumentParser(description="Shadow scoring results.")
+    parser.add_argument("command", choices=["report", "clear"])
+    parser.add_argument("--store", default=SHADOW_STORE_PATH)
+    args = parser.parse_args()
+    store = ShadowStore(args.store)
+    if args.command == "clear":
+        store.clear()
+        print(f"Cleared {args.store}")
+    else:
+        print(report(store))
+
+if __name__ == "__main__":
+    main()
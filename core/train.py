@@ -0,0 +1,285 @@
+"""
+Offline training pipeline for the risk model. Builds the one-hot feature
+schema from the risk-form vocabulary, runs a cross-validated grid search over
+RandomForestClassifier settings with the folds spread over all cores
+(joblib), refits the best settings on every core, scores a held-out split
+and writes a versioned artifact directory:
+
+    model/artifacts/<version>/risk_model.pkl
+    model/artifacts/<version>/risk_model_columns.pkl
+    model/artifacts/<version>/manifest.json   (data, schema, grid, metrics, timings)
+
+The schema is not the shipped model's layout. risk_model_columns.pkl has 20
+columns: nest_height_m (which the form never collects, so it is always 0
+when serving) and one-hot groups with a dropped reference category
+(Urban/Coastal habitat and None disturbance/predators encode as all zeros).
+Trained models use 23 columns instead: the two counts plus one column for
+every form value. core.model.RiskEncoder serves either layout from the
+columns file, and the manifest lists the columns added and removed relative
+to the served model.
+
+Runs on a synthetic nest survey (seeded; labels from the rule-based fallback
+with a share flipped at random) or on a local CSV/XLSX survey with the seven
+risk-form columns and a label column. Nothing is downloaded. With --cores the
+search and refit are repeated per core count and the wall-clock of each is
+reported; the forest is seeded, so every run yields the same predictions.
+
+    python -m core.train --synthetic 20000 --cores 1 2 4
+    python -m core.train --data labelled.csv --label-column risk --promote
+
+--promote copies the artifacts over model/risk_model*.pkl, where the model
+registry picks them up on its next poll. A calibration file fitted for the
+previous model is ignored until refitted with python -m core.calibration.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from core.model import (
+    COLUMNS_PATH,
+    MODEL_PATH,
+    ONE_HOT_PREFIXES,
+    RISK_FIELD_VALUES,
+    RISK_INPUT_FIELDS,
+    predict_nest_risk_fallback_batch,
+)
+
+ARTIFACTS_DIR = os.path.join("model", "artifacts")
+
+# Searched with cross-validation; the shipped model is n_estimators=100, max_depth=5.
+PARAM_GRID = {
+    "n_estimators": [100, 200],
+    "max_depth": [5, 8, None],
+    "min_samples_leaf": [1, 5],
+}
+
+# Share of synthetic labels replaced by a random class, so the search has noise to fit around.
+SYNTHETIC_LABEL_NOISE = 0.1
+
+def synthetic_survey(rows: int, seed: int = 0, label_noise: float = SYNTHETIC_LABEL_NOISE) -> tuple[pd.DataFrame, np.ndarray]:
+    """(risk-form records, labels) drawn uniformly from the form options; same seed, same survey."""
+    rng = np.random.default_rng(seed)
+    records = pd.DataFrame({
+        field: np.asarray(RISK_FIELD_VALUES[field], dtype=object)[rng.integers(0, len(RISK_FIELD_VALUES[field]), rows)]
+        for field in RISK_INPUT_FIELDS
+    })
+    for field in ("egg_count", "chick_count"):
+        records[field] = records[field].astype(np.int64)
+    labels = predict_nest_risk_fallback_batch(records)
+    flip = rng.random(rows) < label_noise
+    labels[flip] = np.array(["Low", "Medium", "High"], dtype=object)[rng.integers(0, 3, int(flip.sum()))]
+    return records, labels
+
+def load_survey(path: str, label_column: str) -> tuple[pd.DataFrame, np.ndarray, int]:
+    """(records, labels, rows skipped) from a CSV/XLSX survey; invalid or unlabelled rows are skipped."""
+    from core.bulk import _clean_inputs, iter_survey_chunks
+
+    with open(path, "rb") as f:
+        survey = pd.concat([chunk for chunk, _ in iter_survey_chunks(f, path)], ignore_index=True)
+    if label_column not in survey.columns:
+        raise ValueError(f"{path} has no {label_column!r} column")
+    inputs, errors = _clean_inputs(survey)
+    keep = (errors == "").to_numpy() & survey[label_column].notna().to_numpy()
+    labels = survey.loc[keep, label_column].astype(str).str.strip().to_numpy(dtype=object)
+    return inputs[keep].reset_index(drop=True), labels, int((~keep).sum())
+
+def one_hot_features(records: pd.DataFrame) -> pd.DataFrame:
+    """
+    Counts plus one column per form value (pd.get_dummies over the full form
+    vocabulary), so the schema never depends on which values the data happens to
+    contain. See the module docstring for how this differs from the shipped columns.
+    """
+    counts = records[["egg_count", "chick_count"]].astype(np.float32).reset_index(drop=True)
+    categorical = pd.DataFrame({
+        prefix: pd.Categorical(records[field].to_numpy(), categories=RISK_FIELD_VALUES[field])
+        for field, prefix in ONE_HOT_PREFIXES.items()
+    })
+    return pd.concat([counts, pd.get_dummies(categorical, dtype=np.float32)], axis=1)
+
+def schema_changes(columns: list, served_columns_path: str = COLUMNS_PATH) -> dict:
+    """Columns added and removed relative to the served model's columns file (empty if there is none)."""
+    if not os.path.exists(served_columns_path):
+        return {}
+    served = list(joblib.load(served_columns_path))
+    return {
+        "served_columns": len(served),
+        "added": [c for c in columns if c not in served],
+        "removed": [c for c in served if c not in columns],
+    }
+
+def train(features: pd.DataFrame, labels, n_jobs: int, seed: int = 0, folds: int = 5, param_grid: dict = PARAM_GRID) -> dict:
+    """
+    Grid search (one fold fit per joblib worker, forests single-threaded inside)
+    followed by a refit of the best settings with the forest on n_jobs cores.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+
+    start = time.perf_counter()
+    search = GridSearchCV(
+        RandomForestClassifier(random_state=seed, n_jobs=1),
+        param_grid,
+        scoring="neg_log_loss",
+        cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed),
+        n_jobs=n_jobs,
+        refit=False,
+    )
+    search.fit(features, labels)
+    search_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = RandomForestClassifier(random_state=seed, n_jobs=n_jobs, **search.best_params_)
+    model.fit(features, labels)
+    fit_s = time.perf_counter() - start
+    # Served one row at a time; worker start-up would dominate every prediction.
+    model.set_params(n_jobs=None)
+    return {
+        "model": model,
+        "best_params": search.best_params_,
+        "cv_log_loss": float(-search.best_score_),
+        "search_s": search_s,
+        "fit_s": fit_s,
+    }
+
+def evaluate(model, features: pd.DataFrame, labels) -> dict:
+    from sklearn.metrics import accuracy_score, f1_score, log_loss
+
+    proba = model.predict_proba(features)
+    predicted = model.classes_[np.argmax(proba, axis=1)]
+    return {
+        "rows": int(len(labels)),
+        "accuracy": float(accuracy_score(labels, predicted)),
+        "macro_f1": float(f1_score(labels, predicted, average="macro")),
+        "log_loss": float(log_loss(labels, proba, labels=model.classes_)),
+    }
+
+def write_artifacts(model, columns: list, manifest: dict, out_dir: str = ARTIFACTS_DIR) -> str:
+    """Writes the run into <out_dir>/<version>/ (version from the time and model digest); returns the directory."""
+    from core.registry import load_artifact
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    tmp_dir = os.path.join(out_dir, f".tmp-{stamp}-{os.getpid()}")
+    os.makedirs(tmp_dir)
+    model_path = os.path.join(tmp_dir, os.path.basename(MODEL_PATH))
+    columns_path = os.path.join(tmp_dir, os.path.basename(COLUMNS_PATH))
+    joblib.dump(model, model_path)
+    joblib.dump(columns, columns_path)
+    # Loaded back exactly as the app will load it: validates the pair and yields the served version.
+    loaded = load_artifact("risk", model_path, columns_path)
+    version = f"{stamp}-{loaded.version}"
+    manifest = dict(manifest, version=version, model_version=loaded.version, model_sha256=loaded.sha256)
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    path = os.path.join(out_dir, version)
+    os.replace(tmp_dir, path)
+    return path
+
+def promote(artifact_dir: str) -> None:
+    """
+    Copies a run's columns, then its model, over the served files, each replaced
+    atomically. The registry reloads when the model file changes, so it never
+    pairs the new columns with the old model.
+    """
+    for served in (COLUMNS_PATH, MODEL_PATH):
+        tmp = f"{served}.{os.getpid()}.tmp"
+        shutil.copyfile(os.path.join(artifact_dir, os.path.basename(served)), tmp)
+        os.replace(tmp, served)
+
+def main():
+    import sklearn
+    from sklearn.model_selection import train_test_split
+
+    parser = argparse.ArgumentParser(description="Train the risk model and write versioned artifacts.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--data", help="CSV/XLSX survey with the risk-form columns and a label column")
+    source.add_argument("--synthetic", type=int, default=20_000, help="rows of synthetic survey (default)")
+    parser.add_argument("--label-column", default="risk")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of rows kept out of training for metrics")
+    parser.add_argument("--cores", type=int, nargs="+", help="core counts to time (default: all cores only)")
+    parser.add_argument("--out", default=ARTIFACTS_DIR)
+    parser.add_argument("--promote", action="store_true", help=f"also copy the artifacts over {MODEL_PATH}")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.data:
+        records, labels, skipped = load_survey(args.data, args.label_column)
+        data = {"source": args.data, "label_column": args.label_column, "rows_skipped": skipped}
+    else:
+        records, labels = synthetic_survey(args.synthetic, args.seed)
+        data = {"source": "synthetic", "seed": args.seed, "label_noise": SYNTHETIC_LABEL_NOISE}
+    features = one_hot_features(records)
+    train_X, test_X, train_y, test_y = train_test_split(
+        features, labels, test_size=args.holdout, stratify=labels, random_state=args.seed
+    )
+    prepare_s = time.perf_counter() - start
+    classes, counts = np.unique(labels, return_counts=True)
+    data.update(rows=int(len(labels)), classes={str(c): int(n) for c, n in zip(classes, counts)})
+    print(f"{len(labels):,} nests ({data['source']}), {features.shape[1]} features, "
+          f"{len(train_y):,} train / {len(test_y):,} held out")
+    changes = schema_changes(list(features.columns))
+    if changes.get("added") or changes.get("removed"):
+        print(f"schema vs served model ({changes['served_columns']} columns): "
+              f"+{len(changes['added'])} {changes['added']}, -{len(changes['removed'])} {changes['removed']}")
+
+    core_counts = sorted(set(args.cores or [os.cpu_count() or 1]))
+    runs, result, reference = [], None, None
+    print(f"{'cores':>5} {'search s':>9} {'fit s':>7}")
+    for n_jobs in core_counts:
+        result = train(train_X, train_y, n_jobs, args.seed, args.folds)
+        proba = result["model"].predict_proba(test_X)
+        reference = proba if reference is None else reference
+        runs.append({
+            "n_jobs": n_jobs,
+            "search_s": round(result["search_s"], 3),
+            "fit_s": round(result["fit_s"], 3),
+            "same_predictions": bool(np.array_equal(proba, reference)),
+        })
+        print(f"{n_jobs:>5} {result['search_s']:>9.2f} {result['fit_s']:>7.2f}")
+
+    model = result["model"]
+    metrics = {"train": evaluate(model, train_X, train_y), "holdout": evaluate(model, test_X, test_y)}
+    manifest = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "data": data,
+        "features": list(features.columns),
+        "schema_changes": schema_changes(list(features.columns)),
+        "classes": [str(c) for c in model.classes_],
+        "search": {
+            "param_grid": PARAM_GRID,
+            "folds": args.folds,
+            "scoring": "neg_log_loss",
+            "best_params": result["best_params"],
+            "cv_log_loss": round(result["cv_log_loss"], 6),
+        },
+        "metrics": metrics,
+        "timings": {"prepare_s": round(prepare_s, 3), "runs": runs},
+        "environment": {
+            "python": platform.python_version(),
+            "scikit-learn": sklearn.__version__,
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+    }
+    path = write_artifacts(model, list(features.columns), manifest, args.out)
+    holdout = metrics["holdout"]
+    print(f"best {result['best_params']}; held out: accuracy {holdout['accuracy']:.3f}, "
+          f"macro F1 {holdout['macro_f1']:.3f}, log loss {holdout['log_loss']:.4f}")
+    if not all(run["same_predictions"] for run in runs):
+        print("warning: predictions differ between core counts")
+    print(f"artifacts -> {path}")
+    if args.promote:
+        promote(path)
+        print(f"promoted to {MODEL_PATH}, {COLUMNS_PATH}")
+
+if __name__ == "__main__":
+    main()
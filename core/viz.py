@@ -1,17 +1,98 @@
 import os
 import base64
+import functools
+import hashlib
+import json
+import numpy as np
 import streamlit as st
 import pandas as pd
-import folium
-from folium import plugins
-from streamlit_folium import folium_static
-import pydeck as pdk
+
+# folium / pydeck are imported inside the functions that draw maps; importing
+# this module (species list, descriptions) stays cheap for the other pages.
+from core.data import species_index_for
+from core.geo import HEATMAP_MAX_POINTS, MARKER_MAX_POINTS, bin_coordinates, downsample
+from core.render_cache import get_render_cache
 
 BIRDS_DIR = "birds"
 IMG_DIR = os.path.join(BIRDS_DIR, "bird_images")
 SVG_CROW = os.path.join(BIRDS_DIR, "crow-solid.svg")  # optional icon
 
 
+# Species offered on the Visualizations page.
+SPECIES = [
+    "Ashy Drongo",
+    "Asian Brown Flycatcher",
+    "Asian Koel",
+    "Barn Swallow",
+    "Black Drongo",
+    "Black Kite",
+    "Black-crowned Night-Heron",
+    "Black-hooded Oriole",
+    "Black-naped Monarch",
+    "Black-winged Kite",
+    "Black-winged Stilt",
+    "Blyth's Reed Warbler",
+    "Bronzed Drongo",
+    "Brown Boobook",
+    "Brown Shrike",
+    "Cattle Egret",
+    "Common Greenshank",
+    "Common Iora",
+    "Common Kingfisher",
+    "Common Myna",
+    "Common Rosefinch",
+    "Common Sandpiper",
+    "Common Tailorbird",
+    "Coppersmith Barbet",
+    "Crested Serpent-Eagle",
+    "Eurasian Collared-Dove",
+    "Eurasian Coot",
+    "Eurasian Hoopoe",
+    "Eurasian Marsh-Harrier",
+    "Eurasian Moorhen",
+    "Garganey",
+    "Glossy Ibis",
+    "Gray Heron",
+    "Gray Wagtail",
+    "Gray-breasted Prinia",
+    "Gray-headed Canary-Flycatcher",
+    "Great Egret",
+    "Greater Coucal",
+    "Greater Racket-tailed Drongo",
+    "Green Sandpiper",
+    "Green Warbler",
+    "Greenish Warbler",
+    "House Crow",
+    "House Sparrow",
+    "Kentish Plover",
+    "Large-billed Crow",
+    "Laughing Dove",
+    "Little Egret",
+    "Little Grebe",
+    "Little Ringed Plover",
+    "Pied Kingfisher",
+    "Plain Prinia",
+    "Puff-throated Babbler",
+    "Purple Heron",
+    "Purple Sunbird",
+    "Red-rumped Swallow",
+    "Red-wattled Lapwing",
+    "Red-whiskered Bulbul",
+    "Rock Pigeon",
+    "Rose-ringed Parakeet",
+    "Rufous Treepie",
+    "Scaly-breasted Munia",
+    "Spotted Dove",
+    "Stork-billed Kingfisher",
+    "Tickell's Blue Flycatcher",
+    "Western Yellow Wagtail",
+    "Whiskered Tern",
+    "White-breasted Waterhen",
+    "White-throated Kingfisher",
+    "Wood Sandpiper",
+    "Zitting Cisticola",
+]
+
 BIRD_DESCRIPTIONS = {
     "Ashy Drongo": "A sleek bird with ash-grey plumage and a deeply forked tail, the Ashy Drongo is an agile acrobat in flight. Its sharp, whistling calls are often heard in wooded habitats across Asia. This drongo is known for its mimicking ability, sometimes imitating the calls of other birds and even mammals, which helps it in territorial defense and confusing predators. Typically seen perched high, it swoops down to catch a variety of flying insects.",
     
@@ -159,11 +240,10 @@ BIRD_DESCRIPTIONS = {
 def bird_description(common_name: str) -> str:
     return BIRD_DESCRIPTIONS.get(common_name, "Description not available yet.")
 
-def scientific_name(common_name: str, df: pd.DataFrame) -> str:
-    sub = df[df["common_name"] == common_name]
-    if sub.empty or "scientific_name" not in sub.columns:
-        return "Unknown"
-    return sub["scientific_name"].iloc[0]
+def scientific_name(common_name: str, df) -> str:
+    """df may be the metadata frame or a SpeciesIndex built from it."""
+    rec = species_index_for(df).get(common_name)
+    return rec.scientific_name if rec is not None else "Unknown"
 
 def _svg_to_dataurl(path_to_svg: str) -> str:
     if not os.path.exists(path_to_svg):
@@ -176,46 +256,132 @@ def _svg_to_dataurl(path_to_svg: str) -> str:
 def _icon_dataurl():
     return _svg_to_dataurl(SVG_CROW)
 
-def heatmap_folium(common_name: str, df: pd.DataFrame, width: int = 900):
-    bird_data = df[df["common_name"] == common_name]
-    if bird_data.empty:
+# ~1 m precision; keeps the embedded coordinate JSON small.
+COORD_DECIMALS = 5
+
+# Bump when the map, deck or stats rendering changes what it outputs.
+RENDER_FORMAT = 1
+
+@functools.lru_cache(maxsize=1)
+def _render_config() -> str:
+    """Hash of everything besides the data that shapes a render: code, limits, icon, libraries."""
+    from importlib.metadata import PackageNotFoundError, version
+
+    parts = [RENDER_FORMAT, HEATMAP_MAX_POINTS, MARKER_MAX_POINTS, COORD_DECIMALS, _icon_dataurl()]
+    for package in ("folium", "pydeck"):
+        try:
+            parts.append(version(package))
+        except PackageNotFoundError:
+            parts.append(None)
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:12]
+
+def render_version(index) -> str:
+    """
+    Render cache version for a SpeciesIndex: its data version plus the render config,
+    so persisted renders from another deploy or configuration are never served.
+    """
+    return f"{index.version}-r{_render_config()}"
+
+def _marker_callback(icon_url: str, popup: str, icon_size: int = 30) -> str:
+    """JS factory for FastMarkerCluster: one shared L.icon for every marker."""
+    icon = (
+        f"L.icon({{iconUrl: {json.dumps(icon_url)}, iconSize: [{icon_size}, {icon_size}]}})"
+        if icon_url else "null"
+    )
+    return f"""(function () {{
+        var icon = {icon};
+        var popup = {json.dumps(popup)};
+        return function (row) {{
+            var latlng = new L.LatLng(row[0], row[1]);
+            var marker = icon ? L.marker(latlng, {{icon: icon}}) : L.marker(latlng);
+            marker.bindPopup(popup);
+            return marker;
+        }};
+    }})()"""
+
+def _rounded(points: np.ndarray) -> list:
+    return np.asarray(points, dtype=np.float64).round(COORD_DECIMALS).tolist()
+
+def build_species_map(
+    rec,
+    show_markers: bool = True,
+    icon_url: str = "",
+    zoom_start: int = 5,
+    max_heat_points: int = HEATMAP_MAX_POINTS,
+    max_markers: int = MARKER_MAX_POINTS,
+) -> "folium.Map":
+    """
+    Cluster + heatmap map for one SpeciesRecord. Coordinates go from NumPy straight
+    into the layers; folium's per-row validation is skipped since they are already clean.
+    The heatmap gets zoom-sized weighted cells and the markers a capped sample, so the
+    page payload stays bounded however many sightings a species has.
+    """
+    import folium
+    from folium import plugins
+
+    m = folium.Map(location=list(rec.centroid), zoom_start=zoom_start, control_scale=True)
+
+    if show_markers:
+        popup = f"Common Name: {rec.common_name} | Species: {rec.primary_label}"
+        cluster = plugins.FastMarkerCluster([], callback=_marker_callback(icon_url, popup), name="Observations")
+        cluster.data = _rounded(downsample(rec.latitude, rec.longitude, max_markers))
+        cluster.add_to(m)
+
+    heat = plugins.HeatMap([], name="Heatmap")
+    heat.data = _rounded(bin_coordinates(rec.latitude, rec.longitude, zoom=zoom_start, max_points=max_heat_points))
+    heat.add_to(m)
+
+    folium.LayerControl().add_to(m)
+    return m
+
+MAP_HEIGHT = 500
+
+def render_species_map_html(rec, show_markers: bool = True) -> str:
+    """Standalone HTML for build_species_map, as folium_static would embed it."""
+    import folium
+
+    m = build_species_map(rec, show_markers=show_markers, icon_url=_icon_dataurl())
+    return folium.Figure().add_child(m).render()
+
+def heatmap_folium(common_name: str, df, width: int = 900, show_markers: bool = True):
+    index = species_index_for(df)
+    rec = index.get(common_name)
+    if rec is None:
         st.info("No records for this species.")
         return
 
-    lat = bird_data["latitude"].mean()
-    lon = bird_data["longitude"].mean()
+    lat, lon = rec.centroid
     if pd.isna(lat) or pd.isna(lon):
         st.info("No coordinates to display.")
         return
 
-    m = folium.Map(location=[lat, lon], zoom_start=5, control_scale=True)
+    html = get_render_cache().get_or_render(
+        render_version(index),
+        (common_name, "heatmap", width, show_markers),
+        lambda: render_species_map_html(rec, show_markers),
+    )
+    import streamlit.components.v1 as components
 
-    marker_cluster = plugins.MarkerCluster().add_to(m)
-    icon_url = _icon_dataurl()
-    for _, row in bird_data.iterrows():
-        folium.Marker(
-            location=[row["latitude"], row["longitude"]],
-            icon=folium.CustomIcon(icon_image=icon_url, icon_size=(30, 30)) if icon_url else None,
-            popup=f"Common Name: {row['common_name']} | Species: {row['primary_label']}",
-        ).add_to(marker_cluster)
+    components.html(html, height=MAP_HEIGHT + 10, width=width)
 
-    heat_data = bird_data[["latitude", "longitude"]].values.tolist()
-    plugins.HeatMap(heat_data).add_to(m)
+DECK_TOOLTIP = {"text": "Common Name: {common_name}"}
 
-    folium.LayerControl().add_to(m)
-    folium_static(m, width=width)
+def map_3d_deck(common_name: str, df):
+    import pydeck as pdk
 
-def map_3d_deck(common_name: str, df: pd.DataFrame):
-    data = df[df["common_name"] == common_name][["latitude", "longitude", "common_name"]].copy()
-    if data.empty:
+    rec = species_index_for(df).get(common_name)
+    if rec is None:
         return None
 
-    data["lat"] = data["latitude"].astype(float)
-    data["lon"] = data["longitude"].astype(float)
+    data = pd.DataFrame({
+        "lat": rec.latitude.astype(float),
+        "lon": rec.longitude.astype(float),
+        "common_name": common_name,
+    })
 
     view_state = pdk.ViewState(
-        latitude=float(data["lat"].mean()),
-        longitude=float(data["lon"].mean()),
+        latitude=rec.centroid[0],
+        longitude=rec.centroid[1],
         zoom=4,
         pitch=45,
         bearing=0,
@@ -234,7 +400,53 @@ def map_3d_deck(common_name: str, df: pd.DataFrame):
     deck = pdk.Deck(
         layers=[layer],
         initial_view_state=view_state,
-        tooltip={"text": "Common Name: {common_name}"},
+        tooltip=DECK_TOOLTIP,
         map_style="mapbox://styles/mapbox/light-v9",
     )
     return deck
+
+class DeckSpec:
+    """Pre-serialized deck; st.pydeck_chart only needs to_json() and the tooltip."""
+
+    def __init__(self, spec: str, tooltip=None):
+        self.spec = spec
+        self._tooltip = tooltip
+
+    def to_json(self) -> str:
+        return self.spec
+
+def cached_deck(common_name: str, df, cache=None):
+    """map_3d_deck, served from the render cache as JSON after the first build."""
+    index = species_index_for(df)
+    if common_name not in index:
+        return None
+
+    spec = (cache or get_render_cache()).get_or_render(
+        render_version(index),
+        (common_name, "deck", None, None),
+        lambda: map_3d_deck(common_name, index).to_json(),
+    )
+    return DeckSpec(spec, DECK_TOOLTIP)
+
+def _distribution_stats(rec) -> dict:
+    min_lat, min_lon, max_lat, max_lon = rec.bbox
+    return {
+        "count": rec.count,
+        "centroid": list(rec.centroid),
+        "bbox": list(rec.bbox),
+        "lat_range": max_lat - min_lat,
+        "lon_range": max_lon - min_lon,
+    }
+
+def species_stats(common_name: str, df, cache=None):
+    """Observation count, centroid, bounding box and ranges for one species (cached)."""
+    index = species_index_for(df)
+    rec = index.get(common_name)
+    if rec is None:
+        return None
+    raw = (cache or get_render_cache()).get_or_render(
+        render_version(index),
+        (common_name, "stats", None, None),
+        lambda: json.dumps(_distribution_stats(rec)),
+    )
+    return json.loads(raw)
@@ -0,0 +1,102 @@
+"""
+Pre-renders every species' heatmap HTML, deck JSON and distribution stats into
+the on-disk render cache, so the first visitor after a deploy hits warm entries.
+
+    python -m core.warmup --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
+
+import streamlit as st
+
+from core.data import TRAIN_CSV, read_train_metadata, species_index_for
+from core.render_cache import DiskRenderStore, RenderCache, is_persistent_version
+from core.viz import SPECIES, cached_deck, render_species_map_html, render_version, species_stats
+
+# Views the Visualizations page requests: heatmap at 800 px, markers on and off.
+HEATMAP_VIEWS = [(800, True), (800, False)]
+
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+
+# Default pool size; every server process warms on startup, so it must not take every core.
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_worker_index = None
+_worker_cache = None
+
+def _init_worker():
+    global _worker_index, _worker_cache
+    _worker_index = species_index_for(read_train_metadata())
+    # Memory tier is irrelevant in a short-lived worker; everything goes to disk.
+    _worker_cache = RenderCache(max_bytes=0, disk=DiskRenderStore())
+
+def _species_keys(common_name: str) -> list:
+    keys = [(common_name, "heatmap", width, show_markers) for width, show_markers in HEATMAP_VIEWS]
+    return keys + [(common_name, "deck", None, None), (common_name, "stats", None, None)]
+
+def _warm_species(common_name: str) -> dict:
+    start = time.perf_counter()
+    index, cache = _worker_index, _worker_cache
+    rec = index.get(common_name)
+    if rec is None:
+        return {"species": common_name, "rows": 0, "seconds": time.perf_counter() - start}
+
+    for width, show_markers in HEATMAP_VIEWS:
+        cache.get_or_render(
+            render_version(index),
+            (common_name, "heatmap", width, show_markers),
+            lambda: render_species_map_html(rec, show_markers),
+        )
+    cached_deck(common_name, index, cache=cache)
+    species_stats(common_name, index, cache=cache)
+    return {"species": common_name, "rows": rec.count, "seconds": time.perf_counter() - start}
+
+def warm_all(species: Optional[list] = None, workers: Optional[int] = None) -> list[dict]:
+    """Renders all species in a process pool; returns per-species timings."""
+    species = list(species or SPECIES)
+    version = render_version(species_index_for(read_train_metadata()))
+    if not is_persistent_version(version):
+        return []
+    store = DiskRenderStore()
+    store.prune(keep_version=version)
+
+    # Already-rendered species are skipped without starting any workers.
+    species = [name for name in species if not all(store.has(version, k) for k in _species_keys(name))]
+    results = []
+    if not species:
+        return results
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers or WARMUP_WORKERS, mp_context=ctx, initializer=_init_worker) as pool:
+        futures = [pool.submit(_warm_species, name) for name in species]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return results
+
+@st.cache_resource
+def start_background_warmup() -> Optional[threading.Thread]:
+    """Starts warm_all once per server process, off the request path."""
+    if not WARMUP_ON_STARTUP or not os.path.exists(TRAIN_CSV):
+        return None
+    thread = threading.Thread(target=warm_all, name="species-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=None, help=f"process count (default: {WARMUP_WORKERS})")
+    parser.add_argument("--species", nargs="*", default=None, help="subset of species to warm")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = warm_all(args.species, args.workers)
+    for r in sorted(results, key=lambda r: -r["seconds"]):
+        print(f"{r['species']:<32} {r['rows']:>8} rows  {r['seconds']:>7.2f} s")
+    print(f"Warmed {len(results)} species in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from core.bulk import SURVEY_MAX_COUNT, _clean_inputs, iter_survey_chunks
+
+
+def _zip_without_workbook() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("notes.txt", "not a workbook")
+    return buffer.getvalue()
+
+
+def survey(**overrides) -> pd.DataFrame:
+    rows = len(next(iter(overrides.values())))
+    base = {
+        "habitat": ["Trees"] * rows,
+        "nest_stage": ["Eggs"] * rows,
+        "egg_count": ["3"] * rows,
+        "chick_count": ["0"] * rows,
+        "human": ["Low"] * rows,
+        "predator": ["None"] * rows,
+        "noise": ["Quiet"] * rows,
+    }
+    return pd.DataFrame(dict(base, **overrides), dtype=object)
+
+
+def test_bad_counts_mark_only_their_rows_invalid():
+    counts = ["inf", "-inf", "1e400", "nan", "", "-1", "2.5", str(SURVEY_MAX_COUNT + 1), "4", str(SURVEY_MAX_COUNT)]
+    inputs, errors = _clean_inputs(survey(egg_count=counts))
+
+    assert errors.tolist() == ["invalid egg_count"] * 8 + ["", ""]
+    assert inputs["egg_count"].tolist() == [0] * 8 + [4, SURVEY_MAX_COUNT]
+
+
+def test_unknown_labels_are_reported_per_field():
+    _, errors = _clean_inputs(survey(habitat=["Forest", " Trees "], noise=["loud", "Loud"]))
+
+    assert errors.tolist() == ["invalid habitat; invalid noise", ""]
+
+
+@pytest.mark.parametrize("data", [b"not a zip", _zip_without_workbook()])
+def test_unreadable_workbook_raises_value_error(data):
+    with pytest.raises(ValueError, match="not a readable .xlsx"):
+        list(iter_survey_chunks(io.BytesIO(data), "survey.xlsx"))
+
+
+@pytest.mark.parametrize("data", [
+    b"habitat,nest_stage,egg_count,chick_count,human,predator,noise\nTrees,Eggs\n\"unterminated",
+    b"habitat,nest_stage\n\xff\xfe bad encoding",
+])
+def test_malformed_csv_raises_value_error(data):
+    # pandas' ParserError and UnicodeDecodeError are both ValueErrors already.
+    with pytest.raises(ValueError):
+        list(iter_survey_chunks(io.BytesIO(data), "survey.csv"))
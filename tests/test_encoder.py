@@ -0,0 +1,56 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_encoder import legacy_row
+from core.model import COLUMNS_PATH, ONE_HOT_PREFIXES, RiskEncoder, encode_risk_inputs
+from core.risk_table import input_grid
+
+
+@pytest.fixture(scope="module")
+def all_cols():
+    return joblib.load(COLUMNS_PATH)
+
+
+@pytest.fixture(scope="module")
+def grid():
+    return input_grid()
+
+
+def legacy_batch(all_cols, records: pd.DataFrame) -> np.ndarray:
+    """legacy_row for a whole frame: f"{prefix}_{value}" indicator columns reindexed onto the model columns."""
+    frame = records[["egg_count", "chick_count"]].copy()
+    for field, prefix in ONE_HOT_PREFIXES.items():
+        frame = frame.join(pd.get_dummies(records[field].astype(str), prefix=prefix, dtype=np.float32))
+    return frame.reindex(columns=all_cols, fill_value=0).to_numpy(dtype=np.float32)
+
+
+def test_encode_one_matches_legacy_row(all_cols, grid):
+    encoder = RiskEncoder(all_cols)
+    for nest in grid.sample(300, random_state=0).to_dict("records"):
+        expected = legacy_row(all_cols, **nest).to_numpy(dtype=np.float32)
+        assert np.array_equal(encoder.encode_one(**nest), expected), nest
+
+
+def test_encode_batch_matches_legacy_over_input_space(all_cols, grid):
+    assert np.array_equal(RiskEncoder(all_cols).encode_batch(grid), legacy_batch(all_cols, grid))
+
+
+def test_encode_batch_accepts_record_dicts_and_reuses_out(all_cols, grid):
+    encoder = RiskEncoder(all_cols)
+    sample = grid.head(50)
+    out = np.full((50, encoder.n_features), 7, dtype=np.float32)
+    result = encoder.encode_batch(sample.to_dict("records"), out=out)
+    assert np.shares_memory(result, out)
+    assert np.array_equal(out, encode_risk_inputs(all_cols, sample).to_numpy())
+
+
+@pytest.mark.parametrize("field, value", [("habitat", "Forest"), ("noise", "loud"), ("human", "")])
+def test_unknown_categories_rejected(all_cols, grid, field, value):
+    encoder = RiskEncoder(all_cols)
+    nest = dict(grid.iloc[0].to_dict(), **{field: value})
+    with pytest.raises(ValueError, match=field):
+        encoder.encode_one(**nest)
+    with pytest.raises(ValueError, match=field):
+        encoder.encode_batch([nest])
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.model import RISK_FIELD_VALUES, predict_nest_risk_fallback, predict_nest_risk_fallback_batch
+from core.risk_table import input_grid
+
+# Values the scalar rules must treat exactly like the batch version, beyond the form options.
+ODD_LABELS = ["", "moderate", "HIGH", "Loud ", "Forest", "urban", "None"]
+
+
+def random_cases(n: int, seed: int) -> pd.DataFrame:
+    """Any mix of valid and invalid labels with negative, large, fractional and NaN counts."""
+    rng = np.random.default_rng(seed)
+    cases = {}
+    for field in ("habitat", "nest_stage", "human", "predator", "noise"):
+        pool = np.asarray(RISK_FIELD_VALUES[field] + ODD_LABELS, dtype=object)
+        cases[field] = pool[rng.integers(0, len(pool), n)]
+    for field in ("egg_count", "chick_count"):
+        counts = rng.integers(-3, 40, n).astype(np.float64)
+        counts[rng.random(n) < 0.1] += 0.5
+        counts[rng.random(n) < 0.02] = np.nan
+        cases[field] = counts
+    return pd.DataFrame(cases)
+
+
+def assert_matches_scalar(frame: pd.DataFrame, batch: np.ndarray):
+    scalar = np.asarray([predict_nest_risk_fallback(row) for row in frame.to_dict("records")], dtype=object)
+    bad = np.flatnonzero(batch != scalar)
+    assert not len(bad), f"{len(bad)} mismatches, first {frame.iloc[bad[0]].to_dict()}: scalar {scalar[bad[0]]}, batch {batch[bad[0]]}"
+
+
+def test_batch_matches_scalar_on_every_form_input():
+    grid = input_grid()
+    assert_matches_scalar(grid, predict_nest_risk_fallback_batch(grid))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_matches_scalar_on_random_inputs(seed):
+    cases = random_cases(20_000, seed)
+    assert_matches_scalar(cases, predict_nest_risk_fallback_batch(cases))
+
+
+def test_column_arrays_match_dataframe():
+    cases = random_cases(2_000, seed=99)
+    columns = {field: cases[field].to_numpy() for field in cases.columns}
+    assert list(predict_nest_risk_fallback_batch(columns)) == list(predict_nest_risk_fallback_batch(cases))
+
+
+def test_empty_batch():
+    assert len(predict_nest_risk_fallback_batch(random_cases(0, seed=0))) == 0
@@ -0,0 +1,58 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from core.forest import PACK_FORMAT, CompiledForest, as_compiled, forest_path
+from core.model import COLUMNS_PATH, MODEL_PATH, encode_risk_inputs
+from core.risk_table import input_grid
+from core.train import one_hot_features, synthetic_survey
+
+
+@pytest.fixture(scope="module")
+def shipped():
+    model = joblib.load(MODEL_PATH)
+    all_cols = joblib.load(COLUMNS_PATH)
+    X = encode_risk_inputs(all_cols, input_grid()).to_numpy()
+    return model, CompiledForest.from_model(model), X
+
+
+def test_shipped_model_bit_identical_over_input_space(shipped):
+    model, forest, X = shipped
+    assert np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(forest.predict(X), model.predict(X))
+
+
+def test_contributions_sum_to_probabilities(shipped):
+    model, forest, X = shipped
+    sample = X[::97]
+    bias, contributions = forest.contributions(sample)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict_proba(sample), rtol=0, atol=1e-12)
+
+
+def test_retrained_forest_bit_identical():
+    records, labels = synthetic_survey(2000, seed=3)
+    X = one_hot_features(records)
+    model = RandomForestClassifier(n_estimators=30, min_samples_leaf=3, random_state=0).fit(X, labels)
+    assert np.array_equal(CompiledForest.from_model(model).predict_proba(X.to_numpy()), model.predict_proba(X))
+
+
+def test_export_round_trip(shipped, tmp_path):
+    model, forest, X = shipped
+    from core.forest import export_forest
+
+    loaded = CompiledForest.load(export_forest(model, str(tmp_path / "forest.npz")))
+    assert np.array_equal(loaded.predict_proba(X[:500]), forest.predict_proba(X[:500]))
+
+
+def test_non_forest_rejected():
+    with pytest.raises(ValueError, match="not a tree ensemble"):
+        as_compiled(LogisticRegression())
+
+
+def test_export_path_keyed_on_format_and_sklearn():
+    import sklearn
+
+    major, minor = sklearn.__version__.split(".")[:2]
+    assert forest_path("ab" * 32).endswith(f"_p{PACK_FORMAT}_sk{major}.{minor}.npz")
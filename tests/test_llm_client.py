@@ -0,0 +1,142 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core import llm_client
+from core.fake_llm import DEFAULT_REPLY, FakeGeminiServer, FakeGenaiClient, FakeLLM
+from core.llm_client import LLMClient, LLMOverloaded, SingleFlight
+
+PROMPT = "How far should people stay from a nest?"
+
+
+def make_client(fake, **options) -> LLMClient:
+    options = dict(dict(rate_per_min=0, backoff_s=0.01), **options)
+    return LLMClient("genai", fake, None, **options)
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def run_together(fn, args: list) -> list:
+    """Calls fn on every arg from its own thread, released at the same moment."""
+    barrier = threading.Barrier(len(args))
+
+    def call(arg):
+        barrier.wait()
+        return fn(arg)
+
+    with ThreadPoolExecutor(max_workers=len(args)) as pool:
+        return list(pool.map(call, args))
+
+
+def test_stream_replays_the_whole_reply_in_chunks():
+    fake = FakeGenaiClient(first_token_delay=0.0, chunk_delay=0.0, chunk_chars=10)
+    chunks = list(make_client(fake).stream("m", PROMPT))
+    assert "".join(chunks) == DEFAULT_REPLY
+    assert len(chunks) == len(fake.pieces()) and fake.calls == 1
+
+
+def test_identical_generate_calls_share_one_upstream_call():
+    fake = FakeGenaiClient(first_token_delay=0.2, chunk_delay=0.0)
+    client = make_client(fake)
+    replies = run_together(lambda _: client.generate("m", PROMPT), range(6))
+    assert replies == [DEFAULT_REPLY] * 6
+    assert fake.calls == 1 and client.stats()["coalesced"] == 5
+
+
+def test_identical_streams_are_replayed_from_the_start():
+    fake = FakeGenaiClient(first_token_delay=0.2, chunk_delay=0.01)
+    client = make_client(fake)
+    replies = run_together(lambda _: "".join(client.stream("m", PROMPT)), range(4))
+    assert replies == [DEFAULT_REPLY] * 4
+    assert fake.calls == 1 and client.stats()["coalesced"] == 3
+
+
+def test_single_flight_hands_the_leaders_error_to_every_caller():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.2)
+        raise ConnectionError("upstream reset")
+
+    def call(_):
+        with pytest.raises(ConnectionError, match="upstream reset"):
+            flight.do("key", fail)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leader = pool.submit(call, None)
+        started.wait()
+        followers = [pool.submit(call, None) for _ in range(2)]
+        for future in [leader] + followers:
+            future.result()
+    assert flight.shared == 2
+
+
+def test_full_queue_rejects_instead_of_waiting():
+    fake = FakeGenaiClient(first_token_delay=0.5, chunk_delay=0.0)
+    client = make_client(fake, max_concurrency=1, max_queue=1)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        running = pool.submit(client.generate, "m", "first")
+        wait_for(lambda: client.stats()["in_flight"] == 1)
+        queued = pool.submit(client.generate, "m", "second")
+        wait_for(lambda: client.stats()["waiting"] == 1)
+        with pytest.raises(LLMOverloaded):
+            client.generate("m", "third")
+        assert running.result() == queued.result() == DEFAULT_REPLY
+    assert client.stats()["rejected"] == 1 and fake.calls == 2
+
+
+def test_connection_resets_are_retried():
+    fake = FakeGenaiClient(first_token_delay=0.0, chunk_delay=0.0, fail_first=2)
+    client = make_client(fake)
+    assert client.generate("m", PROMPT) == DEFAULT_REPLY
+    assert fake.calls == 3 and client.stats()["retries"] == 2
+
+
+def test_stream_retries_before_the_first_chunk():
+    fake = FakeGenaiClient(first_token_delay=0.0, chunk_delay=0.0, fail_first=1)
+    client = make_client(fake)
+    assert "".join(client.stream("m", PROMPT)) == DEFAULT_REPLY
+    assert client.stats()["retries"] == 1
+
+
+def test_gives_up_after_max_retries():
+    fake = FakeGenaiClient(first_token_delay=0.0, chunk_delay=0.0, fail_first=5)
+    client = make_client(fake, max_retries=2)
+    with pytest.raises(ConnectionError):
+        client.generate("m", PROMPT)
+    assert fake.calls == 3 and client.stats()["failures"] == 1
+
+
+@pytest.fixture
+def gemini_server(monkeypatch):
+    """The fake REST endpoint and a google-genai SDK client pointed at it."""
+    types = pytest.importorskip("google.genai.types")
+    server = FakeGeminiServer(FakeLLM(first_token_delay=0.2, chunk_delay=0.01)).start()
+    monkeypatch.setattr(llm_client, "LLM_BASE_URL", server.base_url)
+    yield server, llm_client._genai_client("offline-test-key", types), types
+    server.shutdown()
+
+
+def test_sdk_round_trip_through_the_fake_server(gemini_server):
+    server, sdk_client, types = gemini_server
+    client = LLMClient("genai", sdk_client, types, rate_per_min=0)
+    assert client.generate("m", PROMPT, "Be brief.") == DEFAULT_REPLY
+    assert "".join(client.stream("m", PROMPT, "Be brief.")) == DEFAULT_REPLY
+    assert server.requests == 2
+
+
+def test_sdk_streams_are_coalesced_upstream(gemini_server):
+    server, sdk_client, types = gemini_server
+    client = LLMClient("genai", sdk_client, types, rate_per_min=0)
+    replies = run_together(lambda _: "".join(client.stream("m", PROMPT)), range(5))
+    assert replies == [DEFAULT_REPLY] * 5
+    assert server.requests == 1
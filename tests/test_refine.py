@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import Future
+
+import core.refine as refine
+from core.refine import RefinementPool
+
+PARAMS = {
+    "habitat": "Trees",
+    "nest_stage": "Eggs",
+    "egg_count": 3,
+    "chick_count": 0,
+    "human": "Low",
+    "predator": "None",
+    "noise": "Quiet",
+}
+
+
+class _DoneExecutor:
+    """Runs the call on the submitting thread, so the future is finished before submit returns."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def _submit_in_thread(pool, timeout=5.0):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(future=pool.submit("Low", PARAMS, ["Keep distance"])), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "submit deadlocked"
+    return result["future"]
+
+
+def test_submit_already_completed_refinement(monkeypatch):
+    monkeypatch.setattr(refine, "refine_recommendations", lambda *args, **kwargs: "refined")
+    pool = RefinementPool(workers=1)
+    pool._executor = _DoneExecutor()
+
+    future = _submit_in_thread(pool)
+
+    assert future.result(timeout=0) == "refined"
+    assert pool._pending == {}
+    # The finished call was forgotten, so the next submit starts a new one.
+    assert _submit_in_thread(pool) is not future
+
+
+def test_identical_inputs_in_flight_share_one_future(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(refine, "refine_recommendations", lambda *args, **kwargs: release.wait(5) and "refined")
+    pool = RefinementPool(workers=2)
+
+    first = pool.submit("Low", PARAMS, [])
+    second = pool.submit("Low", PARAMS, [])
+    release.set()
+
+    assert first is second
+    assert first.result(timeout=5) == "refined"
@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import joblib
+import pytest
+
+from core.calibration import Calibration
+from core.model import COLUMNS_PATH, MODEL_PATH
+from core.risk_table import _table_paths, artifacts_sha256, build_risk_table, open_risk_table
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def served_model(tmp_path, monkeypatch):
+    """A working directory serving copies of the shipped model files."""
+    for path in (MODEL_PATH, COLUMNS_PATH):
+        os.makedirs(tmp_path / os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(os.path.join(REPO_ROOT, path), tmp_path / path)
+    monkeypatch.chdir(tmp_path)
+    return joblib.load(MODEL_PATH), joblib.load(COLUMNS_PATH), artifacts_sha256(MODEL_PATH, COLUMNS_PATH)
+
+
+def sigmoid(model, model_sha256: str) -> Calibration:
+    classes = [str(c) for c in model.classes_]
+    return Calibration({
+        "method": "sigmoid",
+        "classes": classes,
+        "model_sha256": model_sha256,
+        "maps": {c: {"a": -4.0, "b": 2.0} for c in classes},
+    })
+
+
+def table_exists(model_hash: str) -> bool:
+    return all(os.path.exists(p) for p in _table_paths(model_hash))
+
+
+def test_uncalibrated_build_keeps_the_calibrated_table(served_model):
+    model, all_cols, served = served_model
+    calibration = sigmoid(model, served)
+    calibrated_key = "c" * 64
+    build_risk_table(model, all_cols, calibrated_key, calibration)
+    open_risk_table()
+    assert table_exists(calibrated_key) and table_exists(served)
+
+
+def test_build_prunes_tables_for_replaced_models(served_model):
+    model, all_cols, served = served_model
+    stale = "0" * 64
+    build_risk_table(model, all_cols, stale)
+    assert table_exists(stale)
+    build_risk_table(model, all_cols, served)
+    assert not table_exists(stale) and table_exists(served)
+
+
+def test_build_leaves_no_temp_files(served_model):
+    model, all_cols, served = served_model
+    build_risk_table(model, all_cols, served)
+    assert not [name for name in os.listdir(os.path.join("model", "cache")) if ".tmp" in name]
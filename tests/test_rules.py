@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_rules import LEGACY, MITIGATION_LEVELS
+from core.risk_table import input_grid
+from core.rules import RULESETS
+
+
+@pytest.fixture(scope="module")
+def grid():
+    return input_grid()
+
+
+def assert_matches_legacy(surface, records, level):
+    ruleset = RULESETS[surface]
+    compiled = ruleset.recommendation_ids(records, [level] * len(records))
+    for row, ids in zip(records.to_dict("records"), compiled):
+        expected = LEGACY[surface](level, **row)
+        assert [ruleset.texts[i] for i in ids] == expected, f"{surface} {level} {row}"
+
+
+@pytest.mark.parametrize("surface", ["risk_page", "mitigation"])
+@pytest.mark.parametrize("level", ["Low", "Medium", "High"])
+def test_rules_match_legacy_over_input_space(grid, surface, level):
+    assert_matches_legacy(surface, grid, level)
+
+
+@pytest.mark.parametrize("level", [level for level in MITIGATION_LEVELS if level not in ("Low", "Medium", "High")])
+def test_mitigation_accepts_legacy_spellings(grid, level):
+    assert_matches_legacy("mitigation", grid.sample(5_000, random_state=0), level)
+
+
+@pytest.mark.parametrize("surface", ["risk_page", "mitigation"])
+def test_counts_above_the_form(grid, surface):
+    # Uploaded surveys can report more eggs or chicks than the form's sliders allow.
+    rng = np.random.default_rng(1)
+    extra = grid.sample(5_000, random_state=0).assign(
+        egg_count=rng.integers(0, 40, 5_000), chick_count=rng.integers(0, 40, 5_000)
+    )
+    for level in ("Low", "Medium", "High"):
+        assert_matches_legacy(surface, extra, level)